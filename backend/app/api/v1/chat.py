@@ -1,8 +1,13 @@
+import json
+import logging
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from backend.app.services.chat import save_chat, check_cached_response, process_chat_async
+from starlette.background import BackgroundTask
+from backend.app.services.chat import save_chat, check_cached_response, process_chat_async, stream_response
 from celery.result import AsyncResult
 from backend.app.services.chat import celery_app
+from backend.app.services.routing import route_chat
 
 router = APIRouter()
 
@@ -24,8 +29,11 @@ def query_chatbot(request: ChatRequest):
             "category": "cached"
         }
     
-    # ✅ If not cached, send to Celery for async processing
-    task = process_chat_async.delay(request.user_id, request.message)
+    # ✅ If not cached, send to Celery for async processing on the queue for its category
+    route = route_chat(request.user_id, request.message)
+    task = process_chat_async.apply_async(
+        (request.user_id, request.message), queue=route["queue"], priority=route["priority"]
+    )
     
     return {
         "task_id": task.id,
@@ -33,6 +41,31 @@ def query_chatbot(request: ChatRequest):
         "category": "pending"
     }
 
+@router.post("/query/stream")
+async def stream_chatbot(request: ChatRequest):
+    """Streams the AI response as Server-Sent Events, without Celery polling."""
+    result = {}
+
+    async def event_stream():
+        try:
+            async for event in stream_response(request.user_id, request.message, result):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            logging.error(f"Streaming error: {e}")
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': 'Failed to generate a response'})}\n\n"
+
+    def persist_chat():
+        # ✅ Runs after the stream has closed
+        if result.get("persist"):
+            save_chat(request.user_id, request.message, result["response"], result["category"], result.get("recent"))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(persist_chat),
+    )
+
 @router.get("/query/status/{task_id}")
 def get_chat_status(task_id: str):
     """Check the status of an AI processing task."""
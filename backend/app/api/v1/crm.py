@@ -1,8 +1,20 @@
+from typing import List
 from fastapi import APIRouter, HTTPException, Query
-from backend.app.integrations.salesforce import get_customer_details, get_customer_cases, get_salesforce_instance
+from pydantic import BaseModel, Field
+from backend.app.integrations.salesforce import (
+    get_customer_details,
+    get_customer_cases,
+    get_customers_details_bulk,
+    get_customers_cases_bulk,
+    with_salesforce,
+    invalidate_customer_cache,
+)
 
 router = APIRouter()
 
+class BulkEmailRequest(BaseModel):
+    emails: List[str] = Field(..., min_length=1, max_length=1000)
+
 @router.get("/salesforce/customer")
 def fetch_customer(email: str = Query(..., description="Customer email")):
     """Fetches customer details from Salesforce."""
@@ -23,13 +35,29 @@ def fetch_cases(email: str = Query(..., description="Customer email")):
     
     return {"cases": cases}
 
+@router.post("/salesforce/customers/bulk")
+def fetch_customers_bulk(request: BulkEmailRequest):
+    """Fetches customer details for many emails in a few Salesforce queries."""
+    customers = get_customers_details_bulk(request.emails)
+
+    if "error" in customers:
+        raise HTTPException(status_code=502, detail=customers["error"])
+
+    return {"customers": customers}
+
+@router.post("/salesforce/cases/bulk")
+def fetch_cases_bulk(request: BulkEmailRequest):
+    """Fetches support cases for many emails in a few Salesforce queries."""
+    cases = get_customers_cases_bulk(request.emails)
+
+    if "error" in cases:
+        raise HTTPException(status_code=502, detail=cases["error"])
+
+    return {"cases": cases}
+
 @router.post("/salesforce/create-customer")
 def create_dummy_customer():
     """Creates a test customer in Salesforce."""
-    sf = get_salesforce_instance()
-    if isinstance(sf, dict) and "error" in sf:
-        raise HTTPException(status_code=500, detail=sf["error"])
-    
     new_contact = {
         "FirstName": "Arinze",
         "LastName": "Obidiegwu",
@@ -37,24 +65,25 @@ def create_dummy_customer():
         "Phone": "+2348027713127"
     }
     
-    result = sf.Contact.create(new_contact)
+    result = with_salesforce(lambda sf: sf.Contact.create(new_contact))
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    invalidate_customer_cache(email=new_contact["Email"])
     return {"contact_id": result.get("id"), "message": "Customer created successfully"}
 
 @router.post("/salesforce/create-case")
 def create_dummy_case():
     """Creates a test support case in Salesforce."""
-    sf = get_salesforce_instance()
-    if isinstance(sf, dict) and "error" in sf:
-        raise HTTPException(status_code=500, detail=sf["error"])
-
     # Fetch the test customer ID
-    query = "SELECT Id FROM Contact WHERE Email = 'caephas@terminaltech.com' LIMIT 1"
-    result = sf.query(query)
-    
-    if not result["records"]:
+    test_email = "caephas@terminaltech.com"
+    contacts = get_customer_details(test_email)
+    if isinstance(contacts, dict) and "error" in contacts:
+        raise HTTPException(status_code=500, detail=contacts["error"])
+
+    if not contacts:
         raise HTTPException(status_code=404, detail="Test customer not found. Create a customer first.")
 
-    contact_id = result["records"][0]["Id"]
+    contact_id = contacts[0]["Id"]
 
     # Create a new case linked to the customer
     new_case = {
@@ -65,5 +94,8 @@ def create_dummy_case():
         "ContactId": contact_id
     }
 
-    case_result = sf.Case.create(new_case)
+    case_result = with_salesforce(lambda sf: sf.Case.create(new_case))
+    if "error" in case_result:
+        raise HTTPException(status_code=500, detail=case_result["error"])
+    invalidate_customer_cache(email=test_email)
     return {"case_id": case_result.get("id"), "message": "Case created successfully"}
\ No newline at end of file
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from backend.app.core.config import EXPORT_PAGE_SIZE, EXPORT_ADMIN_UIDS
+from backend.app.core.security import verify_token
+from backend.app.services.export import EXPORT_FIELDS, MAX_PAGE_SIZE, iter_rows, stream_jsonl_gz
+
+router = APIRouter()
+
+@router.get("/{collection}")
+def export_collection(
+    collection: str,
+    since: Optional[datetime] = Query(None, description="ISO timestamp, inclusive"),
+    until: Optional[datetime] = Query(None, description="ISO timestamp, exclusive"),
+    user_id: Optional[str] = Query(None, description="Only this user's chats (admins only; others always get their own)"),
+    page_size: int = Query(EXPORT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    user: dict = Depends(verify_token),
+):
+    """Streams a collection as gzip-compressed JSON lines, page by page.
+
+    Only uids in EXPORT_ADMIN_UIDS can export other users' chats or the
+    Salesforce event log; everyone else gets their own chats.
+    """
+    if collection not in EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    caller = user.get("sub")
+    if not caller:
+        raise HTTPException(status_code=401, detail="Token has no subject")
+    if caller not in EXPORT_ADMIN_UIDS:
+        if "user_id" not in EXPORT_FIELDS[collection]:
+            raise HTTPException(status_code=403, detail=f"Exporting {collection} requires an admin account")
+        if user_id and user_id != caller:
+            raise HTTPException(status_code=403, detail="You can only export your own chats")
+        # ✅ Never unscoped: a non-admin export is always filtered to the caller
+        user_id = caller
+    if user_id and "user_id" not in EXPORT_FIELDS[collection]:
+        raise HTTPException(status_code=400, detail=f"{collection} can't be filtered by user_id")
+
+    # ✅ Naive timestamps are taken as UTC, like the stored ones
+    since = since.replace(tzinfo=timezone.utc) if since and since.tzinfo is None else since
+    until = until.replace(tzinfo=timezone.utc) if until and until.tzinfo is None else until
+    pages = iter_rows(collection, page_size=page_size, since=since, until=until, user_id=user_id)
+    return StreamingResponse(
+        stream_jsonl_gz(pages),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{collection}.jsonl.gz"'},
+    )
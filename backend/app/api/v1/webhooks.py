@@ -1,89 +1,138 @@
+import asyncio
+import logging
 import xml.etree.ElementTree as ET
 from fastapi import APIRouter, Response, Request
-from backend.app.integrations.slack import send_slack_message
-from backend.app.integrations.twillo import send_whatsapp
-from backend.app.integrations.sendgrid import send_email
-from backend.app.core.firebase import db
-from datetime import datetime, timezone
+from backend.app.services.notifications import notify_slack, notify_whatsapp, notify_email
+from backend.app.services.event_logging import claim_notifications, release_notification, log_salesforce_event
+from backend.app.integrations.salesforce import invalidate_customer_cache
 
 router = APIRouter()
 
+OUTBOUND_NS = "http://soap.sforce.com/2005/09/outbound"
+SOBJECT_NS = "urn:sobject.enterprise.soap.sforce.com"
+NOTIFICATION_TAG = f"{{{OUTBOUND_NS}}}Notification"
+
+ACK_RESPONSE = """<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+    <soapenv:Body>
+        <notificationsResponse xmlns="http://soap.sforce.com/2005/09/outbound">
+            <Ack>{ack}</Ack>
+        </notificationsResponse>
+    </soapenv:Body>
+</soapenv:Envelope>"""
+
+def _parse_notification(element) -> dict:
+    sobject = element.find(f"{{{OUTBOUND_NS}}}sObject")
+
+    def field(name):
+        node = sobject.find(f"{{{SOBJECT_NS}}}{name}") if sobject is not None else None
+        return node.text if node is not None else None
+
+    return {
+        "notification_id": element.findtext(f"{{{OUTBOUND_NS}}}Id"),
+        "case_id": field("Id"),
+        "status": field("Status") or "",
+        "subject": field("Subject") or "",
+        # Add ContactEmail to the Outbound Message's fields; SuppliedEmail covers web-to-case
+        "email": field("ContactEmail") or field("SuppliedEmail"),
+    }
+
+async def read_notifications(request: Request) -> list:
+    """Parses every Notification in an Outbound Message as the body streams in.
+
+    Salesforce batches up to 100 notifications per message. Each one is
+    parsed once its closing tag arrives and then cleared, so the full
+    document tree is never built.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    notifications = []
+    async for chunk in request.stream():
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.tag == NOTIFICATION_TAG:
+                notifications.append(_parse_notification(element))
+                element.clear()
+    parser.close()
+    for _, element in parser.read_events():
+        if element.tag == NOTIFICATION_TAG:
+            notifications.append(_parse_notification(element))
+    return notifications
+
+def handle_case_update(case_id, status, subject, notification_id=None, email=None):
+    """Queues the follow-up work for one case update; only the Redis round trips block."""
+    # Cached case lookups for this customer are now stale. By email this also
+    # covers cases no process has looked up yet (e.g. one just created).
+    invalidate_customer_cache(email=email, case_id=case_id)
+
+    # 1️⃣ **Log the event in Firebase**
+    log_salesforce_event(case_id, status, subject, notification_id=notification_id)
+
+    # Notifications are delivered in the background; keyed on the Salesforce
+    # notification id so a redelivery doesn't alert twice, while a later update
+    # to the same status (e.g. escalated again) still does.
+    idempotency_key = notification_id
+
+    # 2️⃣ **Send Slack Alert for Escalated Cases**
+    if status.lower() == "escalated":
+        slack_message = f"🚨 *Case Escalated!*\n🆔 Case ID: {case_id}\n📌 Subject: {subject}\n⚠ Status: {status}"
+        notify_slack(slack_message, idempotency_key=idempotency_key)
+
+    # 3️⃣ **Send WhatsApp Update to Customer**
+    if status.lower() in ["escalated", "working"]:
+        customer_phone = "+1234567890"  # Replace with actual phone field
+        whatsapp_message = f"🔔 Your support case '{subject}' has been updated to *{status}*. Support will contact you soon."
+        notify_whatsapp(customer_phone, whatsapp_message, idempotency_key=idempotency_key)
+
+    # 4️⃣ **Send an Email Confirmation if Case is Closed**
+    if status.lower() == "closed":
+        customer_email = "customer@example.com"  # Replace with actual email field
+        email_subject = f"Case {case_id} Closed - {subject}"
+        email_body = f"Dear Customer,\n\nYour case '{subject}' has been resolved. If you have further issues, feel free to contact us.\n\nBest Regards,\nCustomer Support"
+        notify_email(customer_email, email_subject, email_body, idempotency_key=idempotency_key)
+
+def handle_notifications(notifications: list) -> tuple:
+    """Handles each new notification in turn; returns (handled, failed) counts."""
+    notifications = [n for n in notifications if n["case_id"]]
+    # Salesforce redelivers a message until it is ACKed; skip notifications already handled
+    claimed = claim_notifications([n["notification_id"] for n in notifications if n["notification_id"]])
+    handled = failed = 0
+    for notification in notifications:
+        notification_id = notification["notification_id"]
+        if notification_id and notification_id not in claimed:
+            continue
+        try:
+            handle_case_update(
+                notification["case_id"], notification["status"], notification["subject"],
+                notification_id=notification_id, email=notification["email"],
+            )
+            handled += 1
+        except Exception as e:
+            # Unclaimed again so the redelivery triggered by the NACK below retries it
+            failed += 1
+            logging.error(f"Failed to handle Salesforce notification {notification_id}: {e}")
+            if notification_id:
+                release_notification(notification_id)
+    return handled, failed
+
 @router.post("/salesforce-webhook")
 async def receive_salesforce_webhook(request: Request):
     """Handles incoming Salesforce case updates from Salesforce Outbound Messages."""
     try:
-        # Read and parse the XML request body
-        raw_body = await request.body()
-        xml_data = raw_body.decode("utf-8")
-        print("📩 Raw XML from Salesforce:\n", xml_data)
-
-        # Parse XML
-        root = ET.fromstring(xml_data)
-        ns = {"sf": "urn:sobject.enterprise.soap.sforce.com"}
-
-        case_id = root.find(".//sf:Id", ns).text
-        status = root.find(".//sf:Status", ns).text
-        subject = root.find(".//sf:Subject", ns).text
-
-        print(f"✅ Case Updated → ID: {case_id}, Status: {status}, Subject: {subject}")
-
-        # **🔹 Automate Actions Based on Case Status**
-        
-        # 1️⃣ **Log the event in Firebase**
-        log_salesforce_event(case_id, status, subject)
-
-        # 2️⃣ **Send Slack Alert for Escalated Cases**
-        if status.lower() == "escalated":
-            slack_message = f"🚨 *Case Escalated!*\n🆔 Case ID: {case_id}\n📌 Subject: {subject}\n⚠ Status: {status}"
-            send_slack_message(slack_message)
-
-        # 3️⃣ **Send WhatsApp Update to Customer**
-        if status.lower() in ["escalated", "working"]:
-            customer_phone = "+1234567890"  # Replace with actual phone field
-            whatsapp_message = f"🔔 Your support case '{subject}' has been updated to *{status}*. Support will contact you soon."
-            send_whatsapp(customer_phone, whatsapp_message)
-
-        # 4️⃣ **Send an Email Confirmation if Case is Closed**
-        if status.lower() == "closed":
-            customer_email = "customer@example.com"  # Replace with actual email field
-            email_subject = f"Case {case_id} Closed - {subject}"
-            email_body = f"Dear Customer,\n\nYour case '{subject}' has been resolved. If you have further issues, feel free to contact us.\n\nBest Regards,\nCustomer Support"
-            send_email(customer_email, email_subject, email_body)
-
-        # Return XML response required by Salesforce
-        return Response(content="""<?xml version="1.0" encoding="UTF-8"?>
-        <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
-            <soapenv:Body>
-                <notificationsResponse xmlns="http://soap.sforce.com/2005/09/outbound">
-                    <Ack>true</Ack>
-                </notificationsResponse>
-            </soapenv:Body>
-        </soapenv:Envelope>""",
-        media_type="application/xml")
-
-    except Exception as e:
-        print(f"❌ Error processing webhook: {str(e)}")
-        return Response(
-            content="""<?xml version="1.0" encoding="UTF-8"?>
-            <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
-                <soapenv:Body>
-                    <notificationsResponse xmlns="http://soap.sforce.com/2005/09/outbound">
-                        <Ack>false</Ack>
-                    </notificationsResponse>
-                </soapenv:Body>
-            </soapenv:Envelope>""",
-            media_type="application/xml",
-            status_code=500
-        )
-
-# **Helper Function to Log Webhook Events in Firebase**
-def log_salesforce_event(case_id, status, subject):
-    """Log webhook event into Firebase Firestore."""
-    event = {
-        "case_id": case_id,
-        "status": status,
-        "subject": subject,
-        "timestamp": datetime.now(timezone.utc)
-    }
-    db.collection("salesforce_logs").add(event)
-    print(f"✅ Logged case {case_id} update in Firestore.")
\ No newline at end of file
+        notifications = await read_notifications(request)
+    except ET.ParseError as e:
+        logging.error(f"❌ Error processing webhook: {str(e)}")
+        return Response(content=ACK_RESPONSE.format(ack="false"), media_type="application/xml", status_code=500)
+
+    # **🔹 Automate Actions Based on Case Status**
+    # Claims, cache invalidation and queueing all talk to Redis; one thread
+    # hop keeps that off the event loop
+    handled, failed = await asyncio.to_thread(handle_notifications, notifications)
+
+    logging.info(f"✅ Salesforce webhook: {len(notifications)} notifications, {handled} new, {failed} failed")
+    logging.debug(f"Salesforce notifications: {notifications}")
+
+    if failed:
+        return Response(content=ACK_RESPONSE.format(ack="false"), media_type="application/xml", status_code=500)
+
+    # Return XML response required by Salesforce
+    return Response(content=ACK_RESPONSE.format(ack="true"), media_type="application/xml")
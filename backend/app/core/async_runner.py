@@ -0,0 +1,40 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Optional
+
+class BackgroundLoop:
+    """One long-lived event loop per process, running in a daemon thread.
+
+    Sync callers (Celery tasks on any pool) submit coroutines with ``run`` and
+    block on the result. Compared with ``asyncio.run`` per task this avoids
+    building a loop and a thread pool for every chat turn, lets concurrent
+    tasks share one loop, and keeps loop-bound clients (httpx/AsyncOpenAI
+    connection pools) on the loop they were first used on. The loop is
+    recreated after a fork, so prefork children each get their own.
+    """
+
+    def __init__(self, executor_threads: int):
+        self.executor_threads = executor_threads
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                # asyncio.to_thread stages (Firestore, Pinecone, OpenAI) run here;
+                # the default executor is too small for many concurrent chats
+                loop.set_default_executor(
+                    ThreadPoolExecutor(max_workers=self.executor_threads, thread_name_prefix="chat-io")
+                )
+                thread = threading.Thread(target=loop.run_forever, name="chat-event-loop", daemon=True)
+                thread.start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Runs ``coro`` on the background loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
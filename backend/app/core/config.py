@@ -0,0 +1,160 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pinecone / embeddings connection pooling
+PINECONE_POOL_THREADS = int(os.getenv("PINECONE_POOL_THREADS", "4"))
+EMBEDDINGS_MAX_CONNECTIONS = int(os.getenv("EMBEDDINGS_MAX_CONNECTIONS", "20"))
+EMBEDDINGS_TIMEOUT_SECONDS = float(os.getenv("EMBEDDINGS_TIMEOUT_SECONDS", "30"))
+
+# Query classification
+# "separate": answer and category come from two completions (original behaviour)
+# "combined": one JSON-mode completion returns both
+CLASSIFICATION_MODE = os.getenv("CLASSIFICATION_MODE", "combined")
+# Route obvious billing/technical/escalation queries with the keyword classifier
+LOCAL_CLASSIFIER_ENABLED = os.getenv("LOCAL_CLASSIFIER_ENABLED", "true").lower() == "true"
+
+# Redis used for shared caches (the Celery broker lives on the same instance)
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Semantic answer cache
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+# Set to REDIS_URL (or another instance) to share entries between workers
+SEMANTIC_CACHE_REDIS_URL = os.getenv("SEMANTIC_CACHE_REDIS_URL")
+SEMANTIC_CACHE_SYNC_SECONDS = float(os.getenv("SEMANTIC_CACHE_SYNC_SECONDS", "1"))
+
+# Run the Celery chat task through the concurrent asyncio pipeline
+ASYNC_CHAT_PIPELINE = os.getenv("ASYNC_CHAT_PIPELINE", "true").lower() == "true"
+
+# Per-user conversation window kept in Redis in front of Firestore
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "10"))
+CHAT_HISTORY_TTL_SECONDS = int(os.getenv("CHAT_HISTORY_TTL_SECONDS", "3600"))
+
+# Knowledge-base ingestion
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "50"))
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "100"))
+
+# Vector store backend: "pinecone" or "local" (in-process NumPy index)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "data/vector_index")
+LOCAL_VECTOR_STORE_QUANTIZE = os.getenv("LOCAL_VECTOR_STORE_QUANTIZE", "false").lower() == "true"
+# Embeddings provider: "openai", or "hash" for the deterministic offline embedder
+EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "openai")
+HASH_EMBEDDINGS_DIMENSION = int(os.getenv("HASH_EMBEDDINGS_DIMENSION", "256"))
+
+# Query/document embedding cache shared by retrieval, the semantic cache and ingestion
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
+# Set to REDIS_URL (or another instance) to share embeddings between processes
+EMBEDDING_CACHE_REDIS_URL = os.getenv("EMBEDDING_CACHE_REDIS_URL")
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "604800"))
+
+# Port for the Celery worker's Prometheus endpoint (unset to disable)
+CELERY_METRICS_PORT = int(os.getenv("CELERY_METRICS_PORT", "0")) or None
+
+# Salesforce session reuse and lookup cache
+SALESFORCE_POOL_SIZE = int(os.getenv("SALESFORCE_POOL_SIZE", "10"))
+SALESFORCE_SESSION_MAX_AGE_SECONDS = int(os.getenv("SALESFORCE_SESSION_MAX_AGE_SECONDS", "3600"))
+SALESFORCE_CACHE_TTL_SECONDS = int(os.getenv("SALESFORCE_CACHE_TTL_SECONDS", "300"))
+SALESFORCE_CACHE_MAX_ENTRIES = int(os.getenv("SALESFORCE_CACHE_MAX_ENTRIES", "10000"))
+# Cache invalidations are broadcast here so every process drops stale lookups (empty disables)
+SALESFORCE_CACHE_REDIS_URL = os.getenv("SALESFORCE_CACHE_REDIS_URL", REDIS_URL)
+# Callers wait at most this long for another thread's in-progress login
+SALESFORCE_LOGIN_TIMEOUT_SECONDS = float(os.getenv("SALESFORCE_LOGIN_TIMEOUT_SECONDS", "30"))
+
+# Notification outbox
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_BACKOFF_BASE_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_BASE_SECONDS", "1"))
+NOTIFICATION_BATCH_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_BATCH_WINDOW_SECONDS", "0.2"))
+NOTIFICATION_IDEMPOTENCY_TTL_SECONDS = int(os.getenv("NOTIFICATION_IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Notifications still queued or awaiting a retry at shutdown are saved here and re-queued on the next start
+NOTIFICATION_SPILL_PATH = os.getenv("NOTIFICATION_SPILL_PATH", "data/notifications.spill.jsonl")
+# Set to REDIS_URL to dedupe idempotency keys across processes
+NOTIFICATION_REDIS_URL = os.getenv("NOTIFICATION_REDIS_URL")
+
+# Salesforce webhook event log (batched Firestore writes, retried, then spilled to a local file)
+SALESFORCE_LOG_BATCH_SIZE = int(os.getenv("SALESFORCE_LOG_BATCH_SIZE", "500"))
+SALESFORCE_LOG_FLUSH_SECONDS = float(os.getenv("SALESFORCE_LOG_FLUSH_SECONDS", "1"))
+SALESFORCE_LOG_MAX_RETRIES = int(os.getenv("SALESFORCE_LOG_MAX_RETRIES", "4"))
+SALESFORCE_LOG_RETRY_BASE_SECONDS = float(os.getenv("SALESFORCE_LOG_RETRY_BASE_SECONDS", "0.5"))
+SALESFORCE_LOG_SPILL_PATH = os.getenv("SALESFORCE_LOG_SPILL_PATH", "data/salesforce_logs.spill.jsonl")
+SALESFORCE_NOTIFICATION_DEDUPE_TTL_SECONDS = int(os.getenv("SALESFORCE_NOTIFICATION_DEDUPE_TTL_SECONDS", "86400"))
+# Handled notification ids are shared here so every API process skips redeliveries
+SALESFORCE_NOTIFICATION_REDIS_URL = os.getenv("SALESFORCE_NOTIFICATION_REDIS_URL", REDIS_URL)
+
+# JWT revocation list and verified-token cache
+AUTH_REDIS_URL = os.getenv("AUTH_REDIS_URL", "redis://localhost:6379/0")
+TOKEN_REVOCATION_SYNC_SECONDS = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "30"))
+# Past this age the local revocation list isn't trusted and Redis is asked directly
+TOKEN_REVOCATION_STALE_SECONDS = float(os.getenv("TOKEN_REVOCATION_STALE_SECONDS", str(TOKEN_REVOCATION_SYNC_SECONDS * 3)))
+TOKEN_PAYLOAD_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_PAYLOAD_CACHE_TTL_SECONDS", "300"))
+TOKEN_PAYLOAD_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_PAYLOAD_CACHE_MAX_ENTRIES", "10000"))
+
+# Celery broker and chat task routing
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+# Comma-separated user ids whose chat tasks jump ahead within their queue
+CHAT_PRIORITY_TENANTS = {uid.strip() for uid in os.getenv("CHAT_PRIORITY_TENANTS", "").split(",") if uid.strip()}
+
+# Worker threads behind the chat pipeline's shared event loop (blocking client calls run there)
+CHAT_LOOP_EXECUTOR_THREADS = int(os.getenv("CHAT_LOOP_EXECUTOR_THREADS", "64"))
+
+# Prompt assembly token budget (system prompt + history + user turn + retrieved knowledge)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_MAX_CHUNK_TOKENS = int(os.getenv("CONTEXT_MAX_CHUNK_TOKENS", "800"))
+# Don't bother including a truncated fragment shorter than this
+CONTEXT_MIN_FRAGMENT_TOKENS = int(os.getenv("CONTEXT_MIN_FRAGMENT_TOKENS", "50"))
+
+# Retrieval: candidate pool, relevance cut-off (cosine), BM25 rerank weight and MMR diversity
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+# Hashed word vectors (EMBEDDINGS_PROVIDER=hash) score far lower than OpenAI embeddings for a good match
+RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.2" if EMBEDDINGS_PROVIDER == "hash" else "0.75"))
+RETRIEVAL_BM25_WEIGHT = float(os.getenv("RETRIEVAL_BM25_WEIGHT", "0.3"))
+# 1.0 ranks purely by relevance; lower values favour chunks unlike those already picked
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7"))
+
+# Local BM25 inverted index, built at ingestion and fused with vector hits (reciprocal-rank fusion)
+BM25_INDEX_ENABLED = os.getenv("BM25_INDEX_ENABLED", "true").lower() == "true"
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "data/bm25_index")
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+# Lexical hits scoring below this fraction of the best BM25 score are ignored
+RETRIEVAL_LEXICAL_MIN_RATIO = float(os.getenv("RETRIEVAL_LEXICAL_MIN_RATIO", "0.5"))
+# ...and below this absolute BM25 score (a few common words matching shouldn't count as relevant)
+RETRIEVAL_LEXICAL_MIN_SCORE = float(os.getenv("RETRIEVAL_LEXICAL_MIN_SCORE", "2.0"))
+
+# Coalescing of identical in-flight chat queries (one retrieval + completion, shared answer)
+CHAT_COALESCING_ENABLED = os.getenv("CHAT_COALESCING_ENABLED", "true").lower() == "true"
+# Set to REDIS_URL to coalesce across worker processes
+CHAT_COALESCING_REDIS_URL = os.getenv("CHAT_COALESCING_REDIS_URL")
+CHAT_COALESCING_LOCK_SECONDS = int(os.getenv("CHAT_COALESCING_LOCK_SECONDS", "60"))
+CHAT_COALESCING_RESULT_SECONDS = int(os.getenv("CHAT_COALESCING_RESULT_SECONDS", "10"))
+CHAT_COALESCING_WAIT_SECONDS = float(os.getenv("CHAT_COALESCING_WAIT_SECONDS", "45"))
+CHAT_COALESCING_POLL_SECONDS = float(os.getenv("CHAT_COALESCING_POLL_SECONDS", "0.05"))
+
+# Chat transcripts: batched Firestore writes off the task path, retried, then spilled to a local file
+CHAT_TRANSCRIPT_BATCH_SIZE = int(os.getenv("CHAT_TRANSCRIPT_BATCH_SIZE", "200"))
+CHAT_TRANSCRIPT_FLUSH_SECONDS = float(os.getenv("CHAT_TRANSCRIPT_FLUSH_SECONDS", "0.5"))
+CHAT_TRANSCRIPT_MAX_RETRIES = int(os.getenv("CHAT_TRANSCRIPT_MAX_RETRIES", "4"))
+CHAT_TRANSCRIPT_RETRY_BASE_SECONDS = float(os.getenv("CHAT_TRANSCRIPT_RETRY_BASE_SECONDS", "0.5"))
+CHAT_TRANSCRIPT_SPILL_PATH = os.getenv("CHAT_TRANSCRIPT_SPILL_PATH", "data/chat_transcripts.spill.jsonl")
+
+# Rolling conversation summary: prompts carry the summary plus the last CHAT_HISTORY_TURNS full turns
+CONVERSATION_SUMMARY_ENABLED = os.getenv("CONVERSATION_SUMMARY_ENABLED", "true").lower() == "true"
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "4"))
+# Aged-out turns are folded in this many at a time (keep TURNS + BATCH_TURNS <= CHAT_HISTORY_WINDOW)
+CONVERSATION_SUMMARY_BATCH_TURNS = int(os.getenv("CONVERSATION_SUMMARY_BATCH_TURNS", "2"))
+CONVERSATION_SUMMARY_MAX_TOKENS = int(os.getenv("CONVERSATION_SUMMARY_MAX_TOKENS", "250"))
+
+# Bulk export of chats / salesforce_logs (cursor-paginated, optionally partitioned reads)
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+EXPORT_PARTITIONS = int(os.getenv("EXPORT_PARTITIONS", "1"))
+# Comma-separated user ids allowed to export every user's data; everyone else only gets their own chats
+EXPORT_ADMIN_UIDS = {uid.strip() for uid in os.getenv("EXPORT_ADMIN_UIDS", "").split(",") if uid.strip()}
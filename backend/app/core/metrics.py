@@ -0,0 +1,97 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client import multiprocess
+
+# Latency buckets (seconds) covering sub-millisecond cache hits up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+CHAT_STAGE_SECONDS = Histogram(
+    "chat_stage_seconds", "Time spent in each chat pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "OpenAI tokens used", ["purpose", "kind"])
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+CELERY_QUEUE_WAIT_SECONDS = Histogram(
+    "celery_queue_wait_seconds", "Time between publishing a task and a worker starting it",
+    ["queue"], buckets=LATENCY_BUCKETS,
+)
+CELERY_QUEUE_DEPTH = Gauge(
+    "celery_queue_depth", "Tasks waiting in each Celery queue", ["queue"], multiprocess_mode="livemostrecent"
+)
+INTEGRATION_CALL_SECONDS = Histogram(
+    "integration_call_seconds", "Third-party API call latency", ["integration", "outcome"], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "API request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+
+def observe_stage(stage: str, seconds: float):
+    CHAT_STAGE_SECONDS.labels(stage).observe(seconds)
+
+@contextmanager
+def track_stage(stage: str):
+    """Times a block of the chat pipeline."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        CHAT_STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+def record_cache(cache: str, result: str):
+    """Counts a cache lookup; ``result`` is e.g. "hit", "miss" or "redis_hit"."""
+    CACHE_LOOKUPS.labels(cache, result).inc()
+
+def record_tokens(purpose: str, usage):
+    """Counts prompt/completion tokens from an OpenAI ``usage`` object."""
+    if usage is None:
+        return
+    LLM_TOKENS.labels(purpose, "prompt").inc(usage.prompt_tokens or 0)
+    LLM_TOKENS.labels(purpose, "completion").inc(usage.completion_tokens or 0)
+
+def track_integration(integration: str):
+    """Decorator timing a third-party API call.
+
+    Integrations report failures by returning ``{"status": "error"}`` as well as by raising.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = func(*args, **kwargs)
+                if not (isinstance(result, dict) and result.get("status") == "error"):
+                    outcome = "success"
+                return result
+            finally:
+                INTEGRATION_CALL_SECONDS.labels(integration, outcome).observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def _registry():
+    # With PROMETHEUS_MULTIPROC_DIR set (gunicorn/uvicorn workers, Celery prefork),
+    # every process writes its samples to that directory and we aggregate them here.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def metrics_payload():
+    """Returns (body, content_type) for a Prometheus scrape."""
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+def start_metrics_server(port: int):
+    """Serves /metrics from a background thread (used by Celery workers)."""
+    start_http_server(port, registry=_registry())
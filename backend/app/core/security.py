@@ -5,9 +5,21 @@ from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 import jwt
 import os
+import threading
+import time
+import uuid
+import logging
 from dotenv import load_dotenv
 from firebase_admin import auth
 import redis
+from backend.app.core.config import (
+    AUTH_REDIS_URL,
+    TOKEN_REVOCATION_SYNC_SECONDS,
+    TOKEN_REVOCATION_STALE_SECONDS,
+    TOKEN_PAYLOAD_CACHE_TTL_SECONDS,
+    TOKEN_PAYLOAD_CACHE_MAX_ENTRIES,
+)
+from backend.app.core.ttl_cache import TTLCache
 
 load_dotenv()
 
@@ -16,6 +28,9 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+REVOKED_SET_KEY = "auth:revoked"  # sorted set of revoked jti, scored by token expiry
+REVOCATION_CHANNEL = "auth:revocations"
+
 # OAuth2 scheme for authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
@@ -23,22 +38,135 @@ class TokenData(BaseModel):
     uid: Optional[str] = None
 
 # ✅ Initialize Redis (Ensure Redis is running)
-redis_client = redis.Redis(host="localhost", port=6379, db=0, decode_responses=True)
+redis_client = redis.Redis.from_url(AUTH_REDIS_URL, decode_responses=True)
+
+class RevocationCache:
+    """In-process copy of the revoked-token list, keyed by ``jti``.
+
+    Revocations are published on a Redis channel and every API process keeps
+    its own set, so checking a token needs no network call. A listener thread
+    applies published revocations as they arrive and reloads the full set
+    every ``sync_seconds`` (and after reconnecting) to cover missed messages.
+    Entries drop out once the token they revoke would have expired anyway.
+
+    The local set is only trusted once a full reload has succeeded and for
+    ``stale_seconds`` after the latest one. Otherwise each check asks Redis
+    directly, and fails closed if Redis can't answer.
+    """
+
+    def __init__(self, client: redis.Redis, sync_seconds: float, stale_seconds: float):
+        self._redis = client
+        self.sync_seconds = sync_seconds
+        self.stale_seconds = stale_seconds
+        self._revoked = {}  # jti -> exp timestamp
+        self._synced_at = None  # monotonic time of the last successful reload
+        self._lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            # Load once up front so a fresh process never accepts an already revoked token
+            self.resync()
+            self._thread = threading.Thread(target=self._listen, name="token-revocations", daemon=True)
+            self._thread.start()
+
+    def is_revoked(self, jti: str) -> bool:
+        self.start()
+        if not self.is_fresh():
+            return self._lookup(jti)
+        exp = self._revoked.get(jti)
+        return exp is not None and exp > time.time()
+
+    def is_fresh(self) -> bool:
+        synced_at = self._synced_at
+        return synced_at is not None and time.monotonic() - synced_at <= self.stale_seconds
+
+    def _lookup(self, jti: str) -> bool:
+        """Checks Redis directly, for when the local set can't be trusted."""
+        try:
+            exp = self._redis.zscore(REVOKED_SET_KEY, jti)
+        except redis.RedisError as e:
+            logging.error(f"Token revocation check failed and the local list is stale: {e}")
+            raise HTTPException(status_code=503, detail="Token revocation status unavailable")
+        if exp is None:
+            return False
+        self._add(jti, exp)
+        return exp > time.time()
+
+    def revoke(self, jti: str, exp: float):
+        """Revokes ``jti`` locally and for every other process."""
+        self._add(jti, exp)
+        pipe = self._redis.pipeline()
+        pipe.zadd(REVOKED_SET_KEY, {jti: exp})
+        pipe.publish(REVOCATION_CHANNEL, f"{jti}:{exp}")
+        pipe.execute()
+
+    def _add(self, jti: str, exp: float):
+        with self._lock:
+            self._revoked[jti] = exp
+
+    def resync(self):
+        now = time.time()
+        try:
+            pipe = self._redis.pipeline()
+            pipe.zremrangebyscore(REVOKED_SET_KEY, 0, now)
+            pipe.zrangebyscore(REVOKED_SET_KEY, now, "+inf", withscores=True)
+            _, entries = pipe.execute()
+        except redis.RedisError as e:
+            logging.warning(f"Token revocation sync failed: {e}")
+            return
+        with self._lock:
+            # Revocations are never undone, so keep local entries the snapshot may have raced with
+            revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            revoked.update(entries)
+            self._revoked = revoked
+            self._synced_at = time.monotonic()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                self.resync()
+                next_sync = time.monotonic() + self.sync_seconds
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message["type"] == "message":
+                        jti, _, exp = message["data"].rpartition(":")
+                        self._add(jti, float(exp))
+                    if time.monotonic() >= next_sync:
+                        self.resync()
+                        next_sync = time.monotonic() + self.sync_seconds
+            except redis.RedisError as e:
+                logging.warning(f"Token revocation listener disconnected, retrying: {e}")
+                time.sleep(5)
+
+revocation_cache = RevocationCache(redis_client, TOKEN_REVOCATION_SYNC_SECONDS, TOKEN_REVOCATION_STALE_SECONDS)
+
+# Recently verified tokens -> decoded payload, so repeat requests skip signature checks
+payload_cache = TTLCache(TOKEN_PAYLOAD_CACHE_TTL_SECONDS, TOKEN_PAYLOAD_CACHE_MAX_ENTRIES)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     """Generates a JWT access token."""
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc), "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def blacklist_token(token: str):
-    """Blacklists a token in Redis using its expiry timestamp."""
+    """Revokes a token until its expiry (by ``jti``, or the raw token for older tokens)."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         exp = payload.get("exp")
 
         if exp:
+            payload_cache.pop(token)
+            if payload.get("jti"):
+                revocation_cache.revoke(payload["jti"], exp)
+                return
             ttl = int(exp - datetime.now(timezone.utc).timestamp())
             if ttl > 0:
                 redis_client.setex(f"blacklist:{token}", ttl, "blacklisted")
@@ -48,23 +176,48 @@ def blacklist_token(token: str):
         pass  # Ignore if token is invalid
 
 def is_token_blacklisted(token: str) -> bool:
-    """Checks if a token is blacklisted in Redis."""
+    """Checks if a token issued without a ``jti`` is blacklisted in Redis."""
     return redis_client.exists(f"blacklist:{token}") == 1
 
-def verify_token(token: str = Depends(oauth2_scheme)):
-    """Verifies the token, ensures it's not expired, and checks if it's blacklisted."""
-    if is_token_blacklisted(token):
-        raise HTTPException(status_code=401, detail="Token has been revoked")
+def is_token_revoked(token: str, payload: dict) -> bool:
+    jti = payload.get("jti")
+    if jti:
+        return revocation_cache.is_revoked(jti)
+    # Tokens issued before jti was added still need the Redis lookup
+    return is_token_blacklisted(token)
 
+def decode_token(token: str) -> dict:
+    """Decodes and verifies a token, reusing the payload of recently verified tokens."""
+    payload = payload_cache.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        exp = payload.get("exp")
-
-        if exp and datetime.now(timezone.utc).timestamp() > exp:
-            raise HTTPException(status_code=401, detail="Token has expired")
-
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid token")
\ No newline at end of file
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    ttl = TOKEN_PAYLOAD_CACHE_TTL_SECONDS
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        payload_cache.set(token, payload, ttl_seconds=ttl)
+    return payload
+
+def verify_token(token: str = Depends(oauth2_scheme)):
+    """Verifies the token, ensures it's not expired, and checks if it's been revoked.
+
+    For tokens with a ``jti`` this needs no network call: the signature check
+    is cached per token and revocations are checked against the local copy.
+    """
+    payload = decode_token(token)
+    exp = payload.get("exp")
+
+    if exp and time.time() > exp:
+        raise HTTPException(status_code=401, detail="Token has expired")
+
+    if is_token_revoked(token, payload):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+
+    return payload
@@ -1,9 +1,27 @@
 import os
+import json
+import threading
+import time
+import uuid
+import logging
+import redis
 import requests
+from requests.adapters import HTTPAdapter
 from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import SalesforceExpiredSession
 from dotenv import load_dotenv
+from backend.app.core.metrics import track_integration
+from backend.app.core.ttl_cache import TTLCache
+from backend.app.core.config import (
+    SALESFORCE_POOL_SIZE,
+    SALESFORCE_SESSION_MAX_AGE_SECONDS,
+    SALESFORCE_CACHE_TTL_SECONDS,
+    SALESFORCE_CACHE_MAX_ENTRIES,
+    SALESFORCE_CACHE_REDIS_URL,
+    SALESFORCE_LOGIN_TIMEOUT_SECONDS,
+)
 from backend.app.integrations.sendgrid import send_email
-from backend.app.integrations.twillo import send_whatsapp
+from backend.app.services.notifications import notify_whatsapp
 
 load_dotenv()
 
@@ -17,55 +35,276 @@ AUTH_URL = os.getenv("SALESFORCE_AUTH_URL")
 SALESFORCE_ACCESS_TOKEN = os.getenv("SALESFORCE_ACCESS_TOKEN")
 WEBHOOK_URL = os.getenv('WEBHOOK_URL')
 
-def get_salesforce_instance():
-    """Authenticates and returns a Salesforce instance."""
+# Emails per SOQL "IN (...)" clause; keeps each query well under the 100k character limit
+SOQL_IN_CHUNK_SIZE = 200
+
+# Pooled HTTP session shared by every Salesforce call in this process
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(pool_connections=SALESFORCE_POOL_SIZE, pool_maxsize=SALESFORCE_POOL_SIZE))
+
+_sf = None
+_sf_logged_in_at = 0.0
+_sf_lock = threading.Lock()  # guards _sf and _sf_logged_in_at; never held across network calls
+_sf_login_lock = threading.Lock()  # one login at a time
+
+# Lookup caches keyed by lowercased email. Case updates from the webhook
+# invalidate cached cases through the case id -> email index.
+contact_cache = TTLCache(SALESFORCE_CACHE_TTL_SECONDS, SALESFORCE_CACHE_MAX_ENTRIES)
+case_cache = TTLCache(SALESFORCE_CACHE_TTL_SECONDS, SALESFORCE_CACHE_MAX_ENTRIES)
+_case_emails = TTLCache(SALESFORCE_CACHE_TTL_SECONDS, SALESFORCE_CACHE_MAX_ENTRIES * 10)
+
+# Invalidations are published so the process that cached a customer's cases
+# drops them even when another process receives the webhook
+INVALIDATION_CHANNEL = "salesforce:cache-invalidations"
+_redis = redis.Redis.from_url(SALESFORCE_CACHE_REDIS_URL, decode_responses=True) if SALESFORCE_CACHE_REDIS_URL else None
+_instance_id = uuid.uuid4().hex
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+@track_integration("salesforce_login")
+def _login():
+    return Salesforce(
+        username=USERNAME,
+        password=PASSWORD,
+        security_token=SECURITY_TOKEN,
+        client_id=CLIENT_ID,
+        session=_http_session,
+    )
+
+def get_salesforce_instance(force_refresh: bool = False):
+    """Returns the cached Salesforce instance, logging in only when needed.
+
+    The login runs outside ``_sf_lock``, so callers with a usable session
+    never wait on it. Concurrent callers that need a new session wait (up to
+    SALESFORCE_LOGIN_TIMEOUT_SECONDS) for the one login in progress and reuse it.
+    """
+    global _sf, _sf_logged_in_at
+    with _sf_lock:
+        session_age = time.monotonic() - _sf_logged_in_at
+        if _sf is not None and not force_refresh and session_age <= SALESFORCE_SESSION_MAX_AGE_SECONDS:
+            return _sf
+        seen_login = _sf_logged_in_at
+
+    if not _sf_login_lock.acquire(timeout=SALESFORCE_LOGIN_TIMEOUT_SECONDS):
+        return {"error": "Timed out waiting for Salesforce login"}
     try:
-        sf = Salesforce(
-            username=USERNAME,
-            password=PASSWORD,
-            security_token=SECURITY_TOKEN,
-            client_id=CLIENT_ID
-        )
+        with _sf_lock:
+            if _sf is not None and _sf_logged_in_at != seen_login:
+                return _sf  # another thread logged in while we waited
+        try:
+            sf = _login()
+        except Exception as e:
+            with _sf_lock:
+                _sf = None
+            return {"error": str(e)}
+        with _sf_lock:
+            _sf = sf
+            _sf_logged_in_at = time.monotonic()
         return sf
-    except Exception as e:
-        return {"error": str(e)}
+    finally:
+        _sf_login_lock.release()
 
-def get_customer_details(email):
-    """Fetch customer details from Salesforce by email."""
+def with_salesforce(operation):
+    """Runs ``operation(sf)``, logging in again once if the session has expired."""
     sf = get_salesforce_instance()
     if isinstance(sf, dict) and "error" in sf:
         return sf
+    try:
+        return operation(sf)
+    except SalesforceExpiredSession:
+        logging.info("Salesforce session expired, logging in again.")
+        sf = get_salesforce_instance(force_refresh=True)
+        if isinstance(sf, dict) and "error" in sf:
+            return sf
+        return operation(sf)
+
+def invalidate_customer_cache(email=None, case_id=None):
+    """Drops cached lookups for ``email`` and the cached cases of whoever owns ``case_id``, in every process."""
+    _invalidate_local(email, case_id)
+    if _redis is None:
+        return
+    try:
+        _redis.publish(INVALIDATION_CHANNEL, json.dumps({"origin": _origin(), "email": email, "case_id": case_id}))
+    except redis.RedisError as e:
+        logging.warning(f"Salesforce cache invalidation publish failed: {e}")
+
+def _origin() -> str:
+    # Forked workers share _instance_id, so the pid tells them apart
+    return f"{_instance_id}:{os.getpid()}"
+
+def _invalidate_local(email=None, case_id=None):
+    if case_id is not None:
+        # Only finds the owner of cases this process has looked up; callers that
+        # know the contact's email (the webhook does) pass it too, so a case
+        # created since the owner's list was cached is covered as well
+        owner = _case_emails.pop(case_id)
+        if owner is not None:
+            case_cache.pop(owner)
+    if email is not None:
+        contact_cache.pop(email.lower())
+        case_cache.pop(email.lower())
+
+def _start_invalidation_listener():
+    """Starts this process's invalidation subscriber (once per process, so forks get their own)."""
+    global _listener_pid
+    if _redis is None or _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        threading.Thread(target=_listen_for_invalidations, name="salesforce-invalidations", daemon=True).start()
 
-    query = f"SELECT Id, Name, Email, Phone FROM Contact WHERE Email = '{email}'"
-    result = sf.query(query)
+def _listen_for_invalidations():
+    while True:
+        try:
+            pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            # Invalidations published while we weren't subscribed are lost; start clean
+            contact_cache.clear()
+            case_cache.clear()
+            for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except ValueError:
+                    logging.warning(f"Ignoring malformed Salesforce cache invalidation: {message['data']!r}")
+                    continue
+                if event.get("origin") != _origin():
+                    _invalidate_local(event.get("email"), event.get("case_id"))
+        except redis.RedisError as e:
+            logging.warning(f"Salesforce cache invalidation listener disconnected, retrying: {e}")
+            time.sleep(5)
+
+def soql_quote(value: str) -> str:
+    """Quotes a string literal for SOQL, escaping backslashes and quotes."""
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+def _cached_lookup(cache, email, query_records):
+    """Serves ``email`` from ``cache`` or runs ``query_records`` and caches the result."""
+    _start_invalidation_listener()
+    key = email.lower()
+    records = cache.get(key)
+    if records is None:
+        records = query_records(email)
+        if isinstance(records, dict) and "error" in records:
+            return records  # errors are never cached
+        cache.set(key, records)
+    return records
+
+@track_integration("salesforce_query")
+def _query_customer_details(email):
+    query = f"SELECT Id, Name, Email, Phone FROM Contact WHERE Email = {soql_quote(email)}"
+    result = with_salesforce(lambda sf: sf.query(query))
+    if "error" in result:
+        return result
     return result.get("records", [])
 
+@track_integration("salesforce_query")
+def _query_customer_cases(email):
+    query = f"""
+    SELECT Id, Subject, Status, Description
+    FROM Case WHERE Contact.Email = {soql_quote(email)}
+    """
+    result = with_salesforce(lambda sf: sf.query(query))
+    if "error" in result:
+        return result
+    records = result.get("records", [])
+    for record in records:
+        _case_emails.set(record["Id"], email.lower())
+    return records
+
+def get_customer_details(email):
+    """Fetch customer details from Salesforce by email."""
+    return _cached_lookup(contact_cache, email, _query_customer_details)
+
 def get_customer_cases(email):
     """Fetch customer support cases from Salesforce."""
-    sf = get_salesforce_instance()
-    if isinstance(sf, dict) and "error" in sf:
-        return sf
+    return _cached_lookup(case_cache, email, _query_customer_cases)
 
-    query = f"""
-    SELECT Id, Subject, Status, Description
-    FROM Case WHERE Contact.Email = '{email}'
+@track_integration("salesforce_query")
+def _query_grouped_by_email(query, email_of):
+    """Streams a query through queryMore pages, grouping records by lowercased email."""
+    def run(sf):
+        grouped = {}
+        for record in sf.query_all_iter(query):
+            email = email_of(record)
+            if email:
+                grouped.setdefault(email.lower(), []).append(record)
+        return grouped
+    return with_salesforce(run)
+
+def _bulk_lookup(emails, cache, build_query, email_of, on_records=None):
+    """Resolves many emails with chunked IN queries, serving cached emails locally.
+
+    Returns ``{email: records}`` keyed by the emails as given, or an error dict.
     """
-    result = sf.query(query)
-    return result.get("records", [])
+    _start_invalidation_listener()
+    results = {}
+    missing = []
+    for email in dict.fromkeys(emails):
+        records = cache.get(email.lower())
+        if records is None:
+            missing.append(email)
+        else:
+            results[email] = records
+
+    missing_keys = list(dict.fromkeys(email.lower() for email in missing))
+    for start in range(0, len(missing_keys), SOQL_IN_CHUNK_SIZE):
+        chunk = missing_keys[start:start + SOQL_IN_CHUNK_SIZE]
+        in_clause = ", ".join(soql_quote(email) for email in chunk)
+        grouped = _query_grouped_by_email(build_query(in_clause), email_of)
+        if "error" in grouped:  # keys are otherwise lowercased emails
+            return grouped
+        for key in chunk:
+            records = grouped.get(key, [])
+            cache.set(key, records)
+            if on_records:
+                on_records(key, records)
+
+    for email in missing:
+        results[email] = cache.get(email.lower(), [])
+    return results
+
+def _remember_case_owners(email, records):
+    for record in records:
+        _case_emails.set(record["Id"], email)
 
+def get_customers_details_bulk(emails):
+    """Fetch contacts for many emails at once, keyed by email."""
+    return _bulk_lookup(
+        emails,
+        contact_cache,
+        lambda in_clause: f"SELECT Id, Name, Email, Phone FROM Contact WHERE Email IN ({in_clause})",
+        lambda record: record.get("Email"),
+    )
+
+def get_customers_cases_bulk(emails):
+    """Fetch support cases for many emails at once, keyed by email."""
+    return _bulk_lookup(
+        emails,
+        case_cache,
+        lambda in_clause: (
+            "SELECT Id, Subject, Status, Description, Contact.Email "
+            f"FROM Case WHERE Contact.Email IN ({in_clause})"
+        ),
+        lambda record: (record.get("Contact") or {}).get("Email"),
+        on_records=_remember_case_owners,
+    )
+
+@track_integration("salesforce_create_case")
 def create_salesforce_ticket(email, subject, description, phone_number):
     """Creates a new support case in Salesforce and sends WhatsApp confirmation."""
-    sf = get_salesforce_instance()
-    if isinstance(sf, dict) and "error" in sf:
-        return sf
+    contacts = get_customer_details(email)
+    if isinstance(contacts, dict) and "error" in contacts:
+        return contacts
 
-    query = f"SELECT Id FROM Contact WHERE Email = '{email}' LIMIT 1"
-    result = sf.query(query)
-    
-    if not result["records"]:
+    if not contacts:
         return {"error": "Customer not found"}
 
-    contact_id = result["records"][0]["Id"]
+    contact_id = contacts[0]["Id"]
 
     new_case = {
         "Subject": subject,
@@ -75,10 +314,14 @@ def create_salesforce_ticket(email, subject, description, phone_number):
         "ContactId": contact_id
     }
 
-    case_result = sf.Case.create(new_case)
+    case_result = with_salesforce(lambda sf: sf.Case.create(new_case))
+    if "error" in case_result:
+        return case_result
+    invalidate_customer_cache(email=email)
 
     # **Send WhatsApp confirmation to customer**
-    send_whatsapp(phone_number, f"Your support ticket '{subject}' has been created!")
+    notify_whatsapp(phone_number, f"Your support ticket '{subject}' has been created!",
+                    idempotency_key=f"case-created:{case_result.get('id')}")
 
     return {"case_id": case_result.get("id"), "message": "Case created successfully"}
 
@@ -2,6 +2,7 @@ import os
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from dotenv import load_dotenv
+from backend.app.core.metrics import track_integration
 
 load_dotenv()
 
@@ -9,6 +10,10 @@ load_dotenv()
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
 
+# Reused for every send instead of building a client per email
+sg = SendGridAPIClient(SENDGRID_API_KEY)
+
+@track_integration("sendgrid")
 def send_email(to_email, subject, message):
     """Sends an email via SendGrid."""
     try:
@@ -18,8 +23,23 @@ def send_email(to_email, subject, message):
             subject=subject,
             plain_text_content=message
         )
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
         response = sg.send(email)
         return {"status": "success", "status_code": response.status_code}
     except Exception as e:
-        return {"status": "error", "detail": str(e)}
\ No newline at end of file
+        return {"status": "error", "detail": str(e)}
+
+@track_integration("sendgrid")
+def send_bulk_email(to_emails, subject, message):
+    """Sends the same email to several recipients in one API call (one personalization each)."""
+    try:
+        email = Mail(
+            from_email=SENDGRID_FROM_EMAIL,
+            to_emails=list(to_emails),
+            subject=subject,
+            plain_text_content=message,
+            is_multiple=True,
+        )
+        response = sg.send(email)
+        return {"status": "success", "status_code": response.status_code}
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
@@ -2,6 +2,7 @@ import os
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
+from backend.app.core.metrics import track_integration
 
 load_dotenv()
 
@@ -11,11 +12,12 @@ SLACK_CHANNEL_ID = os.getenv("SLACK_CHANNEL_ID")
 
 client = WebClient(token=SLACK_BOT_TOKEN)
 
-def send_slack_message(message):
+@track_integration("slack")
+def send_slack_message(message, channel=None):
     """Sends a message to a Slack channel."""
     try:
         response = client.chat_postMessage(
-            channel=SLACK_CHANNEL_ID,
+            channel=channel or SLACK_CHANNEL_ID,
             text=message
         )
         return {"status": "success", "message_id": response["ts"]}
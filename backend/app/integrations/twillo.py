@@ -1,6 +1,7 @@
 import os
 from twilio.rest import Client
 from dotenv import load_dotenv
+from backend.app.core.metrics import track_integration
 
 load_dotenv()
 
@@ -12,6 +13,7 @@ TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")
 
 client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
+@track_integration("twilio_sms")
 def send_sms(to, message):
     """Sends an SMS using Twilio."""
     response = client.messages.create(
@@ -21,6 +23,7 @@ def send_sms(to, message):
     )
     return {"message_id": response.sid, "status": response.status}
 
+@track_integration("twilio_whatsapp")
 def send_whatsapp(to, message):
     """Sends a WhatsApp message using Twilio."""
     response = client.messages.create(
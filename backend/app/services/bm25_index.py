@@ -0,0 +1,215 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from typing import List, Optional
+import numpy as np
+from backend.app.core.config import BM25_INDEX_ENABLED, BM25_INDEX_PATH
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+VOCAB_FILE = "vocab.json"
+OFFSETS_FILE = "term_offsets.npy"
+POSTING_DOCS_FILE = "posting_docs.npy"
+POSTING_FREQS_FILE = "posting_freqs.npy"
+DOC_LENGTHS_FILE = "doc_lengths.npy"
+DOCS_FILE = "docs.jsonl"
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i",
+    "in", "is", "it", "my", "of", "on", "or", "the", "to", "was", "what", "when", "where", "which",
+    "why", "with", "you", "your",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without stopwords, shared by the BM25 scorers."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """Inverted index over knowledge-base chunks for exact-token queries.
+
+    Postings are stored CSR-style: ``term_offsets[t]:term_offsets[t + 1]``
+    slices the int32 document numbers and uint16 term frequencies of term
+    ``t``. The arrays are saved as ``.npy`` and memory-mapped on load, so
+    opening the index costs little more than reading the vocabulary.
+    Chunks added with ``add`` are held in memory until ``save`` merges them.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._vocab = {}  # term -> term number
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._posting_docs = np.zeros(0, dtype=np.int32)
+        self._posting_freqs = np.zeros(0, dtype=np.uint16)
+        self._doc_lengths = np.zeros(0, dtype=np.int32)
+        self._docs: List[dict] = []  # id, text, metadata per document number
+        self._doc_ids = {}
+        self._pending = {}  # term -> (array of doc numbers, array of freqs)
+        self._pending_lengths = array("i")
+        self._lock = threading.Lock()
+        if path and os.path.exists(os.path.join(path, VOCAB_FILE)):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_ids
+
+    # Persistence
+    def load(self):
+        with open(os.path.join(self.path, VOCAB_FILE)) as f:
+            self._vocab = {term: i for i, term in enumerate(json.load(f))}
+        self._offsets = np.load(os.path.join(self.path, OFFSETS_FILE), mmap_mode="r")
+        self._posting_docs = np.load(os.path.join(self.path, POSTING_DOCS_FILE), mmap_mode="r")
+        self._posting_freqs = np.load(os.path.join(self.path, POSTING_FREQS_FILE), mmap_mode="r")
+        self._doc_lengths = np.load(os.path.join(self.path, DOC_LENGTHS_FILE))
+        with open(os.path.join(self.path, DOCS_FILE)) as f:
+            self._docs = [json.loads(line) for line in f]
+        self._doc_ids = {doc["id"]: i for i, doc in enumerate(self._docs)}
+
+    def save(self, path: Optional[str] = None):
+        """Merges pending chunks into the postings arrays and writes them atomically."""
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            self._merge_pending()
+            terms = sorted(self._vocab, key=self._vocab.get)
+            for name, data in ((OFFSETS_FILE, self._offsets), (POSTING_DOCS_FILE, self._posting_docs),
+                               (POSTING_FREQS_FILE, self._posting_freqs), (DOC_LENGTHS_FILE, self._doc_lengths)):
+                np.save(os.path.join(path, name + ".tmp.npy"), np.ascontiguousarray(data))
+            with open(os.path.join(path, DOCS_FILE + ".tmp"), "w") as f:
+                for doc in self._docs:
+                    f.write(json.dumps(doc) + "\n")
+            with open(os.path.join(path, VOCAB_FILE + ".tmp"), "w") as f:
+                json.dump(terms, f)
+            for name in (OFFSETS_FILE, POSTING_DOCS_FILE, POSTING_FREQS_FILE, DOC_LENGTHS_FILE):
+                os.replace(os.path.join(path, name + ".tmp.npy"), os.path.join(path, name))
+            os.replace(os.path.join(path, DOCS_FILE + ".tmp"), os.path.join(path, DOCS_FILE))
+            # The vocabulary goes last: load() only starts once it exists
+            os.replace(os.path.join(path, VOCAB_FILE + ".tmp"), os.path.join(path, VOCAB_FILE))
+
+    # Writes
+    def add(self, doc_id: str, text: str, metadata: Optional[dict] = None) -> bool:
+        """Indexes a chunk; returns False if ``doc_id`` is already indexed."""
+        tokens = tokenize(text)
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        with self._lock:
+            if doc_id in self._doc_ids:
+                return False
+            doc_number = len(self._docs)
+            self._doc_ids[doc_id] = doc_number
+            self._docs.append({"id": doc_id, "text": text, "metadata": metadata or {}})
+            self._pending_lengths.append(len(tokens))
+            for term, count in frequencies.items():
+                docs, freqs = self._pending.setdefault(term, (array("i"), array("H")))
+                docs.append(doc_number)
+                freqs.append(min(count, 65535))
+        return True
+
+    def _merge_pending(self):
+        """Rebuilds the CSR arrays with pending postings appended. Caller holds the lock."""
+        if not self._pending and not self._pending_lengths:
+            return
+        for term in self._pending:
+            self._vocab.setdefault(term, len(self._vocab))
+        term_count = len(self._vocab)
+        existing_counts = np.diff(np.asarray(self._offsets))
+        counts = np.zeros(term_count, dtype=np.int64)
+        counts[:len(existing_counts)] = existing_counts
+        for term, (docs, _) in self._pending.items():
+            counts[self._vocab[term]] += len(docs)
+
+        offsets = np.zeros(term_count + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        posting_docs = np.empty(offsets[-1], dtype=np.int32)
+        posting_freqs = np.empty(offsets[-1], dtype=np.uint16)
+        for term_number in range(len(existing_counts)):
+            start, end = self._offsets[term_number], self._offsets[term_number + 1]
+            target = offsets[term_number]
+            posting_docs[target:target + end - start] = self._posting_docs[start:end]
+            posting_freqs[target:target + end - start] = self._posting_freqs[start:end]
+        for term, (docs, freqs) in self._pending.items():
+            term_number = self._vocab[term]
+            existing = existing_counts[term_number] if term_number < len(existing_counts) else 0
+            target = offsets[term_number] + existing
+            posting_docs[target:target + len(docs)] = np.frombuffer(docs, dtype=np.int32)
+            posting_freqs[target:target + len(freqs)] = np.frombuffer(freqs, dtype=np.uint16)
+
+        self._offsets, self._posting_docs, self._posting_freqs = offsets, posting_docs, posting_freqs
+        self._doc_lengths = np.concatenate([self._doc_lengths, np.frombuffer(self._pending_lengths, dtype=np.int32)])
+        self._pending = {}
+        self._pending_lengths = array("i")
+
+    # Search
+    def search(self, query: str, k: int = 10) -> List[dict]:
+        """Top ``k`` chunks by BM25, as dicts with id, text, metadata and score."""
+        doc_count = len(self._doc_lengths)
+        if not doc_count:
+            return []
+        scores = np.zeros(doc_count, dtype=np.float32)
+        average_length = max(float(self._doc_lengths.mean()), 1.0)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths / average_length)
+        for term in set(tokenize(query)):
+            term_number = self._vocab.get(term)
+            if term_number is None or term_number + 1 >= len(self._offsets):
+                continue
+            start, end = self._offsets[term_number], self._offsets[term_number + 1]
+            if start == end:
+                continue
+            docs = np.asarray(self._posting_docs[start:end])
+            freqs = np.asarray(self._posting_freqs[start:end], dtype=np.float32)
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * freqs * (BM25_K1 + 1) / (freqs + length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [{**self._docs[row], "score": float(scores[row])} for row in top]
+
+_index = None
+_index_version = None  # identity of the vocabulary file _index was loaded from
+_index_lock = threading.Lock()
+
+def _on_disk_version(path: str) -> Optional[tuple]:
+    """Changes whenever ``save`` rewrites the index (the vocabulary is replaced last); None if not built."""
+    try:
+        stat = os.stat(os.path.join(path, VOCAB_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def get_bm25_index() -> Optional[BM25Index]:
+    """Returns the shared on-disk index, or None when disabled or not built yet.
+
+    The index is reloaded once ingestion saves a new one, so a process that
+    started before the first build (or a rebuild) doesn't keep serving the old one.
+    """
+    global _index, _index_version
+    if not BM25_INDEX_ENABLED:
+        return None
+    version = _on_disk_version(BM25_INDEX_PATH)
+    if version is None:
+        return None
+    if version != _index_version:
+        with _index_lock:
+            if version != _index_version:
+                index = BM25Index(BM25_INDEX_PATH)
+                # Rebuilt again while loading: keep the previous index and retry on the next call
+                if _on_disk_version(BM25_INDEX_PATH) == version:
+                    _index, _index_version = index, version
+                    logging.info(f"BM25 index loaded: {len(index)} chunks from {BM25_INDEX_PATH}")
+                elif _index is None:
+                    return None
+    return _index if len(_index) else None
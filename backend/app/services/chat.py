@@ -1,22 +1,77 @@
 from datetime import datetime, timezone
-from typing import TypedDict, List, Union
-from openai import OpenAI
+from typing import AsyncIterator, TypedDict, List, Optional, Tuple, Union
+from openai import AsyncOpenAI, OpenAI
+import asyncio
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, END
 from celery import Celery
+from kombu import Queue
+from celery.signals import (
+    before_task_publish, task_prerun, worker_init, worker_process_init, worker_shutdown, worker_process_shutdown
+)
 from backend.app.core.firebase import db
 from backend.app.integrations.salesforce import create_salesforce_ticket
 from backend.app.integrations.slack import send_slack_message
 import time
+import json
 import logging
-from backend.app.services.vector_store_pinecone import get_pinecone_vectorstore
+from backend.app.services.vector_store import get_vectorstore, get_embeddings
+from backend.app.services.semantic_cache import semantic_cache
+from backend.app.services.conversation_store import get_recent_chats, backfill_chats, append_chat
+from backend.app.services.classifier import CATEGORIES, classify_locally
+from backend.app.services.context_builder import build_context, count_tokens
+from backend.app.services.retrieval import retrieve, is_lexical_query
+from backend.app.services.coalescing import chat_flights, coalescing_key
+from backend.app.services.firestore_writer import BatchedFirestoreWriter
+from backend.app.services.conversation_summary import get_summary, refresh_summary, unsummarised_chats
+from backend.app.core.config import (
+    CLASSIFICATION_MODE,
+    LOCAL_CLASSIFIER_ENABLED,
+    ASYNC_CHAT_PIPELINE,
+    CHAT_HISTORY_WINDOW,
+    CELERY_METRICS_PORT,
+    CELERY_BROKER_URL,
+    CELERY_RESULT_BACKEND,
+    CHAT_LOOP_EXECUTOR_THREADS,
+    CHAT_TRANSCRIPT_BATCH_SIZE,
+    CHAT_TRANSCRIPT_FLUSH_SECONDS,
+    CHAT_TRANSCRIPT_MAX_RETRIES,
+    CHAT_TRANSCRIPT_RETRY_BASE_SECONDS,
+    CHAT_TRANSCRIPT_SPILL_PATH,
+    CONVERSATION_SUMMARY_ENABLED,
+)
+from backend.app.core.async_runner import BackgroundLoop
+from backend.app.services.routing import CHAT_QUEUES, DEFAULT_CHAT_QUEUE, DEFAULT_PRIORITY, PRIORITY_STEPS, PRIORITY_SEP
+from backend.app.core.metrics import observe_stage, track_stage, record_cache, record_tokens, start_metrics_server, CELERY_QUEUE_WAIT_SECONDS
 
 # Set up OpenAI API key from environment variable
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Define your model name for OpenAI
 MODEL_NAME = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are a helpful support assistant."
+
+# Shared event loop for the async pipeline, so thread-pool workers can run many chats per process
+chat_loop = BackgroundLoop(CHAT_LOOP_EXECUTOR_THREADS)
+
+# Conversation summaries are refreshed off the task path
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+_summary_pending = set()
+_summary_lock = threading.Lock()
+
+# Chat transcripts are written to Firestore in batches, so task completion doesn't wait on them
+transcript_writer = BatchedFirestoreWriter(
+    "chats",
+    batch_size=CHAT_TRANSCRIPT_BATCH_SIZE,
+    flush_seconds=CHAT_TRANSCRIPT_FLUSH_SECONDS,
+    max_retries=CHAT_TRANSCRIPT_MAX_RETRIES,
+    retry_base_seconds=CHAT_TRANSCRIPT_RETRY_BASE_SECONDS,
+    spill_path=CHAT_TRANSCRIPT_SPILL_PATH,
+)
 
 # Configure Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -31,18 +86,78 @@ class ChatState(TypedDict):
 # Initialize Celery Worker
 celery_app = Celery(
     "tasks",
-    broker="redis://redis:6379/0",
-    backend="redis://redis:6379/0",
+    broker=CELERY_BROKER_URL,
+    backend=CELERY_RESULT_BACKEND,
     include=["backend.app.services.chat"]
 )
 
 celery_app.conf.update(
     task_track_started=True,
-    result_backend="redis://redis:6379/0",
+    result_backend=CELERY_RESULT_BACKEND,
     result_extended=True,
     broker_connection_retry_on_startup=True,
+    # Per-category queues (chosen per task by routing.route_chat) with priorities inside each
+    task_queues=[Queue(name) for name in CHAT_QUEUES.values()],
+    task_default_queue=DEFAULT_CHAT_QUEUE,
+    task_default_priority=DEFAULT_PRIORITY,
+    broker_transport_options={
+        "queue_order_strategy": "priority",
+        "priority_steps": PRIORITY_STEPS,
+        "sep": PRIORITY_SEP,
+    },
+    # Chat turns are long and I/O bound: don't let one worker reserve tasks
+    # that an idle worker could start now
+    worker_prefetch_multiplier=1,
 )
 
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    """Records when a task was published so workers can measure queue wait."""
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+
+@task_prerun.connect
+def observe_queue_wait(task=None, **kwargs):
+    request = task.request
+    enqueued_at = getattr(request, "enqueued_at", None) or (request.headers or {}).get("enqueued_at")
+    if enqueued_at:
+        queue = (request.delivery_info or {}).get("routing_key") or "default"
+        CELERY_QUEUE_WAIT_SECONDS.labels(queue).observe(max(time.time() - enqueued_at, 0))
+
+def _is_prefork(worker) -> bool:
+    pool_cls = getattr(worker, "pool_cls", None)
+    name = pool_cls if isinstance(pool_cls, str) else getattr(pool_cls, "__module__", "")
+    return "prefork" in (name or "prefork")
+
+def _warm_vectorstore():
+    try:
+        get_vectorstore()
+        logging.info("Vector store initialised for worker.")
+    except Exception as e:
+        logging.error(f"Vector store initialisation failed, will retry on first query: {e}")
+
+@worker_init.connect
+def init_worker_metrics(sender=None, **kwargs):
+    """Exposes the worker's metrics for scraping (the API serves its own on /metrics)."""
+    if CELERY_METRICS_PORT:
+        start_metrics_server(CELERY_METRICS_PORT)
+    # Thread/gevent pools run tasks in this process and never send worker_process_init.
+    # Module-level clients (OpenAI, Firestore, Pinecone, embeddings) are thread-safe and
+    # shared by every task in the process.
+    if not _is_prefork(sender):
+        _warm_vectorstore()
+
+@worker_process_init.connect
+def init_vectorstore(**kwargs):
+    """Initialises the vector store once per worker process instead of on every query."""
+    _warm_vectorstore()
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def flush_transcripts(**kwargs):
+    """Commits (or spills) queued chat transcripts before the worker exits."""
+    transcript_writer.stop()
+
 # Format Messages for OpenAI API (same structure as before)
 def format_message(message):
     """Formats messages for the OpenAI API."""
@@ -67,43 +182,125 @@ You are a customer support assistant. Classify the following query into one of t
 Query: "{message}"
 Reply with only one word: billing, technical, general, or escalation.
     """
-    response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[{"role": "system", "content": classification_prompt}]
-    )
+    with track_stage("classification"):
+        response = client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=[{"role": "system", "content": classification_prompt}]
+        )
+    record_tokens("classification", response.usage)
     return response.choices[0].message.content.strip().lower()
 
-# Fetch Chat History
-def fetch_chat_history(user_id: str) -> List[Union[HumanMessage, AIMessage]]:
-    chats = (
-        db.collection("chats")
-        .where("user_id", "==", user_id)
-        .order_by("timestamp", direction="DESCENDING")
-        .limit(10)
-        .stream()
-    )
-    return [
-        HumanMessage(content=chat.to_dict()["message"]) if i % 2 == 0 
-        else AIMessage(content=chat.to_dict()["response"])
-        for i, chat in enumerate(chats)
-    ]
+def classify_fast(message: str) -> str:
+    """Uses the local keyword classifier when enabled, falling back to the LLM."""
+    if LOCAL_CLASSIFIER_ENABLED:
+        category = classify_locally(message)
+        if category:
+            return category
+    return classify_query(message)
+
+COMBINED_INSTRUCTIONS = """
+Reply with a JSON object with two keys:
+- "answer": your reply to the customer's latest message
+- "category": one of "billing" (payments, invoices, refunds), "technical" (login issues, bugs, system errors), "general" (simple questions answered directly) or "escalation" (unclear or needs human intervention)
+"""
+
+# Generate the answer and its category
+def generate_answer(messages: list, query: str, mode: str = CLASSIFICATION_MODE,
+                    use_local: bool = LOCAL_CLASSIFIER_ENABLED) -> tuple:
+    """Returns (response_text, category) using the configured classification mode."""
+    category = classify_locally(query) if use_local else None
+    formatted = [format_message(m) for m in messages]
+
+    if mode == "combined" and category is None:
+        ai_response = client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=formatted + [{"role": "system", "content": COMBINED_INSTRUCTIONS}],
+            response_format={"type": "json_object"},
+        )
+        record_tokens("answer", ai_response.usage)
+        content = ai_response.choices[0].message.content if ai_response.choices else ""
+        try:
+            parsed = json.loads(content or "{}")
+            response_text = str(parsed.get("answer", ""))
+            category = str(parsed.get("category", "")).strip().lower()
+        except (json.JSONDecodeError, AttributeError):
+            logging.warning("Combined completion returned invalid JSON, using raw text.")
+            response_text = content or ""
+        if category not in CATEGORIES:
+            category = classify_query(query)
+        return response_text or "No response generated", category
+
+    ai_response = client.chat.completions.create(model=MODEL_NAME, messages=formatted)
+    record_tokens("answer", ai_response.usage)
+    response_text = ai_response.choices[0].message.content if ai_response.choices else "No response generated"
+    if category is None:
+        category = classify_query(query)
+    return response_text, category
 
-# Check Cached Response
-def check_cached_response(user_id: str, message: str) -> Union[str, None]:
-    """Checks if a similar query was already answered recently and counts occurrences."""
-    cached_chats = (
-        db.collection("chats")
-        .where("user_id", "==", user_id)
-        .order_by("timestamp", direction="DESCENDING")
-        .limit(5)
-        .stream()
-    )
+# Fetch Recent Chats (one Firestore read shared by the cache check and history)
+def fetch_recent_chats(user_id: str, limit: int = 10) -> List[dict]:
+    """Returns the user's most recent chat records, newest first.
 
+    Served from the Redis conversation window; Firestore is only queried (and
+    the window backfilled) on a miss or when more than the window is asked for.
+    """
+    with track_stage("history_fetch"):
+        if limit <= CHAT_HISTORY_WINDOW:
+            cached = get_recent_chats(user_id, limit)
+            record_cache("conversation", "miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+
+        chats = (
+            db.collection("chats")
+            .where("user_id", "==", user_id)
+            .order_by("timestamp", direction="DESCENDING")
+            .limit(max(limit, CHAT_HISTORY_WINDOW))
+            .stream()
+        )
+        records = [chat.to_dict() for chat in chats]
+        backfill_chats(user_id, records)
+        return records[:limit]
+
+def history_from_chats(chats: List[dict]) -> List[Union[HumanMessage, AIMessage]]:
+    """Converts chat records (newest first) into chronological messages, carrying their stored token counts.
+
+    Each record is one exchange, so it becomes a user message followed by
+    the assistant's reply.
+    """
+    messages = []
+    for chat in reversed(chats):
+        messages.append(HumanMessage(content=chat["message"], additional_kwargs={"tokens": chat.get("message_tokens")}))
+        messages.append(AIMessage(content=chat["response"], additional_kwargs={"tokens": chat.get("response_tokens")}))
+    return messages
+
+def fetch_conversation(user_id: str) -> Tuple[List[dict], Optional[dict]]:
+    """Returns the user's recent chats (newest first) and their rolling summary (None when disabled)."""
+    chats = fetch_recent_chats(user_id)
+    if not CONVERSATION_SUMMARY_ENABLED:
+        return chats, None
+    try:
+        return chats, get_summary(user_id)
+    except Exception as e:
+        logging.warning(f"Conversation summary unavailable for {user_id}: {e}")
+        return chats, None
+
+def prompt_history(chats: List[dict], summary: Optional[dict]) -> Tuple[List[Union[HumanMessage, AIMessage]], Optional[str]]:
+    """History messages and summary text for the prompt.
+
+    With a summary, only the turns it doesn't cover yet go in verbatim (the
+    last CHAT_HISTORY_TURNS, plus any waiting to be folded in).
+    """
+    if summary is None:
+        return history_from_chats(chats), None
+    return history_from_chats(unsummarised_chats(chats, summary)), summary["summary"] or None
+
+def cached_response_from_chats(chats: List[dict], message: str) -> Union[str, None]:
+    """Counts how often ``message`` was asked in the five most recent chats."""
     occurrences = 0
     last_response = None
 
-    for chat in cached_chats:
-        chat_data = chat.to_dict()
+    for chat_data in chats[:5]:
         if chat_data["message"].lower() == message.lower():
             occurrences += 1
             last_response = chat_data["response"]
@@ -116,13 +313,41 @@ def check_cached_response(user_id: str, message: str) -> Union[str, None]:
 
     return f"You've already asked this {occurrences} times! My previous response was:\n\n{last_response}"
 
+# Fetch Chat History
+def fetch_chat_history(user_id: str) -> Tuple[List[Union[HumanMessage, AIMessage]], Optional[str]]:
+    return prompt_history(*fetch_conversation(user_id))
+
+# Check Cached Response
+def check_cached_response(user_id: str, message: str) -> Union[str, None]:
+    """Checks if a similar query was already answered recently and counts occurrences."""
+    return cached_response_from_chats(fetch_recent_chats(user_id, limit=5), message)
+
+def use_semantic_cache(message: str) -> bool:
+    """Whether ``message`` goes through the semantic cache.
+
+    Identifier queries (invoice numbers, error codes) embed almost identically
+    whatever the identifier, so they skip it; retrieval then answers them from
+    the BM25 index without an embedding call.
+    """
+    return semantic_cache is not None and not is_lexical_query(message)
+
+def is_shareable(history: list, summary: Optional[str]) -> bool:
+    """Whether an answer may be given to other users: only if its prompt carried none of this user's conversation."""
+    return not history and not summary
+
+def build_messages(history: list, last_message: HumanMessage, docs: List[str], summary: Optional[str] = None) -> list:
+    """Assembles the prompt within the token budget: system prompt, summary, history, user turn and retrieved knowledge."""
+    messages, report = build_context(SYSTEM_PROMPT, history, last_message, docs, summary=summary)
+    logging.info(f"Prompt Context: {report}")
+    return messages
+
 # AI Response Generation using OpenAI API
 def generate_response(state: ChatState) -> ChatState:
     """Generates AI response while tracking performance metrics."""
     start_time = time.time()  # Start timer
 
     # Fetch recent chat history
-    history = fetch_chat_history(state["user_id"])
+    history, summary = fetch_chat_history(state["user_id"])
 
     # Convert last message to HumanMessage (if needed)
     last_message_data = state["chat_history"][-1]
@@ -132,54 +357,47 @@ def generate_response(state: ChatState) -> ChatState:
         else last_message_data
     )
 
-    messages = [SystemMessage(content="You are a helpful support assistant.")]
-    messages.extend(history)
-    messages.append(last_message)
-
-    # Step 1: Check if the answer is in chat history
-    for past_msg in history:
-        if last_message.content.lower() in past_msg.content.lower():
-            logging.info("Cache Hit: Returning response from chat history.")
+    # Step 1: Check the semantic answer cache (shared across users)
+    query_embedding = None
+    if use_semantic_cache(last_message.content):
+        with track_stage("embedding"):
+            query_embedding = get_embeddings().embed_query(last_message.content)
+        with track_stage("cache_check"):
+            cached = semantic_cache.lookup(query_embedding)
+        if cached:
+            logging.info(f"Cache Hit: similarity {cached['similarity']:.3f} | {semantic_cache.stats()}")
             return {
                 "user_id": state["user_id"],
                 "chat_history": state["chat_history"],
-                "response": past_msg.content,
-                "category": classify_query(last_message.content),
+                "response": cached["response"],
+                "category": cached["category"] or classify_fast(last_message.content),
             }
 
-    # Step 2: Retrieve relevant documents from Pinecone
+    # Step 2: Retrieve relevant documents from Pinecone (reusing the query embedding)
     pinecone_start = time.time()
-    retrieved_docs = retrieve_documents(last_message.content)
+    retrieved_docs = retrieve_documents(last_message.content, embedding=query_embedding)
     pinecone_time = round(time.time() - pinecone_start, 2)
+    observe_stage("vector_query", time.time() - pinecone_start)
     logging.info(f"Pinecone Query Time: {pinecone_time}s | Documents Retrieved: {len(retrieved_docs)}")
 
-    # Step 3: Remove duplicate documents
-    unique_docs = list(set(retrieved_docs))
-    knowledge_context = "\n".join(unique_docs)
+    # Step 3: Build the prompt (duplicate documents removed)
+    messages = build_messages(history, last_message, retrieved_docs, summary)
 
-    if unique_docs:
-        messages.append(SystemMessage(content=f"Relevant knowledge:\n{knowledge_context}"))
-
-    # Step 4: Call OpenAI API for AI Response
-    logging.info(f"AI Model Input: {messages}")
+    # Step 4: Call OpenAI API for AI Response and category (one completion in combined mode)
+    logging.debug(f"AI Model Input: {messages}")
     ai_start = time.time()
-    ai_response = client.chat.completions.create(
-        model=MODEL_NAME,
-        messages=[format_message(m) for m in messages]
-    )
+    response_text, category = generate_answer(messages, last_message.content)
     ai_time = round(time.time() - ai_start, 2)
-
-    # Step 5: Handle AI response
-    response_text = ai_response.choices[0].message.content if ai_response.choices else "No response generated"
+    observe_stage("llm", time.time() - ai_start)
 
     if not response_text.strip():
         logging.warning("AI returned an empty response!")
+    elif use_semantic_cache(last_message.content) and category != "escalation" and is_shareable(history, summary):
+        semantic_cache.store(last_message.content, query_embedding, response_text, category)
 
-    # Step 6: Categorize response
-    category = classify_query(last_message.content)
-
-    # Step 7: Log response time & performance metrics
+    # Step 5: Log response time & performance metrics
     execution_time = round(time.time() - start_time, 2)
+    observe_stage("total", time.time() - start_time)
     logging.info(f"Total AI Processing Time: {execution_time}s | AI Time: {ai_time}s | Category: {category}")
 
     return {
@@ -190,23 +408,154 @@ def generate_response(state: ChatState) -> ChatState:
     }
 
 # Save Chat in Firestore
-def save_chat(user_id: str, message: str, response: str, category: str):
+def save_chat(user_id: str, message: str, response: str, category: str, recent: Optional[List[dict]] = None):
+    """Queues the turn for Firestore and adds it to the Redis window.
+
+    ``recent`` is the history (newest first) the turn was answered from; it
+    seeds the window if that has expired, so the next turn still sees this one.
+    """
     try:
         chat_data = {
             "user_id": user_id,
             "message": message,
             "response": response,
             "category": category,
-            "timestamp": datetime.now(timezone.utc)
+            "timestamp": datetime.now(timezone.utc),
+            # Stored so prompt budgeting never re-tokenises history
+            "message_tokens": count_tokens(message),
+            "response_tokens": count_tokens(response),
         }
-        db.collection("chats").add(chat_data)
+        # Queued for a batched Firestore write; the Redis window (seeded from ``recent`` if it
+        # has expired) makes it visible to the next turn and the summary refresh now
+        transcript_writer.write(chat_data)
+        append_chat(chat_data, recent)
+        schedule_summary_refresh(user_id)
+    except Exception as e:
+        logging.error(f"Chat save failed: {e}")
+
+def schedule_summary_refresh(user_id: str):
+    """Folds aged-out turns into the user's summary in the background (one refresh per user at a time)."""
+    if not CONVERSATION_SUMMARY_ENABLED:
+        return
+    with _summary_lock:
+        if user_id in _summary_pending:
+            return
+        _summary_pending.add(user_id)
+    _summary_executor.submit(_refresh_summary, user_id)
+
+def _refresh_summary(user_id: str):
+    try:
+        # Only the Redis window is read: Firestore may not have the latest turns yet, and
+        # backfilling the window from it would leave them out. No window, no refresh this turn.
+        chats = get_recent_chats(user_id, CHAT_HISTORY_WINDOW)
+        if chats is not None:
+            refresh_summary(user_id, chats, client, MODEL_NAME)
     except Exception as e:
-        print(f"Firestore Error: {e}")
+        logging.error(f"Conversation summary refresh failed for {user_id}: {e}")
+    finally:
+        with _summary_lock:
+            _summary_pending.discard(user_id)
+
+async def _run_stage(timings: dict, stage: str, func, *args, observe: bool = True):
+    """Runs a blocking call in a thread and records how long it took.
+
+    Pass ``observe=False`` when ``func`` already reports the stage metric itself.
+    """
+    stage_start = time.perf_counter()
+    try:
+        return await asyncio.to_thread(func, *args)
+    finally:
+        elapsed = time.perf_counter() - stage_start
+        timings[stage] = round(elapsed, 3)
+        if observe:
+            observe_stage(stage, elapsed)
+
+async def process_chat(user_id: str, message: str) -> dict:
+    """Async chat pipeline: one Firestore read, concurrent retrieval, non-blocking save.
+
+    The recent-chats read (shared by the repeat-question check and the prompt
+    history) runs concurrently with embedding + Pinecone retrieval. Retrieval
+    is speculative: its result is discarded when the repeat check hits.
+    Identical questions in flight at the same time share one completion (see
+    ``coalescing.chat_flights``), but only when neither prompt carries the
+    asker's own history or summary.
+    """
+    timings = {}
+    start = time.perf_counter()
+    # fetch_recent_chats tracks the history_fetch metric; only the timing is recorded here
+    history = asyncio.ensure_future(
+        _run_stage(timings, "history_fetch", fetch_conversation, user_id, observe=False)
+    )
+
+    async def context() -> tuple:
+        """Semantic lookup, then retrieval on a miss: (embedding, cached entry, docs)."""
+        embedding = None
+        if use_semantic_cache(message):
+            embedding = await _run_stage(timings, "embedding", get_embeddings().embed_query, message)
+            # lookup may pull new entries from Redis, so it runs off the loop too
+            with track_stage("cache_check"):
+                cached = await asyncio.to_thread(semantic_cache.lookup, embedding)
+            if cached:
+                logging.info(f"Cache Hit: similarity {cached['similarity']:.3f} | {semantic_cache.stats()}")
+                return embedding, cached, []
+        docs = await _run_stage(timings, "vector_query", retrieve_documents, message, embedding)
+        return embedding, None, docs
+
+    retrieval = asyncio.ensure_future(context())
+    chats, summary = await history
+
+    cached_response = cached_response_from_chats(chats, message)
+    if cached_response:
+        retrieval.cancel()
+        response_text, category = cached_response, "cached"
+    else:
+        turns, summary_text = prompt_history(chats, summary)
+        shareable = is_shareable(turns, summary_text)
+
+        async def answer() -> dict:
+            embedding, cached, docs = await retrieval
+            if cached:
+                category = cached["category"] or await asyncio.to_thread(classify_fast, message)
+                return {"response": cached["response"], "category": category}
+            messages = build_messages(turns, HumanMessage(content=message), docs, summary_text)
+            response_text, category = await _run_stage(timings, "llm", generate_answer, messages, message)
+            if not response_text.strip():
+                logging.warning("AI returned an empty response!")
+            elif use_semantic_cache(message) and category != "escalation" and shareable:
+                await asyncio.to_thread(semantic_cache.store, message, embedding, response_text, category)
+            return {"response": response_text, "category": category}
+
+        if chat_flights is not None and shareable:
+            result = await chat_flights.run(coalescing_key(message), answer)
+            # A follower got the leader's answer; its own retrieval is no longer needed
+            retrieval.cancel()
+        else:
+            result = await answer()
+        response_text, category = result["response"], result["category"]
+
+    # Save Chat History (the Firestore write itself is batched in the background)
+    if response_text and category != "cached":
+        await asyncio.to_thread(save_chat, user_id, message, response_text, category, chats)
+
+    timings["total"] = round(time.perf_counter() - start, 3)
+    observe_stage("total", time.perf_counter() - start)
+    logging.info(f"Chat Pipeline Timings: {timings} | Category: {category}")
+
+    return {
+        "user_id": user_id,
+        "chat_history": [{"role": "user", "content": message}],
+        "response": response_text,
+        "category": category,
+        "timings": timings,
+    }
 
 # Process Chat Async
 @celery_app.task(name='tasks')
 def process_chat_async(user_id: str, message: str):
     """Handles chat requests asynchronously using Celery."""
+    if ASYNC_CHAT_PIPELINE:
+        return chat_loop.run(process_chat(user_id, message))
+
     # Check cache before processing
     cached_response = check_cached_response(user_id, message)
     if cached_response:
@@ -234,11 +583,84 @@ def process_chat_async(user_id: str, message: str):
 
     return response
 
-def retrieve_documents(query: str):
-    """Fetch relevant knowledge base documents using Pinecone vector search."""
-    vectorstore = get_pinecone_vectorstore()
-    docs = vectorstore.similarity_search(query, k=3)
-    return [doc.page_content for doc in docs]
+# Stream Chat Response
+async def stream_response(user_id: str, message: str, result: dict) -> AsyncIterator[dict]:
+    """Runs retrieval + generation on the event loop and yields tokens as they arrive.
+
+    Yields ``{"type": "token", "content": ...}`` events followed by a single
+    ``{"type": "done", ...}`` event. ``result`` is filled with the final
+    response and category so the caller can persist the turn once the stream
+    has closed. Unlike ``process_chat``, identical questions streaming at the
+    same time are not coalesced: each caller gets its own token stream.
+    """
+    start_time = time.time()
+
+    # History and the query embedding don't depend on each other
+    embed = (
+        asyncio.to_thread(get_embeddings().embed_query, message)
+        if use_semantic_cache(message)
+        else asyncio.sleep(0, result=None)
+    )
+    (chats, summary), query_embedding = await asyncio.gather(
+        asyncio.to_thread(fetch_conversation, user_id), embed
+    )
+
+    cached_response = cached_response_from_chats(chats, message)
+    if cached_response:
+        result.update(response=cached_response, category="cached", persist=False)
+        yield {"type": "token", "content": cached_response}
+        yield {"type": "done", "category": "cached"}
+        return
+
+    if query_embedding is not None:
+        cached = await asyncio.to_thread(semantic_cache.lookup, query_embedding)
+        if cached:
+            category = cached["category"] or await asyncio.to_thread(classify_fast, message)
+            result.update(response=cached["response"], category=category, persist=True, recent=chats)
+            yield {"type": "token", "content": cached["response"]}
+            yield {"type": "done", "category": category}
+            return
+
+    retrieved_docs = await asyncio.to_thread(retrieve_documents, message, query_embedding)
+    turns, summary_text = prompt_history(chats, summary)
+    messages = build_messages(turns, HumanMessage(content=message), retrieved_docs, summary_text)
+
+    # Classified while the answer streams, so "done" follows the last token without a wait
+    classification = asyncio.ensure_future(asyncio.to_thread(classify_fast, message))
+    stream = await async_client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=[format_message(m) for m in messages],
+        stream=True,
+    )
+    parts = []
+    first_token_time = None
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content
+        if token:
+            if first_token_time is None:
+                first_token_time = round(time.time() - start_time, 2)
+                observe_stage("first_token", time.time() - start_time)
+            parts.append(token)
+            yield {"type": "token", "content": token}
+
+    response_text = "".join(parts)
+    category = await classification
+    result.update(response=response_text, category=category, persist=bool(response_text.strip()), recent=chats)
+    yield {"type": "done", "category": category}
+
+    if (response_text.strip() and use_semantic_cache(message) and category != "escalation"
+            and is_shareable(turns, summary_text)):
+        await asyncio.to_thread(semantic_cache.store, message, query_embedding, response_text, category)
+    logging.info(
+        f"Streamed Response | First Token: {first_token_time}s | "
+        f"Total: {round(time.time() - start_time, 2)}s | Category: {category}"
+    )
+
+def retrieve_documents(query: str, embedding: Optional[List[float]] = None) -> List[str]:
+    """Fetch relevant knowledge base chunks, best first (empty for small talk or nothing relevant)."""
+    return [match["text"] for match in retrieve(query, embedding)]
 
 # Define LangGraph Flow
 graph = StateGraph(ChatState)
@@ -0,0 +1,71 @@
+import re
+from typing import Optional
+
+# Categories understood by the rest of the chat pipeline
+CATEGORIES = ("billing", "technical", "general", "escalation")
+
+# Keyword weights for the local fast-path classifier. Multi-word phrases are
+# matched against the normalised text, single words against its tokens.
+CATEGORY_KEYWORDS = {
+    "billing": {
+        "refund": 2, "refunds": 2, "invoice": 2, "invoices": 2, "billing": 2,
+        "billed": 2, "charge": 1, "charged": 2, "payment": 2, "payments": 2,
+        "subscription": 1, "receipt": 2, "card": 1, "price": 1, "pricing": 1,
+        "overcharged": 2, "chargeback": 2, "double charged": 3, "money back": 3,
+    },
+    "technical": {
+        "login": 2, "log in": 2, "password": 2, "error": 2, "bug": 2,
+        "crash": 2, "crashes": 2, "crashing": 2, "broken": 1, "not working": 2,
+        "reset": 1, "404": 2, "500": 2, "timeout": 2, "install": 1, "sync": 1,
+        "app": 1, "loading": 1, "cache": 1, "cookies": 1, "2fa": 2,
+    },
+    "escalation": {
+        "manager": 2, "supervisor": 2, "complaint": 2, "lawyer": 3, "legal": 2,
+        "human": 2, "agent": 1, "unacceptable": 2, "cancel my account": 3,
+        "speak to someone": 3, "talk to someone": 3, "real person": 3,
+    },
+}
+
+GREETINGS = {
+    "hi", "hello", "hey", "thanks", "thank you", "thank you so much", "ok",
+    "okay", "good morning", "good afternoon", "good evening", "bye", "goodbye",
+    "cheers", "great", "cool",
+}
+
+# Minimum score, and lead over the runner-up, before we trust a keyword match
+MIN_SCORE = 2
+MIN_MARGIN = 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+def normalise(message: str) -> str:
+    """Lowercases and collapses punctuation/whitespace."""
+    return " ".join(_TOKEN_RE.findall(message.lower()))
+
+def is_small_talk(message: str) -> bool:
+    """True for greetings and pleasantries that need no knowledge lookup."""
+    return normalise(message) in GREETINGS
+
+def classify_locally(message: str) -> Optional[str]:
+    """Routes obvious queries without an LLM call; returns None when unsure."""
+    text = normalise(message)
+    if not text:
+        return None
+    if text in GREETINGS:
+        return "general"
+
+    tokens = set(text.split())
+    padded = f" {text} "
+    scores = {}
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        score = 0
+        for keyword, weight in keywords.items():
+            if (" " in keyword and f" {keyword} " in padded) or keyword in tokens:
+                score += weight
+        scores[category] = score
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+    if best_score >= MIN_SCORE and best_score - runner_up >= MIN_MARGIN:
+        return best
+    return None
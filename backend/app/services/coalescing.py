@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Optional
+import redis
+from backend.app.core.metrics import record_cache
+from backend.app.services.classifier import normalise, classify_locally
+from backend.app.core.config import (
+    CHAT_COALESCING_ENABLED,
+    CHAT_COALESCING_REDIS_URL,
+    CHAT_COALESCING_LOCK_SECONDS,
+    CHAT_COALESCING_RESULT_SECONDS,
+    CHAT_COALESCING_WAIT_SECONDS,
+    CHAT_COALESCING_POLL_SECONDS,
+)
+
+REDIS_LOCK_PREFIX = "chatflight:lock:"
+REDIS_RESULT_PREFIX = "chatflight:result:"
+# A flight abandoned by its leader (None result) is contended again this many times
+MAX_ATTEMPTS = 3
+
+# Deletes the lock only if we still hold it (it may have expired and been taken)
+RELEASE_LOCK_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def coalescing_key(message: str) -> str:
+    """Identical questions share a key: normalised text plus its local category.
+
+    The key carries nothing about the asker, so callers must only coalesce
+    computations that don't depend on them (no history or summary in the prompt).
+    """
+    text = normalise(message)
+    return hashlib.sha1(f"{classify_locally(message) or ''}|{text}".encode()).hexdigest()
+
+class SingleFlight:
+    """Collapses concurrent identical computations into one.
+
+    Within a process, callers of ``run`` with the same key attach to the
+    first caller's future, whichever event loop they run on. With a Redis URL
+    the leader also holds a ``SET NX`` lock, and leaders in other processes
+    poll for its published result instead of computing their own. A leader
+    that returns None abandons the flight: its followers contend again.
+    Exceptions are shared with local followers.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None, lock_seconds: int = 60, result_seconds: int = 10,
+                 wait_seconds: float = 45, poll_seconds: float = 0.05):
+        self.lock_seconds = lock_seconds
+        self.result_seconds = result_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_seconds = poll_seconds
+        self._flights = {}  # key -> concurrent.futures.Future of the local leader
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._release_lock = self._redis.register_script(RELEASE_LOCK_LUA) if self._redis is not None else None
+        self.metrics = {"leaders": 0, "local_joins": 0, "remote_joins": 0, "abandoned": 0, "remote_timeouts": 0}
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Optional[dict]]]) -> Optional[dict]:
+        """Returns ``compute()``'s result, or that of an identical call already in flight."""
+        for _ in range(MAX_ATTEMPTS):
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = Future()
+
+            if not leader:
+                self.metrics["local_joins"] += 1
+                record_cache("coalescing", "local_join")
+                # Shielded so a follower giving up doesn't cancel the leader's future
+                result = await asyncio.shield(asyncio.wrap_future(flight))
+                if result is not None:
+                    return result
+                continue
+
+            self.metrics["leaders"] += 1
+            try:
+                result = await self._lead(key, compute)
+            except asyncio.CancelledError:
+                flight.set_result(None)
+                raise
+            except Exception as e:
+                flight.set_exception(e)
+                raise
+            else:
+                if result is None:
+                    self.metrics["abandoned"] += 1
+                flight.set_result(result)
+                return result
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+        return await compute()
+
+    def stats(self) -> dict:
+        return {**self.metrics, "in_flight": len(self._flights)}
+
+    async def _lead(self, key: str, compute) -> Optional[dict]:
+        """Computes as this process's leader, deferring to another process's leader if there is one.
+
+        The Redis calls are blocking, so each runs in a thread rather than on the loop.
+        """
+        if self._redis is None:
+            return await compute()
+
+        lock_key = f"{REDIS_LOCK_PREFIX}{key}"
+        token = uuid.uuid4().hex
+        for _ in range(MAX_ATTEMPTS):
+            try:
+                acquired = await asyncio.to_thread(self._redis.set, lock_key, token, nx=True, ex=self.lock_seconds)
+            except redis.RedisError as e:
+                logging.warning(f"Chat coalescing Redis lock failed: {e}")
+                return await compute()
+
+            if acquired:
+                try:
+                    result = await compute()
+                    if result is not None:
+                        await asyncio.to_thread(self._publish, key, result)
+                    return result
+                finally:
+                    # Still runs to completion in its thread if this task is cancelled again
+                    await asyncio.to_thread(self._unlock, lock_key, token)
+
+            result = await self._wait_remote(key, lock_key)
+            if result is not None:
+                self.metrics["remote_joins"] += 1
+                record_cache("coalescing", "remote_join")
+                return result
+        return await compute()
+
+    def _publish(self, key: str, result: dict):
+        try:
+            self._redis.set(f"{REDIS_RESULT_PREFIX}{key}", json.dumps(result), ex=self.result_seconds)
+        except (redis.RedisError, TypeError) as e:
+            logging.warning(f"Chat coalescing result publish failed: {e}")
+
+    def _unlock(self, lock_key: str, token: str):
+        try:
+            self._release_lock(keys=[lock_key], args=[token])
+        except redis.RedisError as e:
+            logging.warning(f"Chat coalescing Redis unlock failed: {e}")
+
+    def _poll(self, result_key: str, lock_key: str) -> tuple:
+        """Returns (raw result or None, whether the lock is still held) in one round trip."""
+        pipe = self._redis.pipeline()
+        pipe.get(result_key)
+        pipe.exists(lock_key)
+        raw, locked = pipe.execute()
+        return raw, locked
+
+    async def _wait_remote(self, key: str, lock_key: str) -> Optional[dict]:
+        """Polls for another process's result; None once its lock is gone without one, or on timeout."""
+        result_key = f"{REDIS_RESULT_PREFIX}{key}"
+        deadline = time.monotonic() + self.wait_seconds
+        while time.monotonic() < deadline:
+            try:
+                raw, locked = await asyncio.to_thread(self._poll, result_key, lock_key)
+            except redis.RedisError as e:
+                logging.warning(f"Chat coalescing Redis poll failed: {e}")
+                return None
+            if raw is not None:
+                return json.loads(raw)
+            if not locked:
+                return None
+            await asyncio.sleep(self.poll_seconds)
+        self.metrics["remote_timeouts"] += 1
+        return None
+
+chat_flights = SingleFlight(
+    redis_url=CHAT_COALESCING_REDIS_URL,
+    lock_seconds=CHAT_COALESCING_LOCK_SECONDS,
+    result_seconds=CHAT_COALESCING_RESULT_SECONDS,
+    wait_seconds=CHAT_COALESCING_WAIT_SECONDS,
+    poll_seconds=CHAT_COALESCING_POLL_SECONDS,
+) if CHAT_COALESCING_ENABLED else None
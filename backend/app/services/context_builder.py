@@ -0,0 +1,162 @@
+import logging
+import math
+import threading
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import tiktoken
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+from backend.app.core.config import CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_CHUNK_TOKENS, CONTEXT_MIN_FRAGMENT_TOKENS
+
+# Per-message overhead of the chat format (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+KNOWLEDGE_HEADER = "Relevant knowledge:\n"
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+TRUNCATION_MARKER = " …"
+# Fallback estimate when the tokenizer can't be loaded (English averages about four characters a token)
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """The cl100k_base encoding, loaded on first use; None if it can't be (e.g. offline with no cached copy)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logging.warning(f"tiktoken encoding unavailable, estimating token counts instead: {e}")
+                _encoding_loaded = True
+    return _encoding
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Token count for ``text``; memoised since knowledge chunks and recent turns repeat."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(math.ceil(len(text) / CHARS_PER_TOKEN), len(text.split()))
+    return len(encoding.encode(text))
+
+def _prefix(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts ``text`` to at most ``max_tokens``, marker included."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Decoding a token prefix and appending the marker can re-tokenise longer, so re-check and shrink
+    keep = max_tokens - count_tokens(TRUNCATION_MARKER)
+    while keep > 0:
+        fragment = _prefix(text, keep) + TRUNCATION_MARKER
+        excess = count_tokens(fragment) - max_tokens
+        if excess <= 0:
+            return fragment
+        keep -= excess
+    return ""
+
+def message_tokens(message: BaseMessage) -> int:
+    """Uses the count stored with the chat record when there is one."""
+    tokens = message.additional_kwargs.get("tokens")
+    if tokens is None:
+        tokens = count_tokens(message.content)
+    return tokens + MESSAGE_OVERHEAD_TOKENS
+
+def _turns(history: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups chronological history into turns: a user message and the replies that follow it."""
+    turns = []
+    for message in history:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return turns
+
+def build_context(system_prompt: str, history: List[BaseMessage], last_message: BaseMessage, docs: List[str],
+                  budget: Optional[int] = None, summary: Optional[str] = None) -> Tuple[list, dict]:
+    """Assembles the prompt within a token budget.
+
+    The budget is filled by priority: the system prompt and the latest user
+    turn, then the conversation summary, then retrieved chunks in rank order
+    (each capped at CONTEXT_MAX_CHUNK_TOKENS), then history from newest to
+    oldest, a whole turn (question and reply) at a time. The first item that
+    doesn't fit is truncated into whatever room is left and the rest are
+    dropped. ``history`` is chronological. Only a system prompt that exceeds
+    the budget by itself can push the prompt over it. Returns the messages
+    and a report of what was kept.
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGET
+    system = SystemMessage(content=system_prompt)
+    remaining = budget - message_tokens(system)
+
+    # 1. The latest turn always goes in, cut down only if it alone exceeds the budget
+    if message_tokens(last_message) > remaining:
+        content = truncate_to_tokens(last_message.content, max(remaining - MESSAGE_OVERHEAD_TOKENS, 0))
+        last_message = HumanMessage(content=content)
+    remaining -= message_tokens(last_message)
+
+    # 2. The rolling summary of turns older than ``history``
+    summary_message = None
+    if summary:
+        room = remaining - count_tokens(SUMMARY_HEADER) - MESSAGE_OVERHEAD_TOKENS
+        if room >= CONTEXT_MIN_FRAGMENT_TOKENS:
+            summary_message = SystemMessage(content=SUMMARY_HEADER + truncate_to_tokens(summary, room))
+            remaining -= message_tokens(summary_message)
+
+    # 3. Retrieved chunks, best first
+    unique_docs = list(dict.fromkeys(docs))
+    kept_docs = []
+    if unique_docs:
+        header_tokens = count_tokens(KNOWLEDGE_HEADER) + MESSAGE_OVERHEAD_TOKENS
+        room = remaining - header_tokens
+        for doc in unique_docs:
+            doc = truncate_to_tokens(doc, CONTEXT_MAX_CHUNK_TOKENS)
+            tokens = count_tokens(doc) + 1  # joining newline
+            if tokens <= room:
+                kept_docs.append(doc)
+                room -= tokens
+                continue
+            if room - 1 >= CONTEXT_MIN_FRAGMENT_TOKENS:
+                fragment = truncate_to_tokens(doc, room - 1)
+                kept_docs.append(fragment)
+                room -= count_tokens(fragment) + 1
+            break
+        if kept_docs:
+            remaining = room
+
+    # 4. History, newest turn first, so a reply is never kept without its question
+    kept_history = []
+    for turn in reversed(_turns(history)):
+        tokens = sum(message_tokens(message) for message in turn)
+        if tokens <= remaining:
+            kept_history[:0] = turn
+            remaining -= tokens
+            continue
+        # Keep the turn's question whole and cut its reply (or a lone message) into the room left
+        *kept, last = turn
+        room = remaining - sum(message_tokens(message) for message in kept) - MESSAGE_OVERHEAD_TOKENS
+        if room >= CONTEXT_MIN_FRAGMENT_TOKENS:
+            fragment = type(last)(content=truncate_to_tokens(last.content, room))
+            kept_history[:0] = [*kept, fragment]
+            remaining -= sum(message_tokens(message) for message in kept) + message_tokens(fragment)
+        break
+
+    messages = [system, *([summary_message] if summary_message else []), *kept_history, last_message]
+    if kept_docs:
+        messages.append(SystemMessage(content=KNOWLEDGE_HEADER + "\n".join(kept_docs)))
+
+    report = {
+        "budget": budget,
+        "tokens": budget - remaining,
+        "summary_tokens": message_tokens(summary_message) if summary_message else 0,
+        "history_kept": len(kept_history),
+        "history_dropped": len(history) - len(kept_history),
+        "docs_kept": len(kept_docs),
+        "docs_dropped": len(unique_docs) - len(kept_docs),
+    }
+    return messages, report
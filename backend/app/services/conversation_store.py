@@ -0,0 +1,121 @@
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional
+import redis
+from backend.app.core.config import REDIS_URL, CHAT_HISTORY_WINDOW, CHAT_HISTORY_TTL_SECONDS
+
+# Hot tier for recent chats: a bounded Redis list per user, newest first.
+# Firestore stays the durable archive and is read only on a miss.
+redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+def _history_key(user_id: str) -> str:
+    return f"chat:history:{user_id}"
+
+def _empty_key(user_id: str) -> str:
+    # Marks users known to have no history, so they don't miss on every turn
+    return f"chat:history:{user_id}:empty"
+
+def _serialise(record: dict) -> str:
+    return json.dumps({
+        "message": record["message"],
+        "response": record["response"],
+        "category": record.get("category", ""),
+        "message_tokens": record.get("message_tokens"),
+        "response_tokens": record.get("response_tokens"),
+        "timestamp": record["timestamp"].isoformat() if isinstance(record.get("timestamp"), datetime) else record.get("timestamp"),
+    })
+
+def get_recent_chats(user_id: str, limit: int) -> Optional[List[dict]]:
+    """Returns up to ``limit`` recent chats, or None when the user isn't cached."""
+    try:
+        pipe = redis_client.pipeline()
+        pipe.lrange(_history_key(user_id), 0, limit - 1)
+        pipe.exists(_empty_key(user_id))
+        records, empty = pipe.execute()
+    except redis.RedisError as e:
+        logging.warning(f"Conversation store read failed: {e}")
+        return None
+
+    if records:
+        return [json.loads(record) for record in records]
+    return [] if empty else None
+
+def _install_window(user_id: str, chats: List[dict]) -> bool:
+    """Creates the user's window from ``chats`` (newest first) unless one exists; returns whether it did.
+
+    The list is built under a temporary key and renamed into place in a
+    WATCHed transaction, so a window created concurrently is never overwritten.
+    """
+    key = _history_key(user_id)
+    temp_key = f"{key}:backfill:{uuid.uuid4().hex}"
+    try:
+        if chats:
+            pipe = redis_client.pipeline()
+            pipe.rpush(temp_key, *[_serialise(chat) for chat in chats[:CHAT_HISTORY_WINDOW]])
+            pipe.expire(temp_key, CHAT_HISTORY_TTL_SECONDS)
+            pipe.execute()
+        with redis_client.pipeline() as pipe:
+            pipe.watch(key, _empty_key(user_id))
+            if pipe.exists(key, _empty_key(user_id)):
+                pipe.unwatch()
+                return False
+            pipe.multi()
+            if chats:
+                pipe.rename(temp_key, key)
+            else:
+                pipe.set(_empty_key(user_id), 1, ex=CHAT_HISTORY_TTL_SECONDS)
+            pipe.execute()
+            return True
+    except redis.WatchError:
+        return False
+    finally:
+        if chats:
+            try:
+                redis_client.delete(temp_key)
+            except redis.RedisError:
+                pass
+
+def backfill_chats(user_id: str, chats: List[dict]):
+    """Loads a user's recent chats (newest first) after a miss.
+
+    ``chats`` were read from Firestore before this call, so a window created
+    in the meantime (by an append or another backfill) is at least as fresh
+    and is left alone.
+    """
+    try:
+        _install_window(user_id, chats)
+    except redis.RedisError as e:
+        logging.warning(f"Conversation store backfill failed: {e}")
+
+def append_chat(record: dict, recent: Optional[List[dict]] = None):
+    """Write-through append, so the next turn sees this chat before its batched Firestore write lands.
+
+    Extends the cached window (LPUSHX). When there is no window, it is seeded
+    with this chat on top of ``recent`` (the chats, newest first, the turn was
+    answered from). Without ``recent`` there is nothing complete to seed from,
+    so the chat only becomes visible once Firestore has it and the next read
+    backfills the window.
+    """
+    user_id = record["user_id"]
+    data = _serialise(record)
+    try:
+        pipe = redis_client.pipeline()
+        pipe.delete(_empty_key(user_id))
+        pipe.lpushx(_history_key(user_id), data)
+        was_empty, length = pipe.execute()
+        if not length:
+            seed = [] if was_empty else recent
+            if seed is None:
+                logging.info(f"No conversation window for {user_id}; chat visible after the Firestore write")
+                return
+            if not _install_window(user_id, [record, *seed]):
+                # Another writer created the window meanwhile: extend theirs
+                length = redis_client.lpushx(_history_key(user_id), data)
+        if length:
+            pipe.ltrim(_history_key(user_id), 0, CHAT_HISTORY_WINDOW - 1)
+            pipe.expire(_history_key(user_id), CHAT_HISTORY_TTL_SECONDS)
+            pipe.execute()
+    except redis.RedisError as e:
+        logging.warning(f"Conversation store append failed: {e}")
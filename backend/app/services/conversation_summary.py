@@ -0,0 +1,119 @@
+import json
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+import redis
+from backend.app.core.firebase import db
+from backend.app.core.metrics import record_tokens, track_stage
+from backend.app.services.conversation_store import redis_client
+from backend.app.core.config import (
+    CHAT_HISTORY_TURNS,
+    CHAT_HISTORY_TTL_SECONDS,
+    CONVERSATION_SUMMARY_BATCH_TURNS,
+    CONVERSATION_SUMMARY_MAX_TOKENS,
+)
+
+# Rolling per-user summary of the turns that have aged out of the prompt's
+# verbatim window. Firestore keeps it next to the transcript; Redis serves it.
+SUMMARY_COLLECTION = "conversation_summaries"
+SUMMARY_INSTRUCTIONS = """
+You maintain a running summary of a customer support conversation.
+Update the summary with the new turns below. Keep the customer's issue, account or order details,
+what has been tried, what was promised and anything still unresolved. Drop greetings and small talk.
+Write at most a short paragraph in the third person. Reply with the updated summary only.
+"""
+
+EMPTY_SUMMARY = {"summary": "", "covered_until": None, "turns": 0}
+
+def _summary_key(user_id: str) -> str:
+    return f"chat:summary:{user_id}"
+
+def _as_datetime(value) -> Optional[datetime]:
+    """Chat timestamps are datetimes from Firestore and ISO strings from the Redis window."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+def get_summary(user_id: str) -> dict:
+    """Returns the user's summary (``EMPTY_SUMMARY`` if there is none yet)."""
+    try:
+        cached = redis_client.get(_summary_key(user_id))
+        if cached is not None:
+            return json.loads(cached)
+    except redis.RedisError as e:
+        logging.warning(f"Conversation summary read failed: {e}")
+
+    snapshot = db.collection(SUMMARY_COLLECTION).document(user_id).get()
+    summary = {**EMPTY_SUMMARY, **snapshot.to_dict()} if snapshot.exists else dict(EMPTY_SUMMARY)
+    _cache_summary(user_id, summary)
+    return summary
+
+def save_summary(user_id: str, summary: dict):
+    db.collection(SUMMARY_COLLECTION).document(user_id).set(
+        {**summary, "user_id": user_id, "updated_at": datetime.now(timezone.utc)}
+    )
+    _cache_summary(user_id, summary)
+
+def _cache_summary(user_id: str, summary: dict):
+    # Empty summaries are cached too, so new users don't read Firestore every turn
+    try:
+        redis_client.set(_summary_key(user_id), json.dumps({
+            "summary": summary["summary"],
+            "covered_until": summary["covered_until"],
+            "turns": summary["turns"],
+        }), ex=CHAT_HISTORY_TTL_SECONDS)
+    except redis.RedisError as e:
+        logging.warning(f"Conversation summary cache write failed: {e}")
+
+def unsummarised_chats(chats: List[dict], summary: dict) -> List[dict]:
+    """The chats (newest first) not yet folded into ``summary``."""
+    covered_until = _as_datetime(summary.get("covered_until"))
+    if covered_until is None:
+        return chats
+    return [chat for chat in chats if _as_datetime(chat.get("timestamp")) > covered_until]
+
+def chats_to_summarise(chats: List[dict], summary: dict) -> List[dict]:
+    """Chats to fold into the summary now, oldest first; empty until a batch has aged out.
+
+    The newest CHAT_HISTORY_TURNS turns always stay verbatim. Folding waits
+    until CONVERSATION_SUMMARY_BATCH_TURNS older ones have built up, so there
+    is one summary completion per batch rather than per turn.
+    """
+    pending = unsummarised_chats(chats, summary)
+    if len(pending) < CHAT_HISTORY_TURNS + CONVERSATION_SUMMARY_BATCH_TURNS:
+        return []
+    return list(reversed(pending[CHAT_HISTORY_TURNS:]))
+
+def summarise(client, model: str, previous: str, chats: List[dict]) -> str:
+    """Folds ``chats`` (oldest first) into the ``previous`` summary with one completion."""
+    transcript = "\n".join(f"Customer: {chat['message']}\nAssistant: {chat['response']}" for chat in chats)
+    with track_stage("summary"):
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+            ],
+            max_tokens=CONVERSATION_SUMMARY_MAX_TOKENS,
+        )
+    record_tokens("summary", response.usage)
+    content = response.choices[0].message.content if response.choices else ""
+    return (content or previous).strip()
+
+def refresh_summary(user_id: str, chats: List[dict], client, model: str) -> bool:
+    """Folds aged-out turns from ``chats`` (newest first) into the stored summary. Returns True if it changed."""
+    summary = get_summary(user_id)
+    folding = chats_to_summarise(chats, summary)
+    if not folding:
+        return False
+    timestamp = _as_datetime(folding[-1]["timestamp"])
+    updated = {
+        "summary": summarise(client, model, summary["summary"], folding),
+        "covered_until": timestamp.isoformat(),
+        "turns": summary["turns"] + len(folding),
+    }
+    save_summary(user_id, updated)
+    logging.info(f"Conversation summary updated for {user_id}: {updated['turns']} turns summarised")
+    return True
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+import redis
+from langchain_core.embeddings import Embeddings
+from backend.app.core.metrics import CACHE_LOOKUPS
+
+def normalise_text(text: str) -> str:
+    """Cache key text: case-folded with whitespace collapsed."""
+    return " ".join(text.casefold().split())
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embeddings client with an LRU tier and an optional Redis tier.
+
+    Vectors are stored as float16 bytes (3 KB for a 1536-d embedding instead
+    of ~50 KB as a Python list) under a hash of the normalised text and the
+    model name.
+    """
+
+    def __init__(self, base: Embeddings, max_entries: int, redis_url: Optional[str] = None, ttl_seconds: int = 604800):
+        self.base = base
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._namespace = getattr(base, "model", None) or type(base).__name__
+        self._entries = OrderedDict()  # digest -> float16 bytes, in LRU order
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self.metrics = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _count(self, result: str, n: int = 1):
+        if n:
+            self.metrics[result] += n
+            CACHE_LOOKUPS.labels("embedding", result).inc(n)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha1(f"{self._namespace}\x00{normalise_text(text)}".encode("utf-8")).digest()
+
+    def _redis_key(self, key: bytes) -> str:
+        return f"emb:{key.hex()}"
+
+    @staticmethod
+    def _encode(vector) -> bytes:
+        return np.asarray(vector, dtype=np.float16).tobytes()
+
+    @staticmethod
+    def _decode(data: bytes) -> List[float]:
+        return np.frombuffer(data, dtype=np.float16).astype(np.float32).tolist()
+
+    def _get_local(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def _put_local(self, key: bytes, data: bytes):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = {}
+        for i, key in enumerate(keys):
+            data = self._get_local(key)
+            if data is not None:
+                found[i] = data
+        self._count("local_hits", len(found))
+
+        missing = [i for i in range(len(texts)) if i not in found]
+        if missing and self._redis is not None:
+            try:
+                values = self._redis.mget([self._redis_key(keys[i]) for i in missing])
+                for i, data in zip(missing, values):
+                    if data is not None:
+                        found[i] = data
+                        self._put_local(keys[i], data)
+                        self._count("redis_hits")
+            except redis.RedisError as e:
+                logging.warning(f"Embedding cache Redis read failed: {e}")
+            missing = [i for i in missing if i not in found]
+
+        if missing:
+            self._count("misses", len(missing))
+            # Embed each distinct text once, even if it repeats within the batch
+            unique = list(dict.fromkeys(keys[i] for i in missing))
+            first_index = {}
+            for i in missing:
+                first_index.setdefault(keys[i], i)
+            vectors = self.base.embed_documents([texts[first_index[key]] for key in unique])
+            encoded = {key: self._encode(vector) for key, vector in zip(unique, vectors)}
+            for key, data in encoded.items():
+                self._put_local(key, data)
+            for i in missing:
+                found[i] = encoded[keys[i]]
+            if self._redis is not None:
+                try:
+                    pipe = self._redis.pipeline()
+                    for key, data in encoded.items():
+                        pipe.setex(self._redis_key(key), self.ttl_seconds, data)
+                    pipe.execute()
+                except redis.RedisError as e:
+                    logging.warning(f"Embedding cache Redis write failed: {e}")
+
+        return [self._decode(found[i]) for i in range(len(texts))]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        data = self._get_local(key)
+        if data is not None:
+            self._count("local_hits")
+            return self._decode(data)
+
+        if self._redis is not None:
+            try:
+                data = self._redis.get(self._redis_key(key))
+            except redis.RedisError as e:
+                logging.warning(f"Embedding cache Redis read failed: {e}")
+            if data is not None:
+                self._count("redis_hits")
+                self._put_local(key, data)
+                return self._decode(data)
+
+        self._count("misses")
+        data = self._encode(self.base.embed_query(text))
+        self._put_local(key, data)
+        if self._redis is not None:
+            try:
+                self._redis.setex(self._redis_key(key), self.ttl_seconds, data)
+            except redis.RedisError as e:
+                logging.warning(f"Embedding cache Redis write failed: {e}")
+        return self._decode(data)
+
+    def stats(self) -> dict:
+        lookups = sum(self.metrics.values())
+        hits = self.metrics["local_hits"] + self.metrics["redis_hits"]
+        return {
+            **self.metrics,
+            "size": len(self._entries),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,14 +1,76 @@
+import logging
+import threading
 from datetime import datetime, timezone
+from typing import List, Optional, Set
+import redis
+from backend.app.core.config import (
+    SALESFORCE_LOG_BATCH_SIZE,
+    SALESFORCE_LOG_FLUSH_SECONDS,
+    SALESFORCE_LOG_MAX_RETRIES,
+    SALESFORCE_LOG_RETRY_BASE_SECONDS,
+    SALESFORCE_LOG_SPILL_PATH,
+    SALESFORCE_NOTIFICATION_DEDUPE_TTL_SECONDS,
+    SALESFORCE_NOTIFICATION_REDIS_URL,
+)
+from backend.app.core.ttl_cache import TTLCache
+from backend.app.services.firestore_writer import BatchedFirestoreWriter
 
-from backend.app import db
+NOTIFICATION_KEY_PREFIX = "salesforce:notification:"
 
-def log_salesforce_event(case_id, status, subject):
-    """Log webhook event into Firebase Firestore."""
+# Event logs get the same retry-then-spill treatment as chat transcripts
+salesforce_log_writer = BatchedFirestoreWriter(
+    "salesforce_logs",
+    batch_size=SALESFORCE_LOG_BATCH_SIZE,
+    flush_seconds=SALESFORCE_LOG_FLUSH_SECONDS,
+    max_retries=SALESFORCE_LOG_MAX_RETRIES,
+    retry_base_seconds=SALESFORCE_LOG_RETRY_BASE_SECONDS,
+    spill_path=SALESFORCE_LOG_SPILL_PATH,
+)
+
+redis_client = redis.Redis.from_url(SALESFORCE_NOTIFICATION_REDIS_URL)
+
+# Outbound Message notification ids seen recently; Salesforce redelivers until it gets an ACK.
+# Used when Redis is unreachable, so a single process still skips its own redeliveries.
+_seen_notifications = TTLCache(SALESFORCE_NOTIFICATION_DEDUPE_TTL_SECONDS, max_entries=100000)
+_seen_lock = threading.Lock()
+
+def claim_notifications(notification_ids: List[str]) -> Set[str]:
+    """Atomically claims notifications in one Redis round trip; returns the ids not already handled (or being handled)."""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for notification_id in notification_ids:
+            pipe.set(f"{NOTIFICATION_KEY_PREFIX}{notification_id}", 1, nx=True, ex=SALESFORCE_NOTIFICATION_DEDUPE_TTL_SECONDS)
+        return {notification_id for notification_id, claimed in zip(notification_ids, pipe.execute()) if claimed}
+    except redis.RedisError as e:
+        logging.warning(f"Salesforce notification claim fell back to this process: {e}")
+    with _seen_lock:
+        claimed = set()
+        for notification_id in notification_ids:
+            if notification_id not in _seen_notifications and notification_id not in claimed:
+                _seen_notifications.set(notification_id, True)
+                claimed.add(notification_id)
+        return claimed
+
+def release_notification(notification_id: str):
+    """Gives up a claim whose handling failed, so Salesforce's redelivery is handled again."""
+    with _seen_lock:
+        _seen_notifications.pop(notification_id)
+    try:
+        redis_client.delete(f"{NOTIFICATION_KEY_PREFIX}{notification_id}")
+    except redis.RedisError as e:
+        logging.error(f"Could not release Salesforce notification {notification_id}: {e}")
+
+def log_salesforce_event(case_id, status, subject, notification_id: Optional[str] = None):
+    """Queues a webhook event for a batched write to Firestore.
+
+    The notification id doubles as the document id, so a redelivery handled
+    by another process overwrites the same document instead of adding one.
+    """
     event = {
         "case_id": case_id,
         "status": status,
         "subject": subject,
+        "notification_id": notification_id,
         "timestamp": datetime.now(timezone.utc)
     }
-    db.collection("salesforce_logs").add(event)
-    print(f"✅ Logged case {case_id} update in Firestore.")
\ No newline at end of file
+    salesforce_log_writer.write(event, doc_id=notification_id)
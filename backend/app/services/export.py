@@ -0,0 +1,251 @@
+import argparse
+import gzip
+import json
+import queue
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional
+from backend.app.core.firebase import db
+from backend.app.core.config import EXPORT_PAGE_SIZE, EXPORT_PARTITIONS
+
+# Exported fields per collection (plus the document id), with their Parquet types
+EXPORT_FIELDS = {
+    "chats": {
+        "user_id": "string",
+        "message": "string",
+        "response": "string",
+        "category": "string",
+        "timestamp": "timestamp",
+        "message_tokens": "int64",
+        "response_tokens": "int64",
+    },
+    "salesforce_logs": {
+        "case_id": "string",
+        "status": "string",
+        "subject": "string",
+        "notification_id": "string",
+        "timestamp": "timestamp",
+    },
+}
+EXPORT_FORMATS = ("jsonl", "parquet")
+# Upper bound on page size: a few pages per partition are held in memory at once
+MAX_PAGE_SIZE = 5000
+PARQUET_ROW_GROUP_ROWS = 20000
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _to_row(snapshot, fields: dict) -> dict:
+    data = snapshot.to_dict() or {}
+    return {"id": snapshot.id, **{field: data.get(field) for field in fields}}
+
+def paginate(query, page_size: int) -> Iterator[list]:
+    """Yields pages of snapshots, resuming each page after the last document of the previous one.
+
+    ``query`` must have a deterministic order; the snapshot cursor adds the
+    document id as a tiebreaker.
+    """
+    last = None
+    while True:
+        page_query = query.limit(page_size)
+        if last is not None:
+            page_query = page_query.start_after(last)
+        page = list(page_query.stream())
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+def filtered_query(collection: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   user_id: Optional[str] = None):
+    """Timestamp-ordered query over ``collection``; user and time filters use the composite indexes."""
+    query = db.collection(collection)
+    if user_id:
+        query = query.where("user_id", "==", user_id)
+    if since:
+        query = query.where("timestamp", ">=", since)
+    if until:
+        query = query.where("timestamp", "<", until)
+    return query.order_by("timestamp")
+
+def _matches(row: dict, since: Optional[datetime], until: Optional[datetime], user_id: Optional[str]) -> bool:
+    """Client-side filter for partitioned reads (partition queries can't carry field filters)."""
+    if user_id and row.get("user_id") != user_id:
+        return False
+    timestamp = row.get("timestamp")
+    if (since or until) and not isinstance(timestamp, datetime):
+        return False
+    if since and timestamp < since:
+        return False
+    if until and timestamp >= until:
+        return False
+    return True
+
+def iter_rows(collection: str, page_size: int = EXPORT_PAGE_SIZE, partitions: int = 1,
+              since: Optional[datetime] = None, until: Optional[datetime] = None,
+              user_id: Optional[str] = None) -> Iterator[List[dict]]:
+    """Yields pages of export rows from ``collection``.
+
+    With one partition the pages come in timestamp order from a filtered
+    query. With several, the collection is split with a collection-group
+    partition query and the ranges are read in parallel threads (unordered,
+    filtered client-side). Either way only a few pages are held at once.
+    """
+    fields = EXPORT_FIELDS[collection]
+    if user_id and "user_id" not in fields:
+        raise ValueError(f"{collection} can't be filtered by user_id")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    if partitions <= 1:
+        for page in paginate(filtered_query(collection, since, until, user_id), page_size):
+            yield [_to_row(snapshot, fields) for snapshot in page]
+        return
+
+    queries = [partition.query() for partition in db.collection_group(collection).get_partitions(partitions)]
+    pages = queue.Queue(maxsize=len(queries) * 2)
+    done = object()
+    stopping = threading.Event()
+
+    def read(query):
+        try:
+            for page in paginate(query, page_size):
+                if stopping.is_set():
+                    return
+                rows = [row for row in (_to_row(snapshot, fields) for snapshot in page)
+                        if _matches(row, since, until, user_id)]
+                if rows:
+                    pages.put(rows)
+        except Exception as e:
+            pages.put(e)
+        finally:
+            pages.put(done)
+
+    threads = [threading.Thread(target=read, args=(query,), name=f"export-{collection}-{i}", daemon=True)
+               for i, query in enumerate(queries)]
+    for thread in threads:
+        thread.start()
+    try:
+        remaining = len(threads)
+        while remaining:
+            item = pages.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        stopping.set()
+        # Unblock readers waiting on a full queue so they can see the stop flag
+        while any(thread.is_alive() for thread in threads):
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+def stream_jsonl_gz(pages: Iterator[List[dict]]) -> Iterator[bytes]:
+    """Gzip-compressed JSON lines, produced incrementally (for HTTP responses)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for rows in pages:
+        chunk = compressor.compress("".join(json.dumps(row, default=_json_default) + "\n" for row in rows).encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+class JsonlWriter:
+    """Appends rows to a JSON-lines file, gzip-compressed when the path ends in .gz."""
+
+    def __init__(self, path: str, collection: str):
+        self._file = gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz") else open(path, "w", encoding="utf-8")
+
+    def write(self, rows: List[dict]):
+        self._file.write("".join(json.dumps(row, default=_json_default) + "\n" for row in rows))
+
+    def close(self):
+        self._file.close()
+
+class ParquetWriter:
+    """Writes rows to a Parquet file in row groups (needs pyarrow)."""
+
+    def __init__(self, path: str, collection: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        types = {"string": pa.string(), "int64": pa.int64(), "timestamp": pa.timestamp("us", tz="UTC")}
+        self._pa = pa
+        self._schema = pa.schema(
+            [("id", pa.string())] + [(field, types[kind]) for field, kind in EXPORT_FIELDS[collection].items()]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+        self._buffer = []
+
+    def write(self, rows: List[dict]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= PARQUET_ROW_GROUP_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(self._pa.Table.from_pylist(self._buffer, schema=self._schema))
+            self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+def export_collection(collection: str, output: str, export_format: Optional[str] = None, **query) -> dict:
+    """Streams ``collection`` into ``output`` (JSONL, optionally .gz, or Parquet). Returns counts and timing."""
+    if collection not in EXPORT_FIELDS:
+        raise ValueError(f"Unknown collection {collection!r}; expected one of {', '.join(EXPORT_FIELDS)}")
+    export_format = export_format or ("parquet" if output.endswith(".parquet") else "jsonl")
+    writer = (ParquetWriter if export_format == "parquet" else JsonlWriter)(output, collection)
+    start = time.perf_counter()
+    rows = pages = 0
+    try:
+        for page in iter_rows(collection, **query):
+            writer.write(page)
+            rows += len(page)
+            pages += 1
+            if pages % 50 == 0:
+                print(f"⏳ {collection}: {rows} documents exported")
+    finally:
+        writer.close()
+    report = {"collection": collection, "output": output, "format": export_format, "documents": rows,
+              "seconds": round(time.perf_counter() - start, 2)}
+    print(f"✅ Export Complete: {report}")
+    return report
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+# Run this script to export a collection
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export chat transcripts or Salesforce event logs from Firestore.")
+    parser.add_argument("collection", choices=sorted(EXPORT_FIELDS))
+    parser.add_argument("output", help="Output file: .jsonl, .jsonl.gz or .parquet")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Output format (default: from the file extension)")
+    parser.add_argument("--page-size", type=int, default=EXPORT_PAGE_SIZE)
+    parser.add_argument("--partitions", type=int, default=EXPORT_PARTITIONS,
+                        help="Parallel partitioned reads (filters are then applied client-side)")
+    parser.add_argument("--since", type=_parse_time, help="ISO timestamp, inclusive")
+    parser.add_argument("--until", type=_parse_time, help="ISO timestamp, exclusive")
+    parser.add_argument("--user-id", help="Only this user's chats")
+    args = parser.parse_args()
+
+    export_collection(
+        args.collection,
+        args.output,
+        args.format,
+        page_size=args.page_size,
+        partitions=args.partitions,
+        since=args.since,
+        until=args.until,
+        user_id=args.user_id,
+    )
@@ -0,0 +1,182 @@
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from backend.app.core.firebase import db
+from backend.app.services.spill_file import SpillFile
+
+# Firestore rejects write batches with more than 500 operations
+MAX_BATCH_WRITES = 500
+# Spilled records are re-queued at most this often while Firestore is healthy
+SPILL_REPLAY_SECONDS = 60
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+def _decode(obj: dict):
+    return datetime.fromisoformat(obj["__datetime__"]) if set(obj) == {"__datetime__"} else obj
+
+class BatchedFirestoreWriter:
+    """Buffers documents for one collection and commits them as write batches.
+
+    ``write`` only enqueues, so request handlers never wait on Firestore. A
+    background thread commits whatever has accumulated once ``batch_size``
+    documents are waiting or ``flush_seconds`` has passed. Writes that carry
+    a ``doc_id`` use ``set``, so writing the same id twice stays idempotent;
+    the others get an id when their batch is first built, so retrying a
+    batch never duplicates a document.
+
+    A failed commit is retried ``max_retries`` times with exponential
+    backoff. If it still fails and ``spill_path`` is set, the batch is
+    appended to that JSON-lines file instead of being dropped, and re-queued
+    on the next start or once commits succeed again. Documents still queued
+    when ``stop`` gives up waiting are spilled as well.
+
+    Several processes may share one spill file (see ``SpillFile``).
+    """
+
+    def __init__(self, collection: str, batch_size: int = MAX_BATCH_WRITES, flush_seconds: float = 1.0,
+                 max_retries: int = 0, retry_base_seconds: float = 0.5, spill_path: Optional[str] = None):
+        self.collection = collection
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.flush_seconds = flush_seconds
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.spill_path = spill_path
+        self._spill_file = SpillFile(spill_path, encode=_encode, decode=_decode) if spill_path else None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._last_replay = 0.0
+        self.metrics = {"queued": 0, "written": 0, "batches": 0, "retries": 0, "failed": 0, "spilled": 0, "replayed": 0}
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked child: the parent's thread and queued documents aren't ours
+                self._queue = queue.Queue()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"firestore-{self.collection}", daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+        self.replay_spill()
+
+    def stop(self, timeout: float = 10.0):
+        """Flushes pending documents (up to ``timeout``), stops the writer thread and spills what's left."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self._queue.unfinished_tasks:
+            time.sleep(0.05)
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(deadline - time.monotonic(), 0.1))
+        self._thread = None
+
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            self._queue.task_done()
+        if leftover:
+            if self.spill_path:
+                logging.warning(f"Firestore writer for {self.collection} stopped with {len(leftover)} documents queued")
+                self._spill(leftover)
+            else:
+                logging.error(f"Firestore writer for {self.collection} stopped, dropping {len(leftover)} documents")
+
+    def write(self, data: dict, doc_id: Optional[str] = None):
+        """Queues a document; a random id is used when ``doc_id`` is None."""
+        self.start()
+        self._queue.put((doc_id, data))
+        self.metrics["queued"] += 1
+
+    def replay_spill(self) -> int:
+        """Re-queues spilled documents; returns how many."""
+        if not self.spill_path:
+            return 0
+        self._last_replay = time.monotonic()
+        try:
+            count = self._spill_file.replay(lambda record: self._queue.put((record["id"], record["data"])))
+        except OSError as e:
+            logging.error(f"Could not replay spilled {self.collection} documents: {e}")
+            return 0
+        if count:
+            self.metrics["replayed"] += count
+            logging.info(f"Re-queued {count} spilled {self.collection} documents from {self.spill_path}")
+        return count
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            items = self._next_batch()
+            if not items:
+                continue
+            try:
+                committed = self._commit(items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if committed and self.spill_path and time.monotonic() - self._last_replay > SPILL_REPLAY_SECONDS:
+                self.replay_spill()
+
+    def _commit(self, items: list) -> bool:
+        collection = db.collection(self.collection)
+        # Ids are fixed before the first attempt so a retried batch overwrites rather than duplicates
+        items = [(doc_id or collection.document().id, data) for doc_id, data in items]
+        for attempt in range(self.max_retries + 1):
+            batch = db.batch()
+            for doc_id, data in items:
+                batch.set(collection.document(doc_id), data)
+            try:
+                batch.commit()
+                self.metrics["written"] += len(items)
+                self.metrics["batches"] += 1
+                return True
+            except Exception as e:
+                if attempt < self.max_retries:
+                    self.metrics["retries"] += 1
+                    delay = self.retry_base_seconds * 2 ** attempt * random.uniform(0.5, 1.5)
+                    logging.warning(f"Firestore batch write to {self.collection} failed, retrying in {delay:.1f}s: {e}")
+                    time.sleep(delay)
+                    continue
+                self.metrics["failed"] += len(items)
+                logging.error(f"Firestore batch write to {self.collection} failed ({len(items)} documents): {e}")
+        self._spill(items)
+        return False
+
+    def _spill(self, items: list):
+        """Appends documents that couldn't be written to the spill file."""
+        if not self.spill_path:
+            return
+        try:
+            self._spill_file.append([{"id": doc_id, "data": data} for doc_id, data in items])
+            self.metrics["spilled"] += len(items)
+            logging.warning(f"Spilled {len(items)} {self.collection} documents to {self.spill_path}")
+        except (OSError, TypeError) as e:
+            logging.error(f"Could not spill {len(items)} {self.collection} documents: {e}")
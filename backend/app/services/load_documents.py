@@ -1,21 +1,207 @@
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, List, Tuple
+import tiktoken
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.document_loaders import TextLoader
-from backend.app.services.vector_store_pinecone import get_pinecone_vectorstore
+from backend.app.core.config import (
+    INGEST_CHUNK_SIZE,
+    INGEST_CHUNK_OVERLAP,
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_EMBED_CONCURRENCY,
+    INGEST_UPSERT_BATCH_SIZE,
+    VECTOR_STORE_BACKEND,
+    BM25_INDEX_ENABLED,
+    BM25_INDEX_PATH,
+)
+from backend.app.services.vector_store import get_embeddings, existing_vector_ids, upsert_vectors, persist_vectorstore
+from backend.app.services.bm25_index import BM25Index
 
-def load_knowledge_base(file_path: str):
-    """Loads FAQ documents and stores them in Pinecone."""
-    loader = TextLoader(file_path)
-    docs = loader.load()
+DEFAULT_EXTENSIONS = (".txt", ".md")
+DEFAULT_MANIFEST = ".ingest_manifest"
+
+_splitter = None
+
+def iter_source_files(root: str, extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS) -> Iterator[str]:
+    """Walks ``root`` lazily, yielding document paths (or ``root`` itself if it's a file)."""
+    if os.path.isfile(root):
+        yield root
+        return
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(dirpath, filename)
+
+def chunk_id(text: str) -> str:
+    """Content hash used as the vector id, so unchanged chunks are recognised."""
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+
+def split_file(path: str) -> List[Tuple[str, str, str]]:
+    """Splits one file into (chunk_id, text, source) tuples. Runs in a worker process."""
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=INGEST_CHUNK_SIZE, chunk_overlap=INGEST_CHUNK_OVERLAP)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    return [(chunk_id(chunk), chunk, path) for chunk in _splitter.split_text(text) if chunk.strip()]
+
+def iter_chunks(paths: Iterable[str], workers: int) -> Iterator[Tuple[str, str, str]]:
+    """Splits files in a process pool, keeping a bounded number of files in flight."""
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path in paths:
+            pending.add(pool.submit(split_file, path))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in pending:
+            yield from future.result()
+
+def iter_batches(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def load_manifest(path: str) -> set:
+    """Reads the ids of chunks already upserted by previous (possibly interrupted) runs."""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+class IngestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.chunks_seen = 0
+        self.chunks_skipped = 0
+        self.chunks_upserted = 0
+        self.chunks_lexical = 0
+        self.tokens_embedded = 0
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    split_docs = text_splitter.split_documents(docs)
+    def report(self) -> dict:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return {
+            "chunks_seen": self.chunks_seen,
+            "chunks_skipped": self.chunks_skipped,
+            "chunks_upserted": self.chunks_upserted,
+            "chunks_lexical": self.chunks_lexical,
+            "tokens_embedded": self.tokens_embedded,
+            "seconds": round(elapsed, 2),
+            "chunks_per_second": round(self.chunks_upserted / elapsed, 1),
+            "tokens_per_second": round(self.tokens_embedded / elapsed, 1),
+        }
 
-    # ✅ Load into Pinecone
-    vectorstore = get_pinecone_vectorstore()
-    vectorstore.add_documents(split_docs)
+def ingest(paths: Iterable[str], manifest_path: str = DEFAULT_MANIFEST, workers: int = None,
+           embed_batch_size: int = INGEST_EMBED_BATCH_SIZE, embed_concurrency: int = INGEST_EMBED_CONCURRENCY,
+           upsert_batch_size: int = INGEST_UPSERT_BATCH_SIZE) -> dict:
+    """Streams documents into the vector store, embedding and upserting only new chunks.
 
-    print("✅ Knowledge Base Loaded Successfully.")
+    Chunk ids are content hashes: chunks recorded in the manifest or already
+    present in the index are skipped, and each upserted batch is appended to
+    the manifest so an interrupted run resumes where it stopped. Every chunk
+    not yet in the local BM25 index is added to it too.
+    """
+    workers = workers or os.cpu_count() or 1
+    if VECTOR_STORE_BACKEND == "local":
+        # The loaded local index is authoritative and free to check; it's saved on exit
+        manifest_path = None
+    embeddings = get_embeddings()
+    encoding = tiktoken.get_encoding("cl100k_base")
+    done_ids = load_manifest(manifest_path)
+    stats = IngestStats()
+    manifest = open(manifest_path, "a") if manifest_path else None
+    lexical_index = BM25Index(BM25_INDEX_PATH) if BM25_INDEX_ENABLED else None
+
+    def embed_and_upsert(batch):
+        texts = [text for _, text, _ in batch]
+        vectors = embeddings.embed_documents(texts)
+        for start in range(0, len(batch), upsert_batch_size):
+            part = batch[start:start + upsert_batch_size]
+            upsert_vectors(
+                [cid for cid, _, _ in part],
+                vectors[start:start + upsert_batch_size],
+                [text for _, text, _ in part],
+                [{"source": source} for _, _, source in part],
+            )
+        return batch, sum(len(encoding.encode(text)) for text in texts)
+
+    try:
+        with ThreadPoolExecutor(max_workers=embed_concurrency) as pool:
+            pending = set()
+
+            def collect(futures):
+                for future in futures:
+                    batch, tokens = future.result()
+                    stats.chunks_upserted += len(batch)
+                    stats.tokens_embedded += tokens
+                    if manifest:
+                        manifest.write("".join(f"{cid}\n" for cid, _, _ in batch))
+                        manifest.flush()
+
+            for batch in iter_batches(iter_chunks(paths, workers), embed_batch_size):
+                stats.chunks_seen += len(batch)
+                if lexical_index is not None:
+                    stats.chunks_lexical += sum(lexical_index.add(cid, text, {"source": source}) for cid, text, source in batch)
+                # Drop duplicates within the batch and chunks indexed by earlier runs
+                unique = {cid: (cid, text, source) for cid, text, source in batch if cid not in done_ids}
+                stored = existing_vector_ids(list(unique))
+                if manifest and stored:
+                    manifest.write("".join(f"{cid}\n" for cid in stored))
+                done_ids.update(unique)
+                new_chunks = [chunk for cid, chunk in unique.items() if cid not in stored]
+                stats.chunks_skipped += len(batch) - len(new_chunks)
+                if not new_chunks:
+                    continue
+
+                pending.add(pool.submit(embed_and_upsert, new_chunks))
+                if len(pending) >= embed_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    print(f"⏳ {stats.report()}")
+            collect(pending)
+    finally:
+        persist_vectorstore()
+        if lexical_index is not None:
+            lexical_index.save()
+        if manifest:
+            manifest.close()
+
+    report = stats.report()
+    print(f"✅ Knowledge Base Loaded: {report}")
+    return report
+
+def load_knowledge_base(file_path: str):
+    """Loads FAQ documents and stores them in the vector store."""
+    return ingest(iter_source_files(file_path))
 
 # Run this script to upload documents
 if __name__ == "__main__":
-    load_knowledge_base("data/support_faqs.txt")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest a directory of documents into the knowledge base.")
+    parser.add_argument("path", nargs="?", default="data/support_faqs.txt", help="File or directory to ingest")
+    parser.add_argument("--extensions", default=",".join(DEFAULT_EXTENSIONS), help="Comma-separated file extensions")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST, help="Resume manifest of ingested chunk ids ('' to disable)")
+    parser.add_argument("--workers", type=int, default=None, help="Splitter processes (default: CPU count)")
+    parser.add_argument("--embed-batch-size", type=int, default=INGEST_EMBED_BATCH_SIZE)
+    parser.add_argument("--embed-concurrency", type=int, default=INGEST_EMBED_CONCURRENCY)
+    parser.add_argument("--upsert-batch-size", type=int, default=INGEST_UPSERT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    extensions = tuple(ext.strip() for ext in args.extensions.split(",") if ext.strip())
+    ingest(
+        iter_source_files(args.path, extensions),
+        manifest_path=args.manifest,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        embed_concurrency=args.embed_concurrency,
+        upsert_batch_size=args.upsert_batch_size,
+    )
@@ -0,0 +1,337 @@
+import heapq
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
+import redis
+from backend.app.core.config import (
+    NOTIFICATION_MAX_ATTEMPTS,
+    NOTIFICATION_BACKOFF_BASE_SECONDS,
+    NOTIFICATION_BATCH_WINDOW_SECONDS,
+    NOTIFICATION_IDEMPOTENCY_TTL_SECONDS,
+    NOTIFICATION_REDIS_URL,
+    NOTIFICATION_SPILL_PATH,
+)
+from backend.app.core.ttl_cache import TTLCache
+from backend.app.services.spill_file import SpillFile
+from backend.app.integrations.slack import send_slack_message
+from backend.app.integrations.sendgrid import send_email, send_bulk_email
+from backend.app.integrations.twillo import send_sms, send_whatsapp
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter."""
+
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def _deliver_slack(batch, throttle):
+    """Posts each alert in a batch as its own Slack message, over the shared client connection."""
+    failed = []
+    for item in batch:
+        throttle()
+        result = send_slack_message(item["payload"]["message"], channel=item["payload"].get("channel"))
+        if result.get("status") == "error":
+            failed.append((item, result["detail"]))
+    return failed
+
+def _deliver_email(batch, throttle):
+    """Sends a batch through SendGrid, one request per distinct subject/body."""
+    by_content = {}
+    for item in batch:
+        payload = item["payload"]
+        by_content.setdefault((payload["subject"], payload["message"]), []).append(item)
+    failed = []
+    for (subject, message), items in by_content.items():
+        recipients = [item["payload"]["to_email"] for item in items]
+        throttle()
+        if len(recipients) == 1:
+            result = send_email(recipients[0], subject, message)
+        else:
+            result = send_bulk_email(recipients, subject, message)
+        if result.get("status") == "error":
+            failed.extend((item, result["detail"]) for item in items)
+    return failed
+
+def _twilio_sender(send):
+    def deliver(batch, throttle):
+        failed = []
+        for item in batch:
+            throttle()
+            try:
+                send(item["payload"]["to"], item["payload"]["message"])
+            except Exception as e:
+                failed.append((item, str(e)))
+        return failed
+    return deliver
+
+# Per-provider delivery settings: worker threads, sustained requests/second,
+# burst size and how many queued messages one delivery call may combine.
+PROVIDERS = {
+    "slack": {"deliver": _deliver_slack, "concurrency": 1, "rate": 1.0, "burst": 3, "batch_size": 20},
+    "email": {"deliver": _deliver_email, "concurrency": 4, "rate": 10.0, "burst": 20, "batch_size": 100},
+    "sms": {"deliver": _twilio_sender(send_sms), "concurrency": 4, "rate": 5.0, "burst": 10, "batch_size": 1},
+    "whatsapp": {"deliver": _twilio_sender(send_whatsapp), "concurrency": 4, "rate": 5.0, "burst": 10, "batch_size": 1},
+}
+
+class NotificationDispatcher:
+    """In-process notification outbox.
+
+    Handlers enqueue messages and return immediately. Each provider has its
+    own queue and worker threads; deliveries are rate limited, batched where
+    the provider allows, and retried with exponential backoff. Messages with
+    an idempotency key are accepted at most once per key; a message that is
+    dead-lettered gives its key up again, so a redelivery can still go out.
+
+    Messages still queued or waiting for a retry when ``stop`` gives up are
+    written to ``spill_path`` and re-queued by the next ``start``.
+    """
+
+    def __init__(self, providers: dict, max_attempts: int, backoff_base: float, batch_window: float,
+                 idempotency_ttl: int, redis_url: Optional[str] = None, spill_path: Optional[str] = None):
+        self.providers = providers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.batch_window = batch_window
+        self._seen_keys = TTLCache(idempotency_ttl, max_entries=100000)
+        self._idempotency_ttl = idempotency_ttl
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._spill_file = SpillFile(spill_path) if spill_path else None
+        self._seq = 0
+        self._pid = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._reset()
+        self.metrics = {"enqueued": 0, "duplicates": 0, "delivered": 0, "retried": 0, "dead_lettered": 0}
+
+    def _reset(self):
+        self._queues = {name: queue.Queue() for name in self.providers}
+        self._buckets = {name: TokenBucket(cfg["rate"], cfg["burst"]) for name, cfg in self.providers.items()}
+        self._retries = []  # heap of (due_at, seq, channel, item)
+        self._retry_cond = threading.Condition()
+        self._threads = []
+
+    def start(self):
+        with self._start_lock:
+            if self._threads and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked child: the parent's threads didn't survive and its queued messages aren't ours
+                self._reset()
+            self._pid = os.getpid()
+            self._stopping.clear()
+            for name, cfg in self.providers.items():
+                for i in range(cfg["concurrency"]):
+                    self._spawn(self._worker, name, f"notify-{name}-{i}")
+            self._spawn(self._retry_loop, None, "notify-retry")
+        self.replay_spill()
+
+    def _spawn(self, target, channel, thread_name):
+        args = (channel,) if channel else ()
+        thread = threading.Thread(target=target, args=args, name=thread_name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0):
+        """Waits up to ``timeout`` for queued messages to drain, then stops the workers."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self._pending():
+            time.sleep(0.05)
+        self._stopping.set()
+        with self._retry_cond:
+            self._retry_cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0.1))
+        self._threads = []
+
+        leftover = []
+        for channel, q in self._queues.items():
+            while True:
+                try:
+                    leftover.append((channel, q.get_nowait()))
+                except queue.Empty:
+                    break
+                q.task_done()
+        with self._retry_cond:
+            leftover.extend((channel, item) for _, _, channel, item in self._retries)
+            self._retries = []
+        if leftover:
+            self._spill(leftover)
+
+    def _spill(self, leftover: list):
+        if self._spill_file is None:
+            logging.error(f"Notification dispatcher stopped, dropping {len(leftover)} messages: {leftover}")
+            return
+        try:
+            self._spill_file.append([{"channel": channel, "item": item} for channel, item in leftover])
+            logging.warning(f"Notification dispatcher stopped with {len(leftover)} messages pending; "
+                            f"spilled to {self._spill_file.path}")
+        except (OSError, TypeError) as e:
+            logging.error(f"Could not spill {len(leftover)} notifications, dropping them: {e} | {leftover}")
+
+    def replay_spill(self) -> int:
+        """Re-queues notifications spilled by an earlier stop; returns how many."""
+        if self._spill_file is None:
+            return 0
+        try:
+            count = self._spill_file.replay(lambda record: self._queues[record["channel"]].put(record["item"]))
+        except OSError as e:
+            logging.error(f"Could not replay spilled notifications: {e}")
+            return 0
+        if count:
+            logging.info(f"Re-queued {count} spilled notifications from {self._spill_file.path}")
+        return count
+
+    def _pending(self) -> bool:
+        """Whether any message is queued, being delivered or waiting for a retry."""
+        with self._retry_cond:
+            return bool(self._retries) or any(q.unfinished_tasks for q in self._queues.values())
+
+    def _claim_key(self, key: str) -> bool:
+        """Returns False if ``key`` was already accepted."""
+        if key in self._seen_keys:
+            return False
+        if self._redis is not None:
+            try:
+                if not self._redis.set(f"notify:key:{key}", 1, nx=True, ex=self._idempotency_ttl):
+                    self._seen_keys.set(key, True)
+                    return False
+            except redis.RedisError as e:
+                logging.warning(f"Notification idempotency check failed, falling back to local: {e}")
+        self._seen_keys.set(key, True)
+        return True
+
+    def _release_key(self, key: str):
+        """Forgets an accepted key, so the same message can be enqueued again."""
+        self._seen_keys.pop(key)
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"notify:key:{key}")
+            except redis.RedisError as e:
+                logging.warning(f"Notification idempotency key release failed: {e}")
+
+    def enqueue(self, channel: str, payload: dict, idempotency_key: Optional[str] = None) -> bool:
+        """Queues a notification; returns False if it duplicates an earlier key."""
+        if idempotency_key and not self._claim_key(f"{channel}:{idempotency_key}"):
+            self.metrics["duplicates"] += 1
+            return False
+        self.start()
+        self._queues[channel].put({"payload": payload, "key": idempotency_key, "attempts": 0})
+        self.metrics["enqueued"] += 1
+        return True
+
+    def _next_batch(self, channel: str) -> list:
+        """Blocks for one message, then gathers more for up to the batch window."""
+        q = self._queues[channel]
+        batch_size = self.providers[channel]["batch_size"]
+        try:
+            batch = [q.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self, channel: str):
+        q = self._queues[channel]
+        deliver = self.providers[channel]["deliver"]
+        while not self._stopping.is_set():
+            batch = self._next_batch(channel)
+            if not batch:
+                continue
+            try:
+                try:
+                    failed = deliver(batch, self._buckets[channel].acquire)
+                except Exception as e:
+                    failed = [(item, str(e)) for item in batch]
+                self.metrics["delivered"] += len(batch) - len(failed)
+                for item, detail in failed:
+                    self._schedule_retry(channel, item, detail)
+            finally:
+                for _ in batch:
+                    q.task_done()
+
+    def _schedule_retry(self, channel: str, item: dict, detail: str):
+        item["attempts"] += 1
+        if item["attempts"] >= self.max_attempts:
+            self.metrics["dead_lettered"] += 1
+            logging.error(f"Notification to {channel} dropped after {item['attempts']} attempts: {detail} | {item['payload']}")
+            if item["key"]:
+                self._release_key(f"{channel}:{item['key']}")
+            return
+        delay = self.backoff_base * (2 ** (item["attempts"] - 1)) * (1 + random.random() * 0.1)
+        logging.warning(f"Notification to {channel} failed ({detail}), retrying in {delay:.1f}s")
+        self.metrics["retried"] += 1
+        # Held in the retry heap (which stop() also waits on) until it's due, then put back on the queue
+        with self._retry_cond:
+            self._seq += 1
+            heapq.heappush(self._retries, (time.monotonic() + delay, self._seq, channel, item))
+            self._retry_cond.notify()
+
+    def _retry_loop(self):
+        while not self._stopping.is_set():
+            with self._retry_cond:
+                if not self._retries:
+                    self._retry_cond.wait(timeout=1.0)
+                    continue
+                due_at, _, channel, item = self._retries[0]
+                wait = due_at - time.monotonic()
+                if wait > 0:
+                    self._retry_cond.wait(timeout=wait)
+                    continue
+                heapq.heappop(self._retries)
+                # Re-queued before the lock is released, so _pending() never misses it
+                self._queues[channel].put(item)
+
+notification_dispatcher = NotificationDispatcher(
+    PROVIDERS,
+    max_attempts=NOTIFICATION_MAX_ATTEMPTS,
+    backoff_base=NOTIFICATION_BACKOFF_BASE_SECONDS,
+    batch_window=NOTIFICATION_BATCH_WINDOW_SECONDS,
+    idempotency_ttl=NOTIFICATION_IDEMPOTENCY_TTL_SECONDS,
+    redis_url=NOTIFICATION_REDIS_URL,
+    spill_path=NOTIFICATION_SPILL_PATH,
+)
+
+def notify_slack(message: str, channel: Optional[str] = None, idempotency_key: Optional[str] = None) -> bool:
+    """Queues a Slack message (default channel unless ``channel`` is given)."""
+    return notification_dispatcher.enqueue("slack", {"message": message, "channel": channel}, idempotency_key)
+
+def notify_email(to_email: str, subject: str, message: str, idempotency_key: Optional[str] = None) -> bool:
+    """Queues an email."""
+    return notification_dispatcher.enqueue(
+        "email", {"to_email": to_email, "subject": subject, "message": message}, idempotency_key
+    )
+
+def notify_sms(to: str, message: str, idempotency_key: Optional[str] = None) -> bool:
+    """Queues an SMS."""
+    return notification_dispatcher.enqueue("sms", {"to": to, "message": message}, idempotency_key)
+
+def notify_whatsapp(to: str, message: str, idempotency_key: Optional[str] = None) -> bool:
+    """Queues a WhatsApp message."""
+    return notification_dispatcher.enqueue("whatsapp", {"to": to, "message": message}, idempotency_key)
@@ -0,0 +1,147 @@
+import logging
+import math
+import re
+from collections import Counter
+from typing import List, Optional
+import numpy as np
+from backend.app.core.config import (
+    RETRIEVAL_RRF_K,
+    RETRIEVAL_LEXICAL_MIN_RATIO,
+    RETRIEVAL_LEXICAL_MIN_SCORE,
+    RETRIEVAL_TOP_K,
+    RETRIEVAL_CANDIDATES,
+    RETRIEVAL_MIN_SCORE,
+    RETRIEVAL_BM25_WEIGHT,
+    RETRIEVAL_MMR_LAMBDA,
+)
+from backend.app.services.bm25_index import BM25_K1, BM25_B, tokenize, get_bm25_index
+from backend.app.services.classifier import is_small_talk
+from backend.app.services.vector_store import get_embeddings, search_with_vectors
+
+# Tokens that embeddings handle poorly: error codes, invoice numbers, SKUs
+_CODE_TOKEN_RE = re.compile(r"^(?=.*\d)[A-Za-z0-9][A-Za-z0-9_\-./#]*$")
+LEXICAL_QUERY_MAX_WORDS = 4
+
+def is_lexical_query(query: str) -> bool:
+    """True for short queries made of identifiers, e.g. "INV-20391" or "error 0x80070005"."""
+    words = query.split()
+    if not words or len(words) > LEXICAL_QUERY_MAX_WORDS:
+        return False
+    return any(_CODE_TOKEN_RE.match(word.strip("?!,.:;\"'()")) for word in words)
+
+def bm25_scores(query: str, texts: List[str]) -> np.ndarray:
+    """Okapi BM25 of ``query`` against each text, with IDF taken over ``texts`` themselves.
+
+    Meant for reranking a small candidate set, so there is no index.
+    """
+    query_terms = set(tokenize(query))
+    docs = [Counter(tokenize(text)) for text in texts]
+    if not query_terms or not docs:
+        return np.zeros(len(texts), dtype=np.float32)
+    lengths = np.array([sum(doc.values()) for doc in docs], dtype=np.float32)
+    average_length = max(float(lengths.mean()), 1.0)
+    scores = np.zeros(len(docs), dtype=np.float32)
+    for term in query_terms:
+        frequencies = np.array([doc.get(term, 0) for doc in docs], dtype=np.float32)
+        containing = int((frequencies > 0).sum())
+        if not containing:
+            continue
+        idf = math.log(1 + (len(docs) - containing + 0.5) / (containing + 0.5))
+        scores += idf * frequencies * (BM25_K1 + 1) / (
+            frequencies + BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+        )
+    return scores
+
+def _min_max(values: np.ndarray) -> np.ndarray:
+    spread = values.max() - values.min()
+    return (values - values.min()) / spread if spread > 0 else np.ones_like(values)
+
+def mmr(vectors: np.ndarray, relevance: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """Maximal marginal relevance: greedily picks relevant rows that are unlike those already picked."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    selected = [int(np.argmax(relevance))]
+    max_similarity = vectors @ vectors[selected[0]]
+    while len(selected) < min(k, len(relevance)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, vectors @ vectors[best])
+    return selected
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RETRIEVAL_RRF_K) -> List[str]:
+    """Merges ranked id lists; each list contributes 1 / (k + rank) per id."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def lexical_matches(query: str, k: int) -> List[dict]:
+    """BM25 hits from the local index that clear the absolute floor and score close enough to the best one."""
+    index = get_bm25_index()
+    hits = index.search(query, k) if index is not None else []
+    if not hits:
+        return []
+    floor = max(hits[0]["score"] * RETRIEVAL_LEXICAL_MIN_RATIO, RETRIEVAL_LEXICAL_MIN_SCORE)
+    return [hit for hit in hits if hit["score"] >= floor]
+
+def dense_ranking(query: str, embedding: List[float], candidates: int, min_score: float,
+                  k: int = RETRIEVAL_TOP_K) -> List[dict]:
+    """The top ``k`` of the vector candidates above ``min_score``, picked by MMR over dense + BM25 relevance."""
+    matches = [match for match in search_with_vectors(embedding, candidates) if match["score"] >= min_score]
+    if not matches:
+        return []
+
+    dense = np.array([match["score"] for match in matches], dtype=np.float32)
+    lexical = bm25_scores(query, [match["text"] for match in matches])
+    relevance = (1 - RETRIEVAL_BM25_WEIGHT) * _min_max(dense)
+    if lexical.any():
+        relevance += RETRIEVAL_BM25_WEIGHT * _min_max(lexical)
+    vectors = np.array([match["vector"] for match in matches], dtype=np.float32)
+
+    ranked = []
+    for row in mmr(vectors, relevance, k, RETRIEVAL_MMR_LAMBDA):
+        match = matches[row]
+        ranked.append({"id": match["id"], "text": match["text"], "metadata": match["metadata"],
+                       "score": match["score"], "relevance": float(relevance[row])})
+    return ranked
+
+def retrieve(query: str, embedding: Optional[List[float]] = None, k: int = RETRIEVAL_TOP_K,
+             candidates: int = RETRIEVAL_CANDIDATES, min_score: float = RETRIEVAL_MIN_SCORE) -> List[dict]:
+    """Retrieves up to ``k`` knowledge chunks for ``query``, best first.
+
+    Vector candidates under ``min_score`` are dropped, the rest are ordered by
+    MMR over a blend of the dense score and BM25 among the candidates. That
+    ranking is fused with hits from the local BM25 index by reciprocal rank,
+    so exact identifiers the embeddings miss still surface. Lexical hits only
+    stand on their own for identifier-style queries: those are answered from
+    the index alone, without an embedding call, and otherwise a query with
+    no vector candidate above ``min_score`` retrieves nothing. Small talk
+    skips retrieval entirely.
+    """
+    if is_small_talk(query):
+        return []
+
+    lexical = lexical_matches(query, candidates)
+    if embedding is None and lexical and is_lexical_query(query):
+        logging.info(f"Retrieval: lexical-only, {len(lexical)} BM25 hits")
+        return lexical[:k]
+    if embedding is None:
+        embedding = get_embeddings().embed_query(query)
+
+    dense = dense_ranking(query, embedding, max(candidates, k), min_score, k)
+    if not dense and not is_lexical_query(query):
+        # Weak keyword overlap alone isn't enough to bypass the dense threshold
+        logging.info(f"Retrieval: no vector candidates above threshold, ignoring {len(lexical)} BM25 hits")
+        return []
+    if not lexical:
+        logging.info(f"Retrieval: {len(dense)} vector candidates above threshold, kept {min(k, len(dense))}")
+        return dense[:k]
+
+    by_id = {hit["id"]: hit for hit in lexical}
+    by_id.update({match["id"]: match for match in dense})
+    fused = reciprocal_rank_fusion([[match["id"] for match in dense], [hit["id"] for hit in lexical]])
+    logging.info(f"Retrieval: {len(dense)} vector candidates, {len(lexical)} BM25 hits, kept {min(k, len(fused))}")
+    return [by_id[doc_id] for doc_id in fused[:k]]
@@ -0,0 +1,61 @@
+import logging
+import redis
+from backend.app.core.config import CELERY_BROKER_URL, CHAT_PRIORITY_TENANTS
+from backend.app.core.metrics import CELERY_QUEUE_DEPTH
+from backend.app.services.classifier import classify_locally
+
+# One queue per category so long technical RAG turns can't hold up billing
+# questions and escalations. Each queue is served by its own worker pool
+# (see docker-compose.yml).
+CHAT_QUEUES = {
+    "escalation": "chat.escalation",
+    "billing": "chat.billing",
+    "general": "chat.general",
+    "technical": "chat.technical",
+}
+DEFAULT_CHAT_QUEUE = CHAT_QUEUES["general"]
+
+# Redis-transport priorities: 0 is served first, 9 last
+CATEGORY_PRIORITY = {"escalation": 0, "billing": 3, "general": 5, "technical": 6}
+DEFAULT_PRIORITY = 5
+PRIORITY_TENANT_BOOST = 2
+PRIORITY_STEPS = list(range(10))
+# Separator between queue name and priority in the broker's Redis list keys
+PRIORITY_SEP = ":"
+
+def route_chat(user_id: str, message: str) -> dict:
+    """Picks the queue and priority for a chat task from a local pre-classification.
+
+    Queries the keyword classifier isn't sure about go to the general queue;
+    the worker still classifies them properly.
+    """
+    category = classify_locally(message)
+    queue = CHAT_QUEUES.get(category, DEFAULT_CHAT_QUEUE)
+    priority = CATEGORY_PRIORITY.get(category, DEFAULT_PRIORITY)
+    if user_id in CHAT_PRIORITY_TENANTS:
+        priority = max(priority - PRIORITY_TENANT_BOOST, 0)
+    return {"queue": queue, "priority": priority, "category": category}
+
+_broker = None
+
+def queue_depths() -> dict:
+    """Counts waiting tasks per chat queue, summed over the priority sub-queues."""
+    global _broker
+    if _broker is None:
+        _broker = redis.Redis.from_url(CELERY_BROKER_URL)
+    queues = list(CHAT_QUEUES.values())
+    pipe = _broker.pipeline()
+    for queue in queues:
+        for step in PRIORITY_STEPS:
+            pipe.llen(queue if step == 0 else f"{queue}{PRIORITY_SEP}{step}")
+    lengths = pipe.execute()
+    steps = len(PRIORITY_STEPS)
+    return {queue: sum(lengths[i * steps:(i + 1) * steps]) for i, queue in enumerate(queues)}
+
+def sample_queue_depths():
+    """Updates the queue-depth gauge; called on each /metrics scrape."""
+    try:
+        for queue, depth in queue_depths().items():
+            CELERY_QUEUE_DEPTH.labels(queue).set(depth)
+    except redis.RedisError as e:
+        logging.warning(f"Queue depth sampling failed: {e}")
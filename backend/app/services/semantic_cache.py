@@ -0,0 +1,188 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, List
+import numpy as np
+import redis
+from backend.app.core.metrics import record_cache
+from backend.app.core.config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_REDIS_URL,
+    SEMANTIC_CACHE_SYNC_SECONDS,
+)
+
+REDIS_INDEX_KEY = "semcache:index"
+REDIS_ENTRY_PREFIX = "semcache:entry:"
+
+class SemanticCache:
+    """Cross-user answer cache matched on query-embedding cosine similarity.
+
+    Embeddings live in a preallocated float32 matrix searched by brute force;
+    entries expire after ``ttl_seconds`` and the least recently used entry is
+    evicted once ``max_entries`` is reached. An optional Redis tier shares
+    entries between worker processes.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: int, max_entries: int, redis_url: Optional[str] = None):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # entry_id -> entry dict, in LRU order
+        self._slot_ids: List[Optional[str]] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._vectors = None  # allocated on first store, once the dimension is known
+        self._lock = threading.Lock()
+        # Held (non-blocking) while pulling from Redis, so only one thread syncs at a time
+        self._sync_lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._last_sync = 0.0
+        self._synced_until = 0.0
+        self.metrics = {"hits": 0, "misses": 0, "redis_hits": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def _normalise(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding) -> Optional[dict]:
+        """Returns the cached entry closest to ``embedding`` above the threshold."""
+        vector = self._normalise(embedding)
+        entry = self._search(vector)
+        redis_hit = False
+        if entry is None and self._redis is not None and self._sync_from_redis():
+            entry = self._search(vector)
+            redis_hit = entry is not None
+
+        with self._lock:
+            if entry is None:
+                self.metrics["misses"] += 1
+            else:
+                self.metrics["hits"] += 1
+                self.metrics["redis_hits"] += redis_hit
+        record_cache("semantic", "miss" if entry is None else "hit")
+        return entry
+
+    def store(self, query: str, embedding, response: str, category: str):
+        """Adds an answer to the local index and, if configured, to Redis."""
+        vector = self._normalise(embedding)
+        entry_id = uuid.uuid4().hex
+        created_at = time.time()
+        entry = {"query": query, "response": response, "category": category, "created_at": created_at}
+        self._insert(entry_id, vector, entry)
+
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                key = f"{REDIS_ENTRY_PREFIX}{entry_id}"
+                pipe.hset(key, mapping={"entry": json.dumps(entry), "embedding": vector.tobytes()})
+                pipe.expire(key, self.ttl_seconds)
+                pipe.zadd(REDIS_INDEX_KEY, {entry_id: created_at})
+                pipe.zremrangebyscore(REDIS_INDEX_KEY, 0, created_at - self.ttl_seconds)
+                pipe.execute()
+            except redis.RedisError as e:
+                logging.warning(f"Semantic cache Redis write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics, size = dict(self.metrics), len(self._entries)
+        lookups = metrics["hits"] + metrics["misses"]
+        return {
+            **metrics,
+            "size": size,
+            "hit_ratio": round(metrics["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def _search(self, vector: np.ndarray) -> Optional[dict]:
+        with self._lock:
+            if not self._entries or self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                return None
+            scores = self._vectors @ vector
+            now = time.time()
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.threshold:
+                    return None
+                entry_id = self._slot_ids[slot]
+                if entry_id is None:
+                    continue
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.metrics["expirations"] += 1
+                    continue
+                self._entries.move_to_end(entry_id)
+                return {
+                    "query": entry["query"],
+                    "response": entry["response"],
+                    "category": entry["category"],
+                    "similarity": float(scores[slot]),
+                }
+            return None
+
+    def _insert(self, entry_id: str, vector: np.ndarray, entry: dict):
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if not self._free_slots:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.metrics["evictions"] += 1
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._slot_ids[slot] = entry_id
+            self._entries[entry_id] = {**entry, "slot": slot}
+
+    def _remove(self, entry_id: str):
+        """Frees an entry's slot. Caller must hold the lock."""
+        entry = self._entries.pop(entry_id)
+        slot = entry["slot"]
+        self._vectors[slot] = 0.0
+        self._slot_ids[slot] = None
+        self._free_slots.append(slot)
+
+    def _sync_from_redis(self) -> bool:
+        """Pulls entries other workers stored since the last sync. Returns True if any were added."""
+        if not self._sync_lock.acquire(blocking=False):
+            return False
+        try:
+            now = time.time()
+            with self._lock:
+                if now - self._last_sync < SEMANTIC_CACHE_SYNC_SECONDS:
+                    return False
+                self._last_sync = now
+
+            since = max(self._synced_until, now - self.ttl_seconds)
+            new_ids = self._redis.zrangebyscore(REDIS_INDEX_KEY, f"({since}", "+inf", withscores=True)
+            added = False
+            for raw_id, created_at in new_ids:
+                entry_id = raw_id.decode()
+                self._synced_until = max(self._synced_until, created_at)
+                with self._lock:
+                    known = entry_id in self._entries
+                if known:
+                    continue
+                data = self._redis.hgetall(f"{REDIS_ENTRY_PREFIX}{entry_id}")
+                if not data:
+                    continue
+                vector = np.frombuffer(data[b"embedding"], dtype=np.float32)
+                self._insert(entry_id, vector, json.loads(data[b"entry"]))
+                added = True
+            return added
+        except redis.RedisError as e:
+            logging.warning(f"Semantic cache Redis sync failed: {e}")
+            return False
+        finally:
+            self._sync_lock.release()
+
+semantic_cache = SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    redis_url=SEMANTIC_CACHE_REDIS_URL,
+) if SEMANTIC_CACHE_ENABLED else None
@@ -0,0 +1,69 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+class SpillFile:
+    """Append-only JSON-lines file for records that couldn't be delivered, replayed later.
+
+    Several processes may share one file: appends and replays hold an
+    exclusive flock on ``<path>.lock``, and each replay first moves the file
+    to a name unique to it. Replays hold the lock until their copy is
+    consumed, so a copy found under the lock was left by a replay that
+    crashed part-way and is taken over.
+    """
+
+    def __init__(self, path: str, encode: Optional[Callable] = None, decode: Optional[Callable] = None):
+        self.path = path
+        self._encode = encode
+        self._decode = decode
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Holds the lock for this process's threads and, via flock, for other processes."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, records: List[dict]):
+        """Appends ``records`` durably (fsync). Raises OSError/TypeError on failure."""
+        lines = "".join(json.dumps(record, default=self._encode) + "\n" for record in records)
+        with self._locked(), open(self.path, "a") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self, handle: Callable[[dict], None]) -> int:
+        """Passes every spilled record to ``handle`` and removes them from the file; returns how many."""
+        count = 0
+        with self._locked():
+            pending = glob.glob(f"{glob.escape(self.path)}.replaying-*")
+            if os.path.exists(self.path):
+                replaying = f"{self.path}.replaying-{os.getpid()}-{uuid.uuid4().hex}"
+                os.replace(self.path, replaying)
+                pending.append(replaying)
+            for path in pending:
+                with open(path) as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line, object_hook=self._decode)
+                        except json.JSONDecodeError:
+                            # A torn last line from a crash mid-append
+                            logging.warning(f"Skipping unreadable spilled record in {path}")
+                            continue
+                        handle(record)
+                        count += 1
+                os.remove(path)
+        return count
@@ -0,0 +1,113 @@
+import threading
+import logging
+from typing import List
+import httpx
+from backend.app.core.config import (
+    VECTOR_STORE_BACKEND,
+    LOCAL_VECTOR_STORE_PATH,
+    LOCAL_VECTOR_STORE_QUANTIZE,
+    EMBEDDINGS_PROVIDER,
+    HASH_EMBEDDINGS_DIMENSION,
+    EMBEDDINGS_MAX_CONNECTIONS,
+    EMBEDDINGS_TIMEOUT_SECONDS,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_CACHE_REDIS_URL,
+    EMBEDDING_CACHE_TTL_SECONDS,
+)
+
+# Backend-agnostic access to the knowledge-base vector store. Backend modules
+# are imported lazily so the local backend runs without Pinecone credentials.
+_embeddings = None
+_local_store = None
+_lock = threading.RLock()
+
+def get_embeddings():
+    """Returns the shared embeddings client for the configured provider, behind the embedding cache."""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                if EMBEDDINGS_PROVIDER == "hash":
+                    from backend.app.services.vector_store_local import HashEmbeddings
+                    _embeddings = HashEmbeddings(dimension=HASH_EMBEDDINGS_DIMENSION)
+                else:
+                    from langchain_openai import OpenAIEmbeddings
+                    http_client = httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=EMBEDDINGS_MAX_CONNECTIONS,
+                            max_keepalive_connections=EMBEDDINGS_MAX_CONNECTIONS,
+                        ),
+                        timeout=EMBEDDINGS_TIMEOUT_SECONDS,
+                    )
+                    _embeddings = OpenAIEmbeddings(http_client=http_client)
+                if EMBEDDING_CACHE_ENABLED:
+                    from backend.app.services.embedding_cache import CachedEmbeddings
+                    _embeddings = CachedEmbeddings(
+                        _embeddings,
+                        max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+                        redis_url=EMBEDDING_CACHE_REDIS_URL,
+                        ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+                    )
+    return _embeddings
+
+def get_local_vectorstore():
+    """Returns the process-wide local vector store, loading it from disk on first use."""
+    global _local_store
+    if _local_store is None:
+        with _lock:
+            if _local_store is None:
+                from backend.app.services.vector_store_local import LocalVectorStore
+                _local_store = LocalVectorStore(
+                    get_embeddings(), path=LOCAL_VECTOR_STORE_PATH, quantize=LOCAL_VECTOR_STORE_QUANTIZE
+                )
+                logging.info(f"Local vector store loaded: {len(_local_store)} vectors from {LOCAL_VECTOR_STORE_PATH}")
+    return _local_store
+
+def get_vectorstore():
+    """Returns the configured vector store; both expose ``similarity_search(query, k)``."""
+    if VECTOR_STORE_BACKEND == "local":
+        return get_local_vectorstore()
+    from backend.app.services.vector_store_pinecone import get_pinecone_vectorstore
+    return get_pinecone_vectorstore()
+
+def search_with_vectors(embedding: List[float], k: int) -> List[dict]:
+    """Top ``k`` matches as dicts with id, text, metadata, cosine score and the stored vector."""
+    if VECTOR_STORE_BACKEND == "local":
+        return get_local_vectorstore().search_with_vectors(embedding, k)
+    from backend.app.services.vector_store_pinecone import get_pinecone_index
+    response = get_pinecone_index().query(vector=embedding, top_k=k, include_values=True, include_metadata=True)
+    results = []
+    for match in response.matches:
+        metadata = dict(match.metadata or {})
+        results.append({"id": match.id, "text": metadata.pop("text", ""), "metadata": metadata,
+                        "score": match.score, "vector": match.values})
+    return results
+
+def existing_vector_ids(ids: List[str]) -> set:
+    """Returns which of ``ids`` the configured backend already stores."""
+    if VECTOR_STORE_BACKEND == "local":
+        return get_local_vectorstore().existing_ids(ids)
+    from backend.app.services.vector_store_pinecone import get_pinecone_index
+    index = get_pinecone_index()
+    found = set()
+    for start in range(0, len(ids), 200):
+        found.update(index.fetch(ids=ids[start:start + 200]).vectors.keys())
+    return found
+
+def upsert_vectors(ids: List[str], vectors: List[List[float]], texts: List[str], metadatas: List[dict]):
+    """Writes vectors with their text to the configured backend."""
+    if VECTOR_STORE_BACKEND == "local":
+        records = [{"text": text, "metadata": metadata} for text, metadata in zip(texts, metadatas)]
+        get_local_vectorstore().upsert(ids, vectors, records)
+        return
+    from backend.app.services.vector_store_pinecone import get_pinecone_index
+    get_pinecone_index().upsert(vectors=[
+        {"id": vector_id, "values": vector, "metadata": {**metadata, "text": text}}
+        for vector_id, vector, text, metadata in zip(ids, vectors, texts, metadatas)
+    ])
+
+def persist_vectorstore():
+    """Flushes the local index to disk (Pinecone writes are already durable)."""
+    if VECTOR_STORE_BACKEND == "local":
+        get_local_vectorstore().save()
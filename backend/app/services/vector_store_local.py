@@ -0,0 +1,280 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.jsonl"
+META_FILE = "meta.json"
+# Names the version directory holding the live index; replacing it is what makes a save visible
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v-"
+INT8_SCALE = 127.0
+SEARCH_BLOCK_ROWS = 65536
+# Rows reserved up front; capacity then doubles, so upserts copy the matrix only O(log n) times
+MIN_CAPACITY_ROWS = 1024
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embedder (hashing trick over word tokens).
+
+    Only lexical overlap is captured, which is enough for tests and local
+    development without an OpenAI key.
+    """
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+class LocalVectorStore(VectorStore):
+    """In-process vector index: normalised embeddings in one NumPy matrix.
+
+    Search is a matrix-vector product plus ``argpartition`` top-k. The index
+    is persisted as a ``.npy`` matrix (memory-mapped on load) next to a JSONL
+    file of ids, texts and metadata, and can be stored as int8 to cut memory
+    by 4x at a small recall cost. The on-disk dtype wins over ``quantize``
+    when an existing index is loaded.
+
+    Rows live in a buffer with spare capacity that grows geometrically;
+    ``_matrix`` is the view of its filled rows.
+    """
+
+    def __init__(self, embedding: Embeddings, path: Optional[str] = None, quantize: bool = False):
+        self._embedding = embedding
+        self.path = path
+        self.quantize = quantize
+        self._matrix = None
+        self._buffer = None
+        self._ids: List[str] = []
+        self._records: List[dict] = []
+        self._positions = {}
+        self._lock = threading.Lock()
+        if path and self._live_dir() is not None:
+            self.load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # Persistence
+    def _live_dir(self, path: Optional[str] = None) -> Optional[str]:
+        """The version named by CURRENT, or ``path`` itself for an index saved before versioning."""
+        path = path or self.path
+        try:
+            with open(os.path.join(path, CURRENT_FILE)) as f:
+                return os.path.join(path, f.read().strip())
+        except FileNotFoundError:
+            return path if os.path.exists(os.path.join(path, VECTORS_FILE)) else None
+
+    def load(self):
+        """Loads the live version, following CURRENT again if a concurrent save removed it mid-load."""
+        while True:
+            directory = self._live_dir()
+            try:
+                self._load_version(directory)
+                return
+            except FileNotFoundError:
+                if self._live_dir() == directory:
+                    raise
+
+    def _load_version(self, directory: str):
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        # Memory-mapped read-only; the first upsert copies it into a growable buffer
+        matrix = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        ids, records = [], []
+        with open(os.path.join(directory, RECORDS_FILE)) as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record.pop("id"))
+                records.append(record)
+        if not len(ids) == len(matrix) == meta.get("count", len(ids)):
+            raise ValueError(
+                f"Vector index at {directory} is inconsistent: meta.json says {meta.get('count')} rows, "
+                f"found {len(matrix)} vectors and {len(ids)} records"
+            )
+
+        quantize = meta.get("dtype") == "int8"
+        if quantize != self.quantize:
+            logging.warning(
+                f"Vector index at {self.path} is stored as {meta.get('dtype')}; "
+                f"using that instead of quantize={self.quantize}"
+            )
+        self.quantize = quantize
+        self._matrix = matrix
+        self._buffer = None
+        self._ids, self._records = ids, records
+        self._positions = {vector_id: i for i, vector_id in enumerate(self._ids)}
+
+    def save(self, path: Optional[str] = None):
+        """Writes the index to a new version directory, then points CURRENT at it.
+
+        Replacing CURRENT is a single atomic rename, so readers see either the
+        previous version or the new one, never a mix of the two. Versions
+        older than the live one are removed afterwards; indexes already loaded
+        from them keep working, since their files stay mapped until closed.
+        """
+        path = path or self.path
+        version = f"{VERSION_PREFIX}{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        directory = os.path.join(path, version)
+        os.makedirs(directory)
+        with self._lock:
+            matrix = self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=np.float32)
+            np.save(os.path.join(directory, VECTORS_FILE), np.ascontiguousarray(matrix))
+            with open(os.path.join(directory, RECORDS_FILE), "w") as f:
+                for vector_id, record in zip(self._ids, self._records):
+                    f.write(json.dumps({"id": vector_id, **record}) + "\n")
+            with open(os.path.join(directory, META_FILE), "w") as f:
+                json.dump({"dtype": "int8" if self.quantize else "float32", "count": len(self._ids),
+                           "dimension": int(matrix.shape[1]) if matrix.ndim == 2 else 0}, f)
+            with open(os.path.join(path, CURRENT_FILE + ".tmp"), "w") as f:
+                f.write(version)
+            os.replace(os.path.join(path, CURRENT_FILE + ".tmp"), os.path.join(path, CURRENT_FILE))
+        self._remove_old_versions(path)
+
+    def _remove_old_versions(self, path: str):
+        """Deletes versions older than the live one (and files from before versioning)."""
+        live = os.path.basename(self._live_dir(path))
+        for name in os.listdir(path):
+            if name.startswith(VERSION_PREFIX) and name < live:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        for name in (VECTORS_FILE, RECORDS_FILE, META_FILE):
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+
+    # Writes
+    def _encode(self, vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        if self.quantize:
+            return np.clip(np.rint(matrix * INT8_SCALE), -127, 127).astype(np.int8)
+        return matrix
+
+    def _reserve(self, rows: int, dimension: int, dtype) -> np.ndarray:
+        """Returns a writable buffer holding the current rows with room for ``rows`` in total (caller holds the lock)."""
+        count = len(self._matrix) if self._matrix is not None else 0
+        buffer = self._buffer
+        if buffer is not None and len(buffer) >= rows:
+            return buffer
+        capacity = max(rows, MIN_CAPACITY_ROWS, 2 * (len(buffer) if buffer is not None else count))
+        grown = np.zeros((capacity, dimension), dtype=dtype)
+        if count:
+            grown[:count] = self._matrix
+        self._buffer = grown
+        return grown
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], records: List[dict]):
+        """Inserts or replaces vectors by id."""
+        if not ids:
+            return
+        encoded = self._encode(vectors)
+        with self._lock:
+            new_ids = len({vector_id for vector_id in ids if vector_id not in self._positions})
+            buffer = self._reserve(len(self._ids) + new_ids, encoded.shape[1], encoded.dtype)
+            for vector_id, row, record in zip(ids, encoded, records):
+                position = self._positions.get(vector_id)
+                if position is None:
+                    position = self._positions[vector_id] = len(self._ids)
+                    self._ids.append(vector_id)
+                    self._records.append(record)
+                else:
+                    self._records[position] = record
+                buffer[position] = row
+            self._matrix = buffer[:len(self._ids)]
+
+    def existing_ids(self, ids: Iterable[str]) -> set:
+        return {vector_id for vector_id in ids if vector_id in self._positions}
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        vectors = self._embedding.embed_documents(texts)
+        self.upsert(ids, vectors, [{"text": text, "metadata": metadata} for text, metadata in zip(texts, metadatas)])
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   path: Optional[str] = None, quantize: bool = False, **kwargs: Any) -> "LocalVectorStore":
+        store = cls(embedding, path=path, quantize=quantize)
+        store.add_texts(texts, metadatas=metadatas)
+        return store
+
+    # Search
+    def search_vector(self, embedding: List[float], k: int = 4) -> List[Tuple[int, float]]:
+        """Returns (row, cosine score) pairs for the top ``k`` rows."""
+        matrix = self._matrix
+        if matrix is None or len(matrix) == 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+
+        if self.quantize:
+            scores = np.concatenate([
+                matrix[start:start + SEARCH_BLOCK_ROWS].astype(np.float32) @ query
+                for start in range(0, len(matrix), SEARCH_BLOCK_ROWS)
+            ]) / INT8_SCALE
+        else:
+            scores = matrix @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def search_with_vectors(self, embedding: List[float], k: int = 4) -> List[dict]:
+        """Top ``k`` records with their cosine score and (dequantised) vector."""
+        results = []
+        for row, score in self.search_vector(embedding, k):
+            vector = np.asarray(self._matrix[row], dtype=np.float32)
+            if self.quantize:
+                vector = vector / INT8_SCALE
+            record = self._records[row]
+            results.append({"id": self._ids[row], "text": record["text"], "metadata": record.get("metadata", {}),
+                            "score": score, "vector": vector})
+        return results
+
+    def _document(self, row: int) -> Document:
+        record = self._records[row]
+        return Document(page_content=record["text"], metadata={**record.get("metadata", {}), "id": self._ids[row]})
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        return [(self._document(row), score) for row, score in self.search_vector(embedding, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
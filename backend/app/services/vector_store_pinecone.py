@@ -1,8 +1,11 @@
 import os
-from langchain_openai import OpenAIEmbeddings
+import threading
+import logging
 from dotenv import load_dotenv
-from langchain_pinecone import PineconeVectorStore 
+from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone, ServerlessSpec
+from backend.app.core.config import PINECONE_POOL_THREADS
+from backend.app.services.vector_store import get_embeddings
 
 load_dotenv()
 
@@ -11,46 +14,79 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "support-knowledge-base"
 
 # ✅ Initialize Pinecone Client (Correct way)
-pc = Pinecone(api_key=PINECONE_API_KEY)
+pc = Pinecone(api_key=PINECONE_API_KEY, pool_threads=PINECONE_POOL_THREADS)
+
+# ✅ Process-wide vector store, built lazily on first use
+_vectorstore = None
+_index = None
+_vectorstore_lock = threading.RLock()
 
 # ✅ Check if Index Exists and Create if Necessary
 def create_pinecone_index():
     """Creates a Pinecone index for storing knowledge documents."""
     if INDEX_NAME not in pc.list_indexes().names():
         pc.create_index(
-            name=INDEX_NAME, 
-            dimension=1536, 
+            name=INDEX_NAME,
+            dimension=1536,
             spec=ServerlessSpec(cloud="gcp", region="europe-west4"),
             metric="cosine"  # You can also use 'dotproduct' or 'euclidean'
         )
 
+def _build_vectorstore():
+    """Checks the index once and wraps a long-lived index handle."""
+    global _index
+    create_pinecone_index()  # Control-plane call, only on (re)initialisation
+    _index = pc.Index(INDEX_NAME, pool_threads=PINECONE_POOL_THREADS)
+    return PineconeVectorStore(index=_index, embedding=get_embeddings())
+
 def upload_documents():
     """Upload support articles to Pinecone."""
-    create_pinecone_index()
-    
-    embeddings = OpenAIEmbeddings()
-    vectorstore = PineconeVectorStore(index=pc.Index(INDEX_NAME), embedding=embeddings)
-    
+    vectorstore = get_pinecone_vectorstore()
+
     # Example knowledge base documents
     documents = [
         {"text": "To reset your password, click 'Forgot Password' on the login page and follow the instructions.", "metadata": {"category": "password_reset"}},
         {"text": "Refunds are processed within 5-7 business days. Contact support if you don’t receive it.", "metadata": {"category": "billing"}},
         {"text": "If you’re experiencing login issues, try clearing your cache and cookies.", "metadata": {"category": "technical"}}
     ]
-    
-    # Insert documents into Pinecone
-    for doc in documents:
-        vectorstore.add_texts([doc["text"]], metadatas=[doc["metadata"]])
+
+    # Insert documents into Pinecone in one batch
+    vectorstore.add_texts(
+        [doc["text"] for doc in documents],
+        metadatas=[doc["metadata"] for doc in documents],
+    )
 
     print("✅ Documents successfully uploaded to Pinecone!")
 
 def get_pinecone_vectorstore():
-    """Loads the Pinecone vector database."""
-    create_pinecone_index()  # Ensure index exists
-    embeddings = OpenAIEmbeddings()
-    index = pc.Index(INDEX_NAME)  # Get reference to the Pinecone index
+    """Returns the process-wide Pinecone vector store, initialising it on first use."""
+    global _vectorstore
+    if _vectorstore is None:
+        with _vectorstore_lock:
+            if _vectorstore is None:
+                _vectorstore = _build_vectorstore()
+    return _vectorstore
+
+def get_pinecone_index():
+    """Returns the shared index handle for direct data-plane calls (fetch/upsert)."""
+    get_pinecone_vectorstore()
+    return _index
+
+def refresh_pinecone_vectorstore():
+    """Drops the cached index handle and rebuilds it (e.g. after the index was recreated)."""
+    global _vectorstore
+    with _vectorstore_lock:
+        _vectorstore = _build_vectorstore()
+    logging.info("Pinecone vector store refreshed.")
+    return _vectorstore
 
-    return PineconeVectorStore(index=index, embedding=embeddings)
+def pinecone_health_check():
+    """Checks the index is reachable through the cached handle."""
+    try:
+        stats = get_pinecone_index().describe_index_stats()
+        return {"status": "ok", "index": INDEX_NAME, "vector_count": stats.get("total_vector_count")}
+    except Exception as e:
+        return {"status": "error", "index": INDEX_NAME, "detail": str(e)}
 
 if __name__ == "__main__":
-    upload_documents()
\ No newline at end of file
+    upload_documents()
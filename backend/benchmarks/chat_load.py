@@ -0,0 +1,367 @@
+"""Load test for the chat API with in-process fakes for OpenAI, the vector store, Firestore and Redis.
+
+Boots the FastAPI app from main.py under uvicorn and a Celery worker
+(threads pool, in-memory broker) in the same process. It then drives
+/api/v1/chat/query plus status polling (or /query/stream) at a fixed
+concurrency and reports throughput, end-to-end latency percentiles and
+per-stage timings from the app's own Prometheus histograms. Results are
+written as JSON so runs can be compared across commits.
+
+Usage:
+    python -m backend.benchmarks.chat_load [--requests 200] [--concurrency 16] [--llm-ms 800]
+    python -m backend.benchmarks.chat_load --compare backend/benchmarks/results/<earlier>.json
+
+Needs the project's dependencies (and tiktoken's cl100k_base encoding), but
+no API keys or running services.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+QUESTION_TEMPLATES = [
+    "How do I get a refund for order {n}?",
+    "I was charged twice on invoice INV-{n}, can you help?",
+    "The app shows error E{n} when I try to log in",
+    "How can I reset my password for account {n}?",
+    "Can I change the billing address on subscription {n}?",
+    "Sync keeps failing on device {n}, what should I do?",
+    "I want to speak to a manager about ticket {n}",
+    "What payment methods do you accept for plan {n}?",
+]
+
+KNOWLEDGE_TEMPLATES = [
+    "Refunds for order {n} are processed within 5 business days to the original payment method.",
+    "Invoice INV-{n} can be downloaded from the billing page under Account > Invoices.",
+    "Error E{n} means the session expired; sign out, clear cookies and sign in again.",
+    "To reset the password for account {n}, use the 'Forgot password' link on the login page.",
+    "Billing addresses for subscription {n} can be changed before the next renewal date.",
+    "If sync fails on device {n}, update the app and check that background refresh is enabled.",
+    "Escalations for ticket {n} are handled by a support manager within one business day.",
+    "Plan {n} accepts credit cards, PayPal and bank transfer.",
+]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def install_fakes(args, workdir: str):
+    """Points every external dependency at an in-process fake. Must run before the app is imported."""
+    from backend.benchmarks.fakes import FakeFirestore, FakeRedis
+    import redis
+
+    os.environ.update({
+        "VECTOR_STORE_BACKEND": "local",
+        "EMBEDDINGS_PROVIDER": "hash",
+        "LOCAL_VECTOR_STORE_PATH": os.path.join(workdir, "vectors"),
+        "BM25_INDEX_PATH": os.path.join(workdir, "bm25"),
+        "CHAT_TRANSCRIPT_SPILL_PATH": os.path.join(workdir, "chats.spill.jsonl"),
+        "CELERY_BROKER_URL": "memory://",
+        "CELERY_RESULT_BACKEND": "cache+memory://",
+        "CELERY_METRICS_PORT": "0",
+        "ASYNC_CHAT_PIPELINE": "true" if args.async_pipeline else "false",
+    })
+    # Import-time client constructors only need non-empty credentials
+    for key in ("OPENAI_API_KEY", "SECRET_KEY", "TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "SENDGRID_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+
+    FakeRedis.latency = args.redis_ms / 1000
+    redis.Redis.from_url = FakeRedis.from_url
+
+    firebase = types.ModuleType("backend.app.core.firebase")
+    firebase.db = FakeFirestore(latency=args.firestore_ms / 1000)
+    for name in ("create_user", "get_user", "delete_user", "add_document", "get_document"):
+        def unavailable(*a, _name=name, **kw):
+            raise NotImplementedError(f"{_name} is not available in the benchmark")
+        setattr(firebase, name, unavailable)
+    sys.modules["backend.app.core.firebase"] = firebase
+
+def patch_app(args):
+    """Swaps the OpenAI clients and adds latency to embeddings and vector search."""
+    from backend.benchmarks.fakes import FakeOpenAI, DelayedEmbeddings, delayed
+    from backend.app.services import chat, retrieval, vector_store
+
+    chat.client = FakeOpenAI(args.llm_ms / 1000, args.tokens, args.token_ms / 1000)
+    chat.async_client = FakeOpenAI(args.llm_ms / 1000, args.tokens, args.token_ms / 1000, asynchronous=True)
+    embeddings = vector_store.get_embeddings()
+    if hasattr(embeddings, "base"):
+        embeddings.base = DelayedEmbeddings(embeddings.base, args.embedding_ms / 1000)
+    else:
+        vector_store._embeddings = DelayedEmbeddings(embeddings, args.embedding_ms / 1000)
+    retrieval.search_with_vectors = delayed(retrieval.search_with_vectors, args.vector_ms / 1000)
+    # The in-memory broker polls (1s by default) where Redis blocks on BRPOP
+    chat.celery_app.conf.broker_transport_options = {"polling_interval": 0.005}
+
+def seed_knowledge_base(chunks: int):
+    from backend.app.services.bm25_index import get_bm25_index, BM25Index
+    from backend.app.services.vector_store import get_local_vectorstore
+    from backend.app.core.config import BM25_INDEX_PATH
+
+    texts = [KNOWLEDGE_TEMPLATES[i % len(KNOWLEDGE_TEMPLATES)].format(n=1000 + i) for i in range(chunks)]
+    ids = [f"kb-{i}" for i in range(chunks)]
+    get_local_vectorstore().add_texts(texts, ids=ids)
+    lexical = BM25Index(BM25_INDEX_PATH)
+    for doc_id, text in zip(ids, texts):
+        lexical.add(doc_id, text)
+    lexical.save()
+    get_bm25_index()
+
+def build_workload(requests: int, users: int, repeat_ratio: float, seed: int) -> list:
+    """(user_id, message) pairs; ``repeat_ratio`` of them reuse an earlier question."""
+    rng = random.Random(seed)
+    workload, asked = [], []
+    for i in range(requests):
+        user_id = f"user-{rng.randrange(users)}"
+        if asked and rng.random() < repeat_ratio:
+            message = rng.choice(asked)
+        else:
+            message = rng.choice(QUESTION_TEMPLATES).format(n=rng.randrange(1000, 1000 + 10 * requests))
+            asked.append(message)
+        workload.append((user_id, message))
+    return workload
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(fraction * len(sorted_values)), len(sorted_values) - 1)]
+
+def stage_snapshot() -> dict:
+    """Per-stage (count, sum, buckets) from the chat_stage_seconds histogram."""
+    from backend.app.core.metrics import CHAT_STAGE_SECONDS
+    stages = {}
+    for metric in CHAT_STAGE_SECONDS.collect():
+        for sample in metric.samples:
+            stage = sample.labels["stage"]
+            entry = stages.setdefault(stage, {"count": 0.0, "sum": 0.0, "buckets": {}})
+            if sample.name.endswith("_count"):
+                entry["count"] = sample.value
+            elif sample.name.endswith("_sum"):
+                entry["sum"] = sample.value
+            elif sample.name.endswith("_bucket"):
+                entry["buckets"][float(sample.labels["le"])] = sample.value
+    return stages
+
+def stage_breakdown(before: dict, after: dict) -> dict:
+    """Mean and approximate p95 (bucket upper bound) per stage over the measured run."""
+    breakdown = {}
+    for stage, end in after.items():
+        start = before.get(stage, {"count": 0.0, "sum": 0.0, "buckets": {}})
+        count = end["count"] - start["count"]
+        if count <= 0:
+            continue
+        p95 = None
+        for bound in sorted(end["buckets"]):
+            if end["buckets"][bound] - start["buckets"].get(bound, 0.0) >= 0.95 * count:
+                p95 = bound
+                break
+        breakdown[stage] = {
+            "count": int(count),
+            "mean_ms": round((end["sum"] - start["sum"]) / count * 1000, 1),
+            "p95_ms_upper_bound": None if p95 in (None, float("inf")) else p95 * 1000,
+        }
+    return breakdown
+
+async def send_query(client, user_id: str, message: str, poll_interval: float, timeout: float) -> dict:
+    start = time.perf_counter()
+    response = await client.post("/api/v1/chat/query", json={"user_id": user_id, "message": message})
+    response.raise_for_status()
+    body = response.json()
+    polls = 0
+    status = body.get("category")
+    if body.get("task_id"):
+        deadline = start + timeout
+        while True:
+            await asyncio.sleep(poll_interval)
+            polls += 1
+            result = (await client.get(f"/api/v1/chat/query/status/{body['task_id']}")).json()
+            if result["status"] in ("completed", "failed"):
+                status = result["status"]
+                break
+            if time.perf_counter() > deadline:
+                status = "timeout"
+                break
+    return {"latency": time.perf_counter() - start, "status": status, "polls": polls}
+
+async def send_stream(client, user_id: str, message: str, poll_interval: float, timeout: float) -> dict:
+    start = time.perf_counter()
+    first_token = None
+    status = "incomplete"
+    async with client.stream("POST", "/api/v1/chat/query/stream", json={"user_id": user_id, "message": message}) as response:
+        async for line in response.aiter_lines():
+            if line.startswith("event: token") and first_token is None:
+                first_token = time.perf_counter() - start
+            elif line.startswith("event: done"):
+                status = "completed"
+            elif line.startswith("event: error"):
+                status = "failed"
+    return {"latency": time.perf_counter() - start, "status": status, "first_token": first_token}
+
+async def drive(base_url: str, workload: list, concurrency: int, endpoint: str, poll_interval: float,
+                timeout: float) -> tuple:
+    import httpx
+
+    send = send_stream if endpoint == "stream" else send_query
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        async def one(user_id, message):
+            async with semaphore:
+                try:
+                    return await send(client, user_id, message, poll_interval, timeout)
+                except Exception as e:
+                    return {"latency": None, "status": "error", "error": str(e)}
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(user_id, message) for user_id, message in workload))
+        return results, time.perf_counter() - start
+
+def summarise(results: list, elapsed: float) -> dict:
+    latencies = sorted(r["latency"] for r in results if r["latency"] is not None and r["status"] != "error")
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    summary = {
+        "requests": len(results),
+        "statuses": statuses,
+        "errors": sum(r["status"] in ("error", "failed", "timeout") for r in results),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1) if latencies else None,
+        },
+    }
+    first_tokens = sorted(r["first_token"] for r in results if r.get("first_token") is not None)
+    if first_tokens:
+        summary["first_token_ms"] = {
+            "p50": round(percentile(first_tokens, 0.50) * 1000, 1),
+            "p95": round(percentile(first_tokens, 0.95) * 1000, 1),
+        }
+    polls = [r["polls"] for r in results if "polls" in r]
+    if polls:
+        summary["status_polls_per_request"] = round(statistics.mean(polls), 2)
+    return summary
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline['revision']['commit']})")
+    rows = [("throughput_rps", current["summary"]["throughput_rps"], baseline["summary"]["throughput_rps"])]
+    rows += [(f"latency {key}", current["summary"]["latency_ms"][key], baseline["summary"]["latency_ms"][key])
+             for key in ("p50", "p95", "p99")]
+    for name, now, before in rows:
+        change = f"{(now - before) / before * 100:+.1f}%" if now is not None and before else "n/a"
+        print(f"  {name:<16}{before!s:>10} -> {now!s:<10}{change:>9}")
+
+def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="chat-load-")
+    install_fakes(args, workdir)
+
+    import uvicorn
+    from celery.contrib.testing.worker import start_worker
+    import main
+    from backend.app.services import chat
+
+    patch_app(args)
+    seed_knowledge_base(args.kb_chunks)
+    workload = build_workload(args.warmup + args.requests, args.users, args.repeat_ratio, args.seed)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    with start_worker(chat.celery_app, pool="threads", concurrency=args.workers,
+                      perform_ping_check=False, loglevel="WARNING", shutdown_timeout=30):
+        if args.warmup:
+            asyncio.run(drive(base_url, workload[:args.warmup], args.concurrency, args.endpoint,
+                              args.poll_ms / 1000, args.timeout))
+        before = stage_snapshot()
+        results, elapsed = asyncio.run(drive(base_url, workload[args.warmup:], args.concurrency, args.endpoint,
+                                             args.poll_ms / 1000, args.timeout))
+        stages = stage_breakdown(before, stage_snapshot())
+    server.should_exit = True
+
+    report = {
+        "benchmark": "chat_load",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "config": vars(args),
+        "summary": summarise(results, elapsed),
+        "stages": stages,
+    }
+    return report
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--endpoint", choices=("query", "stream"), default="query")
+    parser.add_argument("--workers", type=int, default=32, help="Celery worker threads")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="Share of requests repeating an earlier question")
+    parser.add_argument("--kb-chunks", type=int, default=500, help="Knowledge-base chunks to seed")
+    parser.add_argument("--llm-ms", type=float, default=800, help="Fake OpenAI latency (to first token when streaming)")
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens per fake answer")
+    parser.add_argument("--token-ms", type=float, default=10, help="Delay between streamed tokens")
+    parser.add_argument("--embedding-ms", type=float, default=40)
+    parser.add_argument("--vector-ms", type=float, default=30)
+    parser.add_argument("--firestore-ms", type=float, default=25)
+    parser.add_argument("--redis-ms", type=float, default=0.5)
+    parser.add_argument("--poll-ms", type=float, default=100, help="Status polling interval")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--sync-pipeline", dest="async_pipeline", action="store_false",
+                        help="Use the LangGraph path instead of the async pipeline")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="JSON results path (default: backend/benchmarks/results/)")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    report = run(args)
+    summary = report["summary"]
+    print(json.dumps(summary, indent=2))
+    print(f"{'stage':<18}{'count':>8}{'mean ms':>10}{'p95 ms <=':>11}")
+    for stage, row in sorted(report["stages"].items()):
+        print(f"{stage:<18}{row['count']:>8}{row['mean_ms']:>10}{row['p95_ms_upper_bound']!s:>11}")
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"chat_load_{report['revision']['commit'] or 'unknown'}_{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main_cli()
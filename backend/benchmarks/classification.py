@@ -0,0 +1,75 @@
+"""Compares answer + classification modes on latency, OpenAI calls and tokens.
+
+Usage: python -m backend.benchmarks.classification [--repeat 3]
+Needs OPENAI_API_KEY and the usual backend environment.
+"""
+import argparse
+import statistics
+import time
+from langchain.schema import HumanMessage, SystemMessage
+from backend.app.services import chat
+
+SAMPLE_QUERIES = [
+    "I was charged twice for my subscription, can I get a refund?",
+    "Where can I download last month's invoice?",
+    "The app keeps crashing with error 500 when I log in",
+    "How do I reset my password?",
+    "What are your opening hours?",
+    "Can you tell me more about your company?",
+    "I want to speak to a manager about this complaint",
+    "Something is off with my account and I don't know what",
+]
+
+MODES = {
+    "separate": {"mode": "separate", "use_local": False},
+    "combined": {"mode": "combined", "use_local": False},
+    "separate+local": {"mode": "separate", "use_local": True},
+    "combined+local": {"mode": "combined", "use_local": True},
+}
+
+class CountingCompletions:
+    """Wraps client.chat.completions to count calls and tokens."""
+
+    def __init__(self, completions):
+        self._completions = completions
+        self.calls = 0
+        self.tokens = 0
+
+    def create(self, **kwargs):
+        response = self._completions.create(**kwargs)
+        self.calls += 1
+        if response.usage:
+            self.tokens += response.usage.total_tokens
+        return response
+
+def run(repeat: int):
+    counter = CountingCompletions(chat.client.chat.completions)
+    chat.client.chat.completions = counter
+    results = {}
+
+    for name, options in MODES.items():
+        counter.calls = counter.tokens = 0
+        latencies = []
+        for _ in range(repeat):
+            for query in SAMPLE_QUERIES:
+                messages = [SystemMessage(content="You are a helpful support assistant."), HumanMessage(content=query)]
+                start = time.perf_counter()
+                chat.generate_answer(messages, query, **options)
+                latencies.append(time.perf_counter() - start)
+        turns = len(latencies)
+        results[name] = {
+            "mean_ms": round(statistics.mean(latencies) * 1000, 1),
+            "p95_ms": round(sorted(latencies)[int(0.95 * (turns - 1))] * 1000, 1),
+            "calls_per_turn": round(counter.calls / turns, 2),
+            "tokens_per_turn": round(counter.tokens / turns, 1),
+        }
+
+    print(f"{'mode':<16}{'mean ms':>10}{'p95 ms':>10}{'calls/turn':>12}{'tokens/turn':>13}")
+    for name, row in results.items():
+        print(f"{name:<16}{row['mean_ms']:>10}{row['p95_ms']:>10}{row['calls_per_turn']:>12}{row['tokens_per_turn']:>13}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    run(parser.parse_args().repeat)
@@ -0,0 +1,480 @@
+"""In-process stand-ins for OpenAI, Firestore and Redis used by the load benchmark.
+
+Each fake sleeps for a configurable latency so the app's concurrency
+behaviour (thread pools, event loops, Celery workers) is exercised the way
+real network calls would exercise it, without any external service.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import List
+import redis
+
+# OpenAI
+
+def _usage(prompt_tokens: int, completion_tokens: int):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           total_tokens=prompt_tokens + completion_tokens)
+
+def _answer_tokens(count: int) -> List[str]:
+    return [f"token{i} " for i in range(count)]
+
+class FakeCompletions:
+    """``chat.completions`` with fixed latency; streams ``tokens`` chunks when asked to."""
+
+    def __init__(self, latency: float, tokens: int, token_interval: float):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_interval = token_interval
+        self.calls = 0
+
+    def _message(self, kwargs) -> str:
+        answer = "".join(_answer_tokens(self.tokens)).strip()
+        if kwargs.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"answer": answer, "category": "general"})
+        if "Classify the following query" in kwargs["messages"][0]["content"]:
+            return "general"
+        return answer
+
+    def _prompt_tokens(self, kwargs) -> int:
+        return sum(len(message["content"].split()) for message in kwargs["messages"])
+
+    def _chunk(self, token):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if kwargs.get("stream"):
+            return self._stream(kwargs)
+        time.sleep(self.latency)
+        content = self._message(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=_usage(self._prompt_tokens(kwargs), len(content.split())),
+        )
+
+    def _stream(self, kwargs):
+        time.sleep(self.latency)
+        for token in _answer_tokens(self.tokens):
+            yield self._chunk(token)
+            time.sleep(self.token_interval)
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        self.calls += 1
+        if kwargs.get("stream"):
+            await asyncio.sleep(self.latency)
+            return self._astream()
+        await asyncio.sleep(self.latency)
+        content = self._message(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=_usage(self._prompt_tokens(kwargs), len(content.split())),
+        )
+
+    async def _astream(self):
+        for token in _answer_tokens(self.tokens):
+            yield self._chunk(token)
+            await asyncio.sleep(self.token_interval)
+
+class FakeOpenAI:
+    def __init__(self, latency: float, tokens: int = 60, token_interval: float = 0.01, asynchronous: bool = False):
+        completions_cls = FakeAsyncCompletions if asynchronous else FakeCompletions
+        self.chat = SimpleNamespace(completions=completions_cls(latency, tokens, token_interval))
+
+# Embeddings / vector search latency
+
+class DelayedEmbeddings:
+    """Adds a fixed per-request latency to an embeddings client."""
+
+    def __init__(self, base, latency: float):
+        self.base = base
+        self.latency = latency
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self.base.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        return self.base.embed_documents(texts)
+
+def delayed(func, latency: float):
+    def wrapper(*args, **kwargs):
+        time.sleep(latency)
+        return func(*args, **kwargs)
+    return wrapper
+
+# Firestore
+
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id: str, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeDocument:
+    def __init__(self, store: "FakeFirestore", collection: str, doc_id: str):
+        self._store = store
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, data: dict, merge: bool = False):
+        self._store._write(self._collection, self.id, data, merge)
+
+    def update(self, data: dict):
+        self._store._write(self._collection, self.id, data, True)
+
+    def get(self):
+        self._store._sleep()
+        return FakeDocumentSnapshot(self.id, self._store._read(self._collection, self.id))
+
+class FakeQuery:
+    def __init__(self, store: "FakeFirestore", collection: str, filters=(), order=None, limit=None):
+        self._store = store
+        self._collection = collection
+        self._filters = list(filters)
+        self._order = order
+        self._limit = limit
+
+    def where(self, field: str, op: str, value):
+        if op != "==":
+            raise NotImplementedError(f"FakeFirestore only supports '==' filters, got {op!r}")
+        return FakeQuery(self._store, self._collection, self._filters + [(field, value)], self._order, self._limit)
+
+    def order_by(self, field: str, direction: str = "ASCENDING"):
+        return FakeQuery(self._store, self._collection, self._filters, (field, direction), self._limit)
+
+    def limit(self, count: int):
+        return FakeQuery(self._store, self._collection, self._filters, self._order, count)
+
+    def stream(self):
+        self._store._sleep()
+        with self._store._lock:
+            rows = [(doc_id, dict(data)) for doc_id, data in self._store._collections.get(self._collection, {}).items()]
+        rows = [row for row in rows if all(row[1].get(field) == value for field, value in self._filters)]
+        if self._order:
+            field, direction = self._order
+            rows.sort(key=lambda row: row[1].get(field), reverse=str(direction).upper().startswith("DESC"))
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return iter([FakeDocumentSnapshot(doc_id, data) for doc_id, data in rows])
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id: str = None):
+        return FakeDocument(self._store, self._collection, doc_id or uuid.uuid4().hex)
+
+    def add(self, data: dict):
+        document = self.document()
+        document.set(data)
+        return None, document
+
+class FakeWriteBatch:
+    def __init__(self, store: "FakeFirestore"):
+        self._store = store
+        self._writes = []
+
+    def set(self, document: FakeDocument, data: dict, merge: bool = False):
+        self._writes.append((document, data, merge))
+
+    def commit(self):
+        self._store._sleep()
+        with self._store._lock:
+            for document, data, merge in self._writes:
+                self._store._write(document._collection, document.id, data, merge, sleep=False, locked=True)
+        self._writes = []
+
+class FakeFirestore:
+    """Dict-backed Firestore client covering the calls the app makes."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read(self, collection: str, doc_id: str):
+        with self._lock:
+            data = self._collections.get(collection, {}).get(doc_id)
+        return dict(data) if data is not None else None
+
+    def _write(self, collection: str, doc_id: str, data: dict, merge: bool, sleep: bool = True, locked: bool = False):
+        if sleep:
+            self._sleep()
+        if not locked:
+            with self._lock:
+                return self._write(collection, doc_id, data, merge, sleep=False, locked=True)
+        documents = self._collections.setdefault(collection, {})
+        documents[doc_id] = {**documents.get(doc_id, {}), **data} if merge else dict(data)
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+# Redis
+
+class FakePubSub:
+    """Subscriptions are accepted but nothing is ever delivered (single process)."""
+
+    def subscribe(self, *channels):
+        pass
+
+    def get_message(self, timeout: float = 0.0, **kwargs):
+        time.sleep(timeout)
+        return None
+
+    def listen(self):
+        while True:
+            time.sleep(1.0)
+            yield from ()
+
+class FakePipeline:
+    """Queues commands until ``execute``. After ``watch`` they run immediately until ``multi``,
+    as in redis-py; watched keys aren't checked, so WatchError is never raised."""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._calls = []
+        self._immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._calls = []
+
+    def watch(self, *keys):
+        self._immediate = True
+
+    def unwatch(self):
+        self._immediate = False
+
+    def multi(self):
+        self._immediate = False
+
+    def __getattr__(self, name):
+        if self._immediate:
+            return getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self._redis._sleep()
+        with self._redis._lock:
+            results = [getattr(self._redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self._calls]
+        self._calls = []
+        return results
+
+class FakeRedis:
+    """Thread-safe in-memory Redis implementing the commands the app uses.
+
+    Strings, lists, hashes and sorted sets with expiry; every client shares
+    one keyspace per process, like separate connections to one server.
+    """
+
+    _data = {}
+    _expiry = {}
+    _lock = threading.RLock()
+    latency = 0.0
+
+    def __init__(self, decode_responses: bool = False, **kwargs):
+        self.decode_responses = decode_responses
+
+    @classmethod
+    def from_url(cls, url: str = None, **kwargs):
+        return cls(**kwargs)
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def __getattr__(self, name):
+        implementation = getattr(type(self), f"_{name}", None)
+        if implementation is None:
+            raise AttributeError(name)
+
+        def command(*args, **kwargs):
+            self._sleep()
+            with self._lock:
+                return implementation(self, *args, **kwargs)
+        return command
+
+    def pipeline(self, transaction: bool = True):
+        return FakePipeline(self)
+
+    def pubsub(self, **kwargs):
+        return FakePubSub()
+
+    # Helpers (caller holds the lock)
+    def _out(self, value):
+        if value is None or not isinstance(value, bytes):
+            return value
+        return value.decode() if self.decode_responses else value
+
+    @staticmethod
+    def _in(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _live(self, key):
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return self._data.get(key)
+
+    # Keys and strings
+    def _get(self, key):
+        return self._out(self._live(key))
+
+    def _mget(self, keys, *more):
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys, *more]
+        return [self._get(key) for key in keys]
+
+    def _set(self, key, value, ex=None, nx=False):
+        if nx and self._live(key) is not None:
+            return None
+        self._data[key] = self._in(value)
+        self._expiry.pop(key, None)
+        if ex:
+            self._expire(key, ex)
+        return True
+
+    def _setex(self, key, seconds, value):
+        return self._set(key, value, ex=seconds)
+
+    def _delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += self._data.pop(key, None) is not None
+            self._expiry.pop(key, None)
+        return removed
+
+    def _exists(self, *keys):
+        return sum(self._live(key) is not None for key in keys)
+
+    def _expire(self, key, seconds):
+        if self._live(key) is None:
+            return False
+        self._expiry[key] = time.monotonic() + seconds
+        return True
+
+    def _publish(self, channel, message):
+        return 0
+
+    def _rename(self, key, new_key):
+        if self._live(key) is None:
+            raise redis.ResponseError("no such key")
+        self._data[new_key] = self._data.pop(key)
+        self._expiry.pop(new_key, None)
+        if key in self._expiry:
+            self._expiry[new_key] = self._expiry.pop(key)
+        return True
+
+    # Lists
+    def _list(self, key, create=False):
+        value = self._live(key)
+        if value is None and create:
+            value = self._data[key] = []
+        return value
+
+    def _lpush(self, key, *values):
+        items = self._list(key, create=True)
+        for value in values:
+            items.insert(0, self._in(value))
+        return len(items)
+
+    def _lpushx(self, key, *values):
+        return self._lpush(key, *values) if self._list(key) else 0
+
+    def _rpush(self, key, *values):
+        items = self._list(key, create=True)
+        items.extend(self._in(value) for value in values)
+        return len(items)
+
+    def _lrange(self, key, start, end):
+        items = self._list(key) or []
+        end = len(items) if end == -1 else end + 1
+        return [self._out(item) for item in items[start:end]]
+
+    def _ltrim(self, key, start, end):
+        items = self._list(key)
+        if items is not None:
+            end = len(items) if end == -1 else end + 1
+            items[:] = items[start:end]
+        return True
+
+    def _llen(self, key):
+        return len(self._list(key) or [])
+
+    # Hashes
+    def _hset(self, key, field=None, value=None, mapping=None):
+        data = self._live(key)
+        if data is None:
+            data = self._data[key] = {}
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        for name, item in items.items():
+            data[self._in(name)] = self._in(item)
+        return len(items)
+
+    def _hgetall(self, key):
+        data = self._live(key) or {}
+        return {self._out(name): self._out(value) for name, value in data.items()}
+
+    # Sorted sets
+    def _zset(self, key):
+        value = self._live(key)
+        if value is None:
+            value = self._data[key] = {}
+        return value
+
+    def _zadd(self, key, mapping):
+        zset = self._zset(key)
+        added = sum(self._in(member) not in zset for member in mapping)
+        zset.update({self._in(member): float(score) for member, score in mapping.items()})
+        return added
+
+    @staticmethod
+    def _bound(value, default):
+        if value in ("-inf", "+inf", "inf"):
+            return default, False
+        text = str(value)
+        if text.startswith("("):
+            return float(text[1:]), True
+        return float(value), False
+
+    def _zrangebyscore(self, key, low, high, withscores=False):
+        low, low_open = self._bound(low, float("-inf"))
+        high, high_open = self._bound(high, float("inf"))
+        members = sorted(((score, member) for member, score in self._zset(key).items()), key=lambda item: item[0])
+        selected = [
+            (member, score) for score, member in members
+            if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)
+        ]
+        if withscores:
+            return [(self._out(member), score) for member, score in selected]
+        return [self._out(member) for member, _ in selected]
+
+    def _zremrangebyscore(self, key, low, high):
+        zset = self._zset(key)
+        doomed = [self._in(member) for member in self._zrangebyscore(key, low, high)]
+        for member in doomed:
+            zset.pop(member, None)
+        return len(doomed)
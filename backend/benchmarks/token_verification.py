@@ -0,0 +1,61 @@
+"""Measures per-request JWT verification cost: Redis blacklist lookup vs local revocation cache.
+
+Usage: python -m backend.benchmarks.token_verification [--requests 20000] [--tokens 100]
+Needs SECRET_KEY and a Redis at AUTH_REDIS_URL.
+"""
+import argparse
+import statistics
+import time
+import jwt
+from backend.app.core import security
+
+def legacy_verify(token: str) -> dict:
+    """The previous verify_token: Redis EXISTS on the raw token, then a full decode."""
+    security.is_token_blacklisted(token)
+    return jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+def cold_verify(token: str) -> dict:
+    """verify_token with the payload cache bypassed (signature check every time)."""
+    security.payload_cache.pop(token)
+    return security.verify_token(token)
+
+VARIANTS = {
+    "redis+decode": legacy_verify,
+    "decode+local": cold_verify,
+    "cached": security.verify_token,
+}
+
+def run(requests: int, token_count: int):
+    tokens = [security.create_access_token({"sub": f"user-{i}"}) for i in range(token_count)]
+    # One revoked token so the local revocation set isn't trivially empty
+    security.blacklist_token(security.create_access_token({"sub": "revoked"}))
+    security.revocation_cache.start()
+
+    results = {}
+    for name, verify in VARIANTS.items():
+        for token in tokens:
+            verify(token)  # warm up
+        latencies = []
+        for i in range(requests):
+            token = tokens[i % token_count]
+            start = time.perf_counter()
+            verify(token)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        results[name] = {
+            "mean_us": round(statistics.mean(latencies) * 1e6, 1),
+            "p50_us": round(latencies[len(latencies) // 2] * 1e6, 1),
+            "p99_us": round(latencies[int(0.99 * (len(latencies) - 1))] * 1e6, 1),
+        }
+
+    print(f"{'variant':<16}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for name, row in results.items():
+        print(f"{name:<16}{row['mean_us']:>10}{row['p50_us']:>10}{row['p99_us']:>10}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=100, help="Distinct tokens cycled through")
+    args = parser.parse_args()
+    run(args.requests, args.tokens)
@@ -0,0 +1,108 @@
+"""Compares prefork vs thread-pool workers for I/O-bound chat tasks: throughput and memory per in-flight chat.
+
+Each task runs a stand-in for process_chat with the same shape (history
+fetch concurrent with embedding -> vector query, then the LLM call), where
+every external call is replaced by a sleep. "prefork" runs one task per
+process with asyncio.run per task, as the old worker did; "threads" runs
+tasks as threads in one process on the shared background event loop.
+
+Memory is proportional set size (PSS, from /proc/<pid>/smaps_rollup, so
+pages shared after fork aren't double counted), falling back to RSS.
+Linux only.
+
+Usage: python -m backend.benchmarks.worker_pools [--in-flight 32] [--tasks 256] [--llm-seconds 1.0]
+With --import-app (default) each worker process imports the chat service
+first, which needs the usual backend environment.
+"""
+import argparse
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from backend.app.core.async_runner import BackgroundLoop
+
+STAGE_SECONDS = {"history_fetch": 0.05, "embedding": 0.1, "vector_query": 0.08}
+
+def process_memory_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+async def fake_chat(llm_seconds: float) -> dict:
+    async def lookup_and_retrieve():
+        await asyncio.to_thread(time.sleep, STAGE_SECONDS["embedding"])
+        await asyncio.to_thread(time.sleep, STAGE_SECONDS["vector_query"])
+
+    await asyncio.gather(asyncio.to_thread(time.sleep, STAGE_SECONDS["history_fetch"]), lookup_and_retrieve())
+    await asyncio.to_thread(time.sleep, llm_seconds)
+    return {"pid": os.getpid(), "memory_kb": process_memory_kb(os.getpid())}
+
+def init_worker(import_app: bool):
+    if import_app:
+        importlib.import_module("backend.app.services.chat")
+
+def prefork_task(llm_seconds: float) -> dict:
+    return asyncio.run(fake_chat(llm_seconds))
+
+_loop = None
+
+def thread_task(llm_seconds: float) -> dict:
+    return _loop.run(fake_chat(llm_seconds))
+
+def run_pool(mode: str, in_flight: int, tasks: int, llm_seconds: float, import_app: bool) -> dict:
+    global _loop
+    if mode == "prefork":
+        pool = ProcessPoolExecutor(max_workers=in_flight, initializer=init_worker, initargs=(import_app,))
+        task = prefork_task
+    else:
+        init_worker(import_app)
+        _loop = BackgroundLoop(executor_threads=in_flight * 2)
+        pool = ThreadPoolExecutor(max_workers=in_flight)
+        task = thread_task
+
+    with pool:
+        # Warm up: start every worker process / thread before timing
+        list(pool.map(task, [0.0] * in_flight))
+        start = time.perf_counter()
+        results = list(pool.map(task, [llm_seconds] * tasks))
+        elapsed = time.perf_counter() - start
+        memory_by_pid = {}
+        for result in results:
+            memory_by_pid[result["pid"]] = max(memory_by_pid.get(result["pid"], 0), result["memory_kb"])
+
+    # The parent plays the part of the Celery main process in both modes
+    memory_by_pid.setdefault(os.getpid(), process_memory_kb(os.getpid()))
+    total_mb = sum(memory_by_pid.values()) / 1024
+    return {
+        "processes": len(memory_by_pid),
+        "tasks_per_second": round(tasks / elapsed, 2),
+        "memory_mb": round(total_mb, 1),
+        "mb_per_in_flight": round(total_mb / in_flight, 2),
+    }
+
+def run(in_flight: int, tasks: int, llm_seconds: float, import_app: bool):
+    results = {mode: run_pool(mode, in_flight, tasks, llm_seconds, import_app) for mode in ("prefork", "threads")}
+    print(f"{'pool':<10}{'processes':>11}{'tasks/s':>10}{'memory MB':>12}{'MB/in-flight':>14}")
+    for mode, row in results.items():
+        print(f"{mode:<10}{row['processes']:>11}{row['tasks_per_second']:>10}{row['memory_mb']:>12}{row['mb_per_in_flight']:>14}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--in-flight", type=int, default=32, help="Concurrent chats (prefork processes / threads)")
+    parser.add_argument("--tasks", type=int, default=256)
+    parser.add_argument("--llm-seconds", type=float, default=1.0, help="Simulated OpenAI latency per task")
+    parser.add_argument("--no-import-app", dest="import_app", action="store_false",
+                        help="Skip importing the chat service in workers (measures bare interpreters)")
+    args = parser.parse_args()
+    run(args.in_flight, args.tasks, args.llm_seconds, args.import_app)
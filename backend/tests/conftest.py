@@ -0,0 +1,11 @@
+import os
+import sys
+import types
+
+# backend.app.core.firebase connects with the service-account key at import.
+# Without the key (CI, local runs) an empty stand-in is installed instead;
+# tests that touch Firestore pass their own fake client.
+if not os.path.exists("backend/app/core/serviceAccountKey.json"):
+    firebase = types.ModuleType("backend.app.core.firebase")
+    firebase.db = None
+    sys.modules.setdefault("backend.app.core.firebase", firebase)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from backend.app.services import bm25_index
+from backend.app.services.bm25_index import BM25Index, get_bm25_index, tokenize
+
+TEXTS = {
+    "refunds": "Refunds are processed within 5 business days to the original payment method.",
+    "password": "Reset your password with the Forgot password link on the login page.",
+    "invoices": "Invoices can be downloaded from the billing page under Account, Invoices.",
+    "sync": "If sync fails with error E1042, update the app and enable background refresh.",
+    "login": "Login errors such as E2001 mean the account is locked; reset the password to unlock it.",
+}
+
+def build(path=None, ids=None):
+    index = BM25Index(path)
+    for doc_id in ids or TEXTS:
+        index.add(doc_id, TEXTS[doc_id], {"source": doc_id})
+    return index
+
+def postings(index, term):
+    """(doc ids, freqs) of ``term`` as stored in the CSR arrays."""
+    term_number = index._vocab[term]
+    start, end = index._offsets[term_number], index._offsets[term_number + 1]
+    return [index._docs[d]["id"] for d in index._posting_docs[start:end]], list(index._posting_freqs[start:end])
+
+def ranking(index, query, k=5):
+    return [(hit["id"], round(hit["score"], 5)) for hit in index.search(query, k)]
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("How do I reset my Password?") == ["reset", "password"]
+
+def test_pending_chunks_are_searchable_once_saved(tmp_path):
+    index = build(str(tmp_path))
+    assert index.search("reset password") == []
+    index.save()
+    hits = index.search("reset password", k=2)
+    assert [hit["id"] for hit in hits] == ["password", "login"]
+    assert hits[0]["metadata"] == {"source": "password"} and hits[0]["score"] > hits[1]["score"] > 0
+    assert index.search("nothing matches this", k=3) == []
+
+def test_merging_into_existing_postings_matches_a_single_build(tmp_path):
+    index = build(str(tmp_path), ids=["refunds", "password", "invoices"])
+    index.save()
+    for doc_id in ("sync", "login"):
+        index.add(doc_id, TEXTS[doc_id])
+    index.save()
+
+    reference = build()
+    reference.save(str(tmp_path / "reference"))
+    offsets = np.asarray(index._offsets)
+    assert offsets[0] == 0 and np.all(np.diff(offsets) >= 0) and offsets[-1] == len(index._posting_docs)
+    # A term already on disk gets the new document appended after its old postings
+    assert postings(index, "password") == (["password", "login"], [2, 1])
+    assert postings(index, "e1042") == (["sync"], [1])
+    for query in ("reset password", "E2001 login", "invoices billing", "error"):
+        assert ranking(index, query) == ranking(reference, query)
+
+def test_saved_index_is_memory_mapped_on_load(tmp_path):
+    built = build(str(tmp_path))
+    built.save()
+    loaded = BM25Index(str(tmp_path))
+    assert len(loaded) == len(TEXTS)
+    assert isinstance(loaded._posting_docs, np.memmap) and isinstance(loaded._offsets, np.memmap)
+    assert ranking(loaded, "reset password") == ranking(built, "reset password")
+    assert not [name for name in tmp_path.iterdir() if ".tmp" in name.name]
+
+    # New chunks merge into the memory-mapped arrays on the next save
+    loaded.add("refund-status", "Check refund status on the billing page.")
+    loaded.save()
+    assert BM25Index(str(tmp_path)).search("refund status", k=1)[0]["id"] == "refund-status"
+
+def test_duplicate_ids_are_ignored(tmp_path):
+    index = build(str(tmp_path))
+    assert not index.add("password", "A different text for the same id")
+    index.save()
+    loaded = BM25Index(str(tmp_path))
+    assert "password" in loaded and not loaded.add("password", "again")
+    assert len(loaded) == len(TEXTS)
+    assert loaded.search("different text", k=1) == []
+
+@pytest.fixture
+def shared_index(monkeypatch, tmp_path):
+    """Points get_bm25_index at an empty directory with nothing loaded yet."""
+    monkeypatch.setattr(bm25_index, "BM25_INDEX_ENABLED", True)
+    monkeypatch.setattr(bm25_index, "BM25_INDEX_PATH", str(tmp_path))
+    monkeypatch.setattr(bm25_index, "_index", None)
+    monkeypatch.setattr(bm25_index, "_index_version", None)
+    return tmp_path
+
+def test_shared_index_is_loaded_once_built(shared_index):
+    assert get_bm25_index() is None
+    build(str(shared_index)).save()
+    index = get_bm25_index()
+    assert index is not None and len(index) == len(TEXTS)
+    assert get_bm25_index() is index
+
+def test_shared_index_is_reloaded_after_a_rebuild(shared_index):
+    BM25Index(str(shared_index)).save()
+    assert get_bm25_index() is None
+
+    build(str(shared_index), ids=["refunds"]).save()
+    first = get_bm25_index()
+    assert len(first) == 1
+
+    rebuilt = BM25Index(str(shared_index))
+    rebuilt.add("password", TEXTS["password"])
+    rebuilt.save()
+    second = get_bm25_index()
+    assert second is not first and len(second) == 2
+
+def test_shared_index_can_be_disabled(shared_index, monkeypatch):
+    build(str(shared_index)).save()
+    monkeypatch.setattr(bm25_index, "BM25_INDEX_ENABLED", False)
+    assert get_bm25_index() is None
@@ -0,0 +1,139 @@
+import asyncio
+import fakeredis
+import pytest
+from backend.app.services import coalescing
+from backend.app.services.coalescing import REDIS_LOCK_PREFIX, SingleFlight
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def make_flights(monkeypatch, server):
+    """Builds SingleFlights that share one fake Redis, as separate processes would."""
+    monkeypatch.setattr(coalescing.redis.Redis, "from_url", lambda url: fakeredis.FakeRedis(server=server))
+
+    def make(redis_url="redis://fake", **kwargs):
+        return SingleFlight(redis_url=redis_url, poll_seconds=0.01, **kwargs)
+    return make
+
+@pytest.fixture(params=["local", "redis"])
+def flights(request, make_flights):
+    return make_flights(None if request.param == "local" else "redis://fake")
+
+def counting(result, delay=0.05):
+    """A compute function that records how often it ran."""
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+    return compute, calls
+
+def test_local_callers_share_one_computation(flights):
+    compute, calls = counting({"response": "hi"})
+
+    async def main():
+        return await asyncio.gather(*(flights.run("key", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == [{"response": "hi"}] * 5
+    assert len(calls) == 1
+    assert flights.metrics["leaders"] == 1 and flights.metrics["local_joins"] == 4
+    assert flights.stats()["in_flight"] == 0
+
+def test_different_keys_are_not_coalesced(flights):
+    compute, calls = counting({"response": "hi"})
+
+    async def main():
+        await asyncio.gather(flights.run("a", compute), flights.run("b", compute))
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+def test_abandoned_flight_is_retried_by_a_follower(flights):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        # The first (leader's) attempt gives up; the follower's own attempt answers
+        return None if len(calls) == 1 else {"response": "retried"}
+
+    async def main():
+        leader = asyncio.ensure_future(flights.run("key", compute))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(leader, flights.run("key", compute))
+
+    assert asyncio.run(main()) == [None, {"response": "retried"}]
+    assert len(calls) == 2
+    assert flights.metrics["abandoned"] == 1
+
+def test_exception_is_shared_with_followers(flights):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("model unavailable")
+
+    async def main():
+        return await asyncio.gather(*(flights.run("key", compute) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) and str(r) == "model unavailable" for r in results)
+    assert flights.stats()["in_flight"] == 0
+
+def test_remote_leader_result_is_shared(make_flights, server):
+    leader, follower = make_flights(), make_flights()
+    compute, calls = counting({"response": "from leader"}, delay=0.1)
+
+    async def never():
+        raise AssertionError("the follower should use the leader's result")
+
+    async def main():
+        first = asyncio.ensure_future(leader.run("key", compute))
+        await asyncio.sleep(0.02)
+        return await asyncio.gather(first, follower.run("key", never))
+
+    assert asyncio.run(main()) == [{"response": "from leader"}] * 2
+    assert len(calls) == 1
+    assert follower.metrics["remote_joins"] == 1
+    # The leader's lock is gone once it has published
+    assert not fakeredis.FakeRedis(server=server).exists(f"{REDIS_LOCK_PREFIX}key")
+
+def test_remote_abandon_lets_the_follower_compute(make_flights):
+    leader, follower = make_flights(), make_flights()
+    abandon, _ = counting(None, delay=0.05)
+    compute, calls = counting({"response": "own"})
+
+    async def main():
+        first = asyncio.ensure_future(leader.run("key", abandon))
+        await asyncio.sleep(0.01)
+        return await asyncio.gather(first, follower.run("key", compute))
+
+    assert asyncio.run(main()) == [None, {"response": "own"}]
+    assert len(calls) == 1
+    assert follower.metrics["remote_joins"] == 0
+
+def test_lock_is_only_released_by_its_owner(make_flights, server):
+    flights = make_flights()
+    client = fakeredis.FakeRedis(server=server)
+    lock_key = f"{REDIS_LOCK_PREFIX}key"
+
+    async def compute():
+        # Our lock expired mid-computation and another process took it over
+        client.set(lock_key, "someone-else")
+        return {"response": "late"}
+
+    assert asyncio.run(flights.run("key", compute)) == {"response": "late"}
+    assert client.get(lock_key) == b"someone-else"
+
+def test_redis_outage_falls_back_to_computing(make_flights, server):
+    flights = make_flights()
+    server.connected = False
+    compute, calls = counting({"response": "direct"}, delay=0)
+
+    assert asyncio.run(flights.run("key", compute)) == {"response": "direct"}
+    assert len(calls) == 1
@@ -0,0 +1,104 @@
+import pytest
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from backend.app.services import context_builder
+from backend.app.services.context_builder import (
+    CONTEXT_MIN_FRAGMENT_TOKENS,
+    build_context,
+    count_tokens,
+    message_tokens,
+    truncate_to_tokens,
+)
+
+SYSTEM = "You are a support assistant."
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """Uses the character estimate so counts don't depend on a downloaded tokenizer."""
+    monkeypatch.setattr(context_builder, "_encoding", None)
+    monkeypatch.setattr(context_builder, "_encoding_loaded", True)
+    count_tokens.cache_clear()
+    yield
+    count_tokens.cache_clear()
+
+def words(n: int, word: str = "word") -> str:
+    return " ".join([word] * n)
+
+def conversation(turns: int, size: int = 40) -> list:
+    history = []
+    for i in range(turns):
+        history += [HumanMessage(content=words(size, f"q{i}")), AIMessage(content=words(size, f"a{i}"))]
+    return history
+
+def history_of(messages: list) -> list:
+    return [m for m in messages if isinstance(m, (HumanMessage, AIMessage))][:-1]
+
+def prompt_tokens(messages: list) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+def test_truncate_to_tokens_respects_the_limit():
+    text = words(200)
+    assert truncate_to_tokens(text, 1000) == text
+    for limit in (1, 5, 37, 120):
+        assert count_tokens(truncate_to_tokens(text, limit)) <= limit
+    assert truncate_to_tokens(text, 37).endswith(context_builder.TRUNCATION_MARKER)
+
+def test_everything_fits_in_a_large_budget():
+    history = conversation(3)
+    messages, report = build_context(SYSTEM, history, HumanMessage(content="help"), ["doc one", "doc two"],
+                                     budget=10000, summary="earlier they asked about refunds")
+    assert history_of(messages) == history
+    assert isinstance(messages[1], SystemMessage) and messages[1].content.endswith("refunds")
+    assert messages[-1].content.endswith("doc one\ndoc two")
+    assert report["history_dropped"] == 0 and report["docs_dropped"] == 0
+
+def test_history_is_dropped_a_turn_at_a_time():
+    history = conversation(4)
+    last = HumanMessage(content="help")
+    for budget in range(60, 600, 7):
+        messages, report = build_context(SYSTEM, history, last, [], budget=budget)
+        kept = history_of(messages)
+        assert report["tokens"] == prompt_tokens(messages) <= budget
+        if kept:
+            # Never an orphaned reply at the start, and whole turns except possibly a cut reply
+            assert isinstance(kept[0], HumanMessage)
+            assert kept[0] in history
+        assert report["history_kept"] + report["history_dropped"] == len(history)
+
+def test_reply_of_the_oldest_kept_turn_is_cut_to_fit():
+    history = conversation(2, size=100)
+    last = HumanMessage(content="help")
+    base = prompt_tokens([SystemMessage(content=SYSTEM), last])
+    newest_turn = message_tokens(history[2]) + message_tokens(history[3])
+    budget = base + newest_turn + message_tokens(history[0]) + context_builder.MESSAGE_OVERHEAD_TOKENS + CONTEXT_MIN_FRAGMENT_TOKENS
+    messages, report = build_context(SYSTEM, history, last, [], budget=budget)
+    kept = history_of(messages)
+    assert [m.content for m in kept[:1] + kept[2:]] == [history[0].content, history[2].content, history[3].content]
+    assert isinstance(kept[1], AIMessage) and kept[1].content.endswith(context_builder.TRUNCATION_MARKER)
+    assert report["tokens"] <= budget
+
+def test_turn_without_room_for_its_question_is_dropped_whole():
+    history = [HumanMessage(content=words(300, "q")), AIMessage(content="short answer")]
+    last = HumanMessage(content="help")
+    budget = prompt_tokens([SystemMessage(content=SYSTEM), last]) + 100
+    messages, report = build_context(SYSTEM, history, last, [], budget=budget)
+    assert history_of(messages) == []
+    assert report["history_dropped"] == 2
+
+def test_oversized_user_message_is_clamped_to_the_budget():
+    last = HumanMessage(content=words(5000))
+    system_tokens = message_tokens(SystemMessage(content=SYSTEM))
+    # Even when less than CONTEXT_MIN_FRAGMENT_TOKENS is left for it
+    for budget in (system_tokens + 10, system_tokens + CONTEXT_MIN_FRAGMENT_TOKENS, 500):
+        messages, report = build_context(SYSTEM, conversation(2), last, ["a document"], budget=budget)
+        assert report["tokens"] == prompt_tokens(messages) <= budget
+        assert messages[-1].content.startswith("word")
+
+def test_docs_take_priority_over_history():
+    history = conversation(3)
+    last = HumanMessage(content="help")
+    docs = [words(100, "refund"), words(100, "invoice"), words(100, "refund")]
+    budget = prompt_tokens([SystemMessage(content=SYSTEM), last]) + 150
+    messages, report = build_context(SYSTEM, history, last, docs, budget=budget)
+    assert report["docs_kept"] == 1 and report["docs_dropped"] == 1  # the duplicate counts once
+    assert report["history_kept"] == 0
+    assert report["tokens"] <= budget
@@ -0,0 +1,114 @@
+import fakeredis
+import pytest
+from backend.app.services import conversation_store
+from backend.app.services.conversation_store import (
+    CHAT_HISTORY_WINDOW,
+    append_chat,
+    backfill_chats,
+    get_recent_chats,
+)
+
+USER = "user-1"
+KEY = f"chat:history:{USER}"
+EMPTY_KEY = f"{KEY}:empty"
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def client(monkeypatch, server):
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(conversation_store, "redis_client", client)
+    return client
+
+def chat(n: int) -> dict:
+    return {"user_id": USER, "message": f"question {n}", "response": f"answer {n}", "category": "general",
+            "timestamp": f"2025-01-01T00:00:{n:02d}"}
+
+def messages(chats) -> list:
+    return [c["message"] for c in chats]
+
+def before_exec(client, hook):
+    """Runs ``hook`` between a WATCHed pipeline's checks and its MULTI, as a concurrent writer would."""
+    original = client.pipeline
+
+    def pipeline(*args, **kwargs):
+        pipe = original(*args, **kwargs)
+        multi = pipe.multi
+
+        def interleaved():
+            if pipe.watching:
+                hook()
+            multi()
+        pipe.multi = interleaved
+        return pipe
+    client.pipeline = pipeline
+
+def test_unknown_user_is_a_miss(client):
+    assert get_recent_chats(USER, 5) is None
+
+def test_backfill_installs_a_trimmed_window(client):
+    chats = [chat(n) for n in range(CHAT_HISTORY_WINDOW + 5, 0, -1)]  # newest first
+    backfill_chats(USER, chats)
+    assert messages(get_recent_chats(USER, 100)) == messages(chats[:CHAT_HISTORY_WINDOW])
+    assert 0 < client.ttl(KEY)
+    # The temporary list is renamed into place, nothing is left behind
+    assert client.keys("*") == [KEY]
+
+def test_backfill_leaves_an_existing_window_alone(client):
+    append_chat(chat(9), recent=[])
+    backfill_chats(USER, [chat(2), chat(1)])
+    assert messages(get_recent_chats(USER, 10)) == ["question 9"]
+
+def test_append_during_backfill_is_not_overwritten(client, server):
+    other = fakeredis.FakeRedis(server=server, decode_responses=True)
+    # Another process's append creates the window after this backfill checked for one
+    before_exec(client, lambda: other.lpush(KEY, conversation_store._serialise(chat(9))))
+    backfill_chats(USER, [chat(2), chat(1)])
+    assert messages(get_recent_chats(USER, 10)) == ["question 9"]
+    assert client.keys("*") == [KEY]
+
+def test_backfill_of_no_chats_marks_the_user_empty(client):
+    backfill_chats(USER, [])
+    assert get_recent_chats(USER, 5) == []
+    assert 0 < client.ttl(EMPTY_KEY)
+
+def test_append_to_an_empty_user_starts_the_window(client):
+    backfill_chats(USER, [])
+    append_chat(chat(1))
+    assert messages(get_recent_chats(USER, 5)) == ["question 1"]
+    assert not client.exists(EMPTY_KEY)
+
+def test_append_without_a_window_seeds_it_from_recent(client):
+    recent = [chat(n) for n in range(CHAT_HISTORY_WINDOW, 0, -1)]
+    append_chat(chat(CHAT_HISTORY_WINDOW + 1), recent=recent)
+    window = get_recent_chats(USER, 100)
+    assert len(window) == CHAT_HISTORY_WINDOW
+    assert messages(window) == [f"question {n}" for n in range(CHAT_HISTORY_WINDOW + 1, 1, -1)]
+
+def test_append_without_a_window_or_recent_chats_waits_for_firestore(client):
+    append_chat(chat(1))
+    assert get_recent_chats(USER, 5) is None
+
+def test_append_extends_and_trims_the_window(client):
+    backfill_chats(USER, [chat(1)])
+    client.expire(KEY, 5)
+    for n in range(2, CHAT_HISTORY_WINDOW + 4):
+        append_chat(chat(n))
+    window = get_recent_chats(USER, 100)
+    assert len(window) == CHAT_HISTORY_WINDOW
+    assert window[0]["message"] == f"question {CHAT_HISTORY_WINDOW + 3}"
+    assert client.ttl(KEY) > 5
+
+def test_seed_racing_another_writer_extends_its_window(client, server):
+    other = fakeredis.FakeRedis(server=server, decode_responses=True)
+    before_exec(client, lambda: other.lpush(KEY, conversation_store._serialise(chat(8))))
+    append_chat(chat(9), recent=[chat(1)])
+    assert messages(get_recent_chats(USER, 10)) == ["question 9", "question 8"]
+
+def test_redis_outage_is_a_miss(client, server):
+    server.connected = False
+    append_chat(chat(1), recent=[])
+    backfill_chats(USER, [chat(1)])
+    assert get_recent_chats(USER, 5) is None
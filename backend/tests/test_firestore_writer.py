@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+import pytest
+from backend.app.services import firestore_writer
+from backend.app.services.firestore_writer import BatchedFirestoreWriter
+from backend.app.services.spill_file import SpillFile
+
+class FakeFirestore:
+    """Stands in for ``firestore.client()``: batches fail ``failures`` times, then commit."""
+
+    def __init__(self, failures: int = 0, block: threading.Event = None):
+        self.failures = failures
+        self.block = block
+        self.documents = {}
+        self.commits = []  # ids per successful commit
+        self.attempts = []  # ids per attempted commit
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, doc_id=None):
+        return FakeDocument(self.name, doc_id or uuid.uuid4().hex)
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self.collection, self.id = collection, doc_id
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, ref, data):
+        self.writes.append((ref.id, data))
+
+    def commit(self):
+        self.client.attempts.append([doc_id for doc_id, _ in self.writes])
+        if self.client.block is not None:
+            self.client.block.wait()
+        if self.client.failures:
+            self.client.failures -= 1
+            raise RuntimeError("deadline exceeded")
+        self.client.documents.update(self.writes)
+        self.client.commits.append([doc_id for doc_id, _ in self.writes])
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    def install(**kwargs):
+        client = FakeFirestore(**kwargs)
+        monkeypatch.setattr(firestore_writer, "db", client)
+        return client
+    return install
+
+def make_writer(**kwargs):
+    options = {"batch_size": 500, "flush_seconds": 0.05, "retry_base_seconds": 0.001}
+    options.update(kwargs)
+    return BatchedFirestoreWriter("events", **options)
+
+def test_writes_are_committed_in_batches(fake_db):
+    client = fake_db()
+    writer = make_writer(batch_size=3, flush_seconds=0.3)
+    for i in range(7):
+        writer.write({"n": i}, doc_id=f"doc-{i}")
+    writer.stop()
+    assert sorted(len(ids) for ids in client.commits) == [1, 3, 3]
+    assert client.documents == {f"doc-{i}": {"n": i} for i in range(7)}
+    assert writer.metrics["written"] == 7 and writer.metrics["batches"] == 3
+
+def test_failed_batch_is_retried_with_the_same_ids(fake_db):
+    client = fake_db(failures=2)
+    writer = make_writer(max_retries=2)
+    writer.write({"n": 1})
+    writer.write({"n": 2}, doc_id="fixed")
+    writer.stop()
+    assert len(client.attempts) == 3
+    # Generated ids are fixed before the first attempt, so retries can't duplicate documents
+    assert client.attempts[0] == client.attempts[1] == client.attempts[2]
+    assert len(client.documents) == 2 and client.documents["fixed"] == {"n": 2}
+    assert writer.metrics["retries"] == 2 and writer.metrics["failed"] == 0
+
+def test_batch_is_spilled_once_retries_are_exhausted(fake_db, tmp_path):
+    client = fake_db(failures=10)
+    spill_path = str(tmp_path / "events.spill.jsonl")
+    writer = make_writer(max_retries=1, spill_path=spill_path)
+    timestamp = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    writer.write({"n": 1, "timestamp": timestamp}, doc_id="a")
+    writer.stop()
+    assert client.documents == {}
+    assert writer.metrics["failed"] == 1 and writer.metrics["spilled"] == 1
+    with open(spill_path) as f:
+        assert [json.loads(line)["id"] for line in f] == ["a"]
+
+def test_spilled_documents_are_replayed_on_start(fake_db, tmp_path):
+    spill_path = str(tmp_path / "events.spill.jsonl")
+    timestamp = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    fake_db(failures=10)
+    failing = make_writer(spill_path=spill_path)
+    failing.write({"n": 1, "timestamp": timestamp}, doc_id="a")
+    failing.write({"n": 2})
+    failing.stop()
+
+    client = fake_db()
+    writer = make_writer(spill_path=spill_path)
+    writer.start()
+    writer.stop()
+    assert writer.metrics["replayed"] == 2
+    # Datetimes survive the JSON round trip and generated ids are kept
+    assert client.documents["a"] == {"n": 1, "timestamp": timestamp}
+    assert len(client.documents) == 2
+    assert not os.path.exists(spill_path)
+
+def test_stop_flushes_queued_documents(fake_db):
+    client = fake_db()
+    writer = make_writer(flush_seconds=0.2)
+    for i in range(20):
+        writer.write({"n": i}, doc_id=str(i))
+    writer.stop(timeout=5)
+    assert len(client.documents) == 20
+    assert writer._thread is None
+
+def test_stop_spills_what_it_could_not_flush(fake_db, tmp_path):
+    block = threading.Event()
+    client = fake_db(block=block)
+    spill_path = str(tmp_path / "events.spill.jsonl")
+    writer = make_writer(batch_size=1, spill_path=spill_path)
+    for i in range(5):
+        writer.write({"n": i}, doc_id=str(i))
+    try:
+        writer.stop(timeout=0.3)
+    finally:
+        block.set()
+    # One document was mid-commit; the other four were still queued
+    with open(spill_path) as f:
+        assert sorted(json.loads(line)["id"] for line in f) == ["1", "2", "3", "4"]
+    assert client.attempts == [["0"]]
+
+def test_spill_file_appends_from_many_writers_stay_whole(tmp_path):
+    path = str(tmp_path / "shared.spill.jsonl")
+    # Separate instances only share the flock, as separate processes would
+    spills = [SpillFile(path) for _ in range(4)]
+
+    def append(spill, writer):
+        for i in range(50):
+            spill.append([{"id": f"{writer}-{i}", "data": {"padding": "x" * 512}}])
+
+    threads = [threading.Thread(target=append, args=(spill, n)) for n, spill in enumerate(spills)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seen = []
+    assert spills[0].replay(lambda record: seen.append(record["id"])) == 200
+    assert len(set(seen)) == 200
+    assert spills[1].replay(seen.append) == 0
+
+def test_spill_replay_resumes_a_crashed_replay_and_skips_torn_lines(tmp_path):
+    path = str(tmp_path / "shared.spill.jsonl")
+    spill = SpillFile(path)
+    spill.append([{"id": "new"}])
+    # Left behind by a replay that died part-way, with a torn last line
+    with open(f"{path}.replaying-123-abc", "w") as f:
+        f.write(json.dumps({"id": "orphaned"}) + "\n" + '{"id": "tor')
+    seen = []
+    assert spill.replay(lambda record: seen.append(record["id"])) == 2
+    assert sorted(seen) == ["new", "orphaned"]
+    assert os.listdir(tmp_path) == ["shared.spill.jsonl.lock"]
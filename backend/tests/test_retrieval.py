@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from backend.app.services import retrieval
+from backend.app.services.retrieval import is_lexical_query, lexical_matches, reciprocal_rank_fusion, retrieve
+from backend.tests.test_bm25_index import TEXTS, build
+
+def match(doc_id, score, vector):
+    return {"id": doc_id, "text": TEXTS[doc_id], "metadata": {}, "score": score,
+            "vector": np.asarray(vector, dtype=np.float32)}
+
+class FakeVectors:
+    """Vector search returning fixed matches; records how often it was asked."""
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.calls = 0
+
+    def __call__(self, embedding, k):
+        self.calls += 1
+        return self.matches[:k]
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    lexical = build(str(tmp_path))
+    lexical.save()
+    monkeypatch.setattr(retrieval, "get_bm25_index", lambda: lexical)
+    return lexical
+
+@pytest.fixture
+def vectors(monkeypatch):
+    def install(matches):
+        fake = FakeVectors(matches)
+        monkeypatch.setattr(retrieval, "search_with_vectors", fake)
+        return fake
+
+    def no_embeddings():
+        raise AssertionError("no embedding call expected")
+    monkeypatch.setattr(retrieval, "get_embeddings", no_embeddings)
+    return install
+
+def test_reciprocal_rank_fusion_favours_ids_in_both_rankings():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60) == ["b", "a", "c"]
+
+@pytest.mark.parametrize("query, expected", [
+    ("INV-20391", True), ("error 0x80070005", True), ("sync E1042", True),
+    ("how do I reset my password", False), ("password reset", False), ("my order 12 is late again today", False),
+])
+def test_is_lexical_query(query, expected):
+    assert is_lexical_query(query) is expected
+
+def test_lexical_matches_apply_the_ratio_and_absolute_floors(index):
+    # login also matches "reset password", but under half the best score
+    assert [hit["id"] for hit in lexical_matches("reset password", 5)] == ["password"]
+    # Matching a common word alone stays under the absolute floor
+    assert lexical_matches("page", 5) == []
+
+def test_identifier_query_is_answered_from_the_index_alone(index, vectors):
+    fake = vectors([])
+    assert [hit["id"] for hit in retrieve("sync E1042")] == ["sync"]
+    assert fake.calls == 0
+
+def test_small_talk_retrieves_nothing(index, vectors):
+    fake = vectors([match("password", 0.9, [1, 0])])
+    assert retrieve("hello") == []
+    assert fake.calls == 0
+
+def test_lexical_hits_alone_dont_pass_the_dense_threshold(index, vectors):
+    vectors([match("password", 0.3, [1, 0]), match("login", 0.2, [0, 1])])
+    assert retrieve("how do I reset my password", embedding=[1.0, 0.0], min_score=0.75) == []
+
+def test_identifier_query_keeps_lexical_hits_without_dense_candidates(index, vectors):
+    vectors([match("refunds", 0.1, [1, 0])])
+    assert [hit["id"] for hit in retrieve("sync E1042", embedding=[1.0, 0.0], min_score=0.75)] == ["sync"]
+
+def test_dense_and_lexical_rankings_are_fused(index, vectors):
+    vectors([
+        match("refunds", 0.92, [1, 0, 0]),
+        match("invoices", 0.90, [0, 1, 0]),
+        match("password", 0.50, [0, 0, 1]),
+    ])
+    results = retrieve("sync error E1042 after the update", embedding=[1.0, 0.0, 0.0], k=3, min_score=0.75)
+    ids = [hit["id"] for hit in results]
+    # The BM25-only hit is fused in; the dense candidate under min_score is not
+    assert ids[0] == "refunds" and set(ids) == {"refunds", "invoices", "sync"}
+    assert next(hit for hit in results if hit["id"] == "sync")["score"] > 2.0
+
+def test_dense_only_when_the_index_has_no_hits(index, vectors):
+    vectors([match("refunds", 0.92, [1, 0]), match("invoices", 0.80, [0, 1]), match("password", 0.1, [1, 1])])
+    results = retrieve("when will my money come back", embedding=[1.0, 0.0], k=3, min_score=0.75)
+    assert [hit["id"] for hit in results] == ["refunds", "invoices"]
@@ -0,0 +1,109 @@
+import time
+import fakeredis
+import pytest
+from fastapi import HTTPException
+from backend.app.core import security
+from backend.app.core.security import REVOKED_SET_KEY, RevocationCache
+from backend.app.core.ttl_cache import TTLCache
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+def make_cache(server, sync_seconds=3600, stale_seconds=3600):
+    """A revocation cache for one process; caches built on the same server share Redis."""
+    return RevocationCache(fakeredis.FakeRedis(server=server, decode_responses=True), sync_seconds, stale_seconds)
+
+@pytest.fixture
+def process(monkeypatch, server):
+    """Points the module-level Redis client, revocation cache and payload cache at fresh fakes."""
+    cache = make_cache(server)
+    monkeypatch.setattr(security, "SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+    monkeypatch.setattr(security, "redis_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(security, "revocation_cache", cache)
+    monkeypatch.setattr(security, "payload_cache", TTLCache(300, 100))
+    return cache
+
+def wait_until(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_revoked_token_is_rejected(process):
+    token = security.create_access_token({"sub": "user-1"})
+    assert security.verify_token(token)["sub"] == "user-1"
+    assert token in security.payload_cache
+
+    security.blacklist_token(token)
+    with pytest.raises(HTTPException) as excinfo:
+        security.verify_token(token)
+    assert excinfo.value.status_code == 401 and excinfo.value.detail == "Token has been revoked"
+
+def test_revocation_in_another_process_rejects_a_cached_token(process, server):
+    token = security.create_access_token({"sub": "user-1"})
+    payload = security.verify_token(token)
+    # This process still holds the verified payload when another one revokes the token
+    other = make_cache(server)
+    other.revoke(payload["jti"], payload["exp"])
+
+    assert token in security.payload_cache
+    assert wait_until(lambda: payload["jti"] in process._revoked)
+    with pytest.raises(HTTPException) as excinfo:
+        security.verify_token(token)
+    assert excinfo.value.status_code == 401
+
+def test_revocations_reach_every_process(server):
+    first, second = make_cache(server), make_cache(server)
+    first.start()
+    second.start()
+    exp = time.time() + 60
+    first.revoke("jti-1", exp)
+    # Both caches are fresh, so this only passes once the published message is applied
+    assert wait_until(lambda: second.is_revoked("jti-1"))
+    assert second.is_fresh()
+
+def test_fresh_process_loads_existing_revocations(server):
+    make_cache(server).revoke("jti-1", time.time() + 60)
+    make_cache(server).revoke("expired", time.time() - 1)
+    cache = make_cache(server)
+    assert cache.is_revoked("jti-1")
+    assert not cache.is_revoked("expired")
+
+def test_stale_cache_asks_redis_directly(server):
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    fresh, stale = make_cache(server), make_cache(server, stale_seconds=-1)
+    fresh.start()
+    stale.start()
+    # Written straight to the set, so no process hears about it
+    client.zadd(REVOKED_SET_KEY, {"jti-1": time.time() + 60})
+
+    assert not fresh.is_revoked("jti-1")
+    assert stale.is_revoked("jti-1")
+    assert not stale.is_revoked("jti-2")
+
+def test_redis_outage_fails_closed_once_stale(server):
+    cache = make_cache(server)
+    server.connected = False
+    # The initial load fails, so nothing local can be trusted
+    with pytest.raises(HTTPException) as excinfo:
+        cache.is_revoked("jti-1")
+    assert excinfo.value.status_code == 503
+    assert not cache.is_fresh()
+
+def test_redis_outage_returns_503_from_verify_token(process, server):
+    token = security.create_access_token({"sub": "user-1"})
+    server.connected = False
+    with pytest.raises(HTTPException) as excinfo:
+        security.verify_token(token)
+    assert excinfo.value.status_code == 503
+
+def test_fresh_cache_survives_a_redis_outage(server):
+    cache = make_cache(server)
+    cache.revoke("jti-1", time.time() + 60)
+    cache.start()
+    server.connected = False
+    assert cache.is_revoked("jti-1")
+    assert not cache.is_revoked("jti-2")
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import numpy as np
+import pytest
+from backend.app.services.vector_store_local import (
+    CURRENT_FILE,
+    HashEmbeddings,
+    LocalVectorStore,
+    META_FILE,
+    MIN_CAPACITY_ROWS,
+    RECORDS_FILE,
+    VECTORS_FILE,
+)
+
+TEXTS = [
+    "Refunds are processed within 5 business days to the original payment method.",
+    "Reset your password with the 'Forgot password' link on the login page.",
+    "Invoices can be downloaded from the billing page under Account > Invoices.",
+    "If sync fails, update the app and check that background refresh is enabled.",
+]
+
+@pytest.fixture
+def embedder():
+    return HashEmbeddings(dimension=64)
+
+def test_hash_embeddings_are_deterministic_and_normalised(embedder):
+    first, second = embedder.embed_query("Reset my password"), embedder.embed_query("reset my PASSWORD")
+    assert first == second
+    assert np.linalg.norm(first) == pytest.approx(1.0, abs=1e-6)
+
+def test_search_ranks_lexical_overlap_first(embedder):
+    store = LocalVectorStore.from_texts(TEXTS, embedder)
+    docs = store.similarity_search("how do I reset my password", k=2)
+    assert docs[0].page_content == TEXTS[1]
+    assert len(docs) == 2
+
+def test_upsert_replaces_by_id(embedder):
+    store = LocalVectorStore(embedder)
+    store.add_texts(TEXTS[:2], ids=["a", "b"])
+    store.add_texts([TEXTS[2]], ids=["a"])
+    assert len(store) == 2
+    assert store.similarity_search("download invoices billing page", k=1)[0].metadata["id"] == "a"
+
+def test_upsert_grows_capacity_geometrically(embedder):
+    store = LocalVectorStore(embedder)
+    capacities = set()
+    for batch in range(MIN_CAPACITY_ROWS // 100 + 5):
+        ids = [f"{batch}-{i}" for i in range(100)]
+        store.add_texts([f"document {batch} {i}" for i in range(100)], ids=ids)
+        capacities.add(len(store._buffer))
+    assert len(store) == len(store._matrix) == (MIN_CAPACITY_ROWS // 100 + 5) * 100
+    assert capacities == {MIN_CAPACITY_ROWS, 2 * MIN_CAPACITY_ROWS}
+    # Rows written before the buffer was reallocated are carried over intact
+    for vector_id in ("0-0", "3-7", "11-99"):
+        row = store._positions[vector_id]
+        expected = embedder.embed_query(f"document {vector_id.replace('-', ' ')}")
+        np.testing.assert_allclose(store._matrix[row], expected, atol=1e-6)
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_save_and_load_round_trip(tmp_path, embedder, quantize):
+    store = LocalVectorStore.from_texts(TEXTS, embedder, metadatas=[{"n": i} for i in range(len(TEXTS))],
+                                        path=str(tmp_path), quantize=quantize)
+    store.save()
+    version = (tmp_path / CURRENT_FILE).read_text()
+    assert sorted(os.listdir(tmp_path)) == sorted([CURRENT_FILE, version])
+    assert sorted(os.listdir(tmp_path / version)) == sorted([VECTORS_FILE, RECORDS_FILE, META_FILE])
+    with open(tmp_path / version / META_FILE) as f:
+        assert json.load(f) == {"dtype": "int8" if quantize else "float32", "count": 4, "dimension": 64}
+
+    loaded = LocalVectorStore(embedder, path=str(tmp_path), quantize=quantize)
+    assert len(loaded) == 4
+    doc, score = loaded.similarity_search_with_score("how do I reset my password", k=1)[0]
+    assert doc.page_content == TEXTS[1] and doc.metadata["n"] == 1
+    assert score == pytest.approx(store.similarity_search_with_score("how do I reset my password", k=1)[0][1], abs=0.02)
+
+    # A memory-mapped index still accepts upserts
+    loaded.add_texts(["Plan upgrades take effect immediately."], ids=["new"])
+    assert len(loaded) == 5
+    assert loaded.similarity_search("plan upgrades", k=1)[0].metadata["id"] == "new"
+
+def test_load_keeps_stored_dtype_and_logs_override(tmp_path, embedder, caplog):
+    LocalVectorStore.from_texts(TEXTS, embedder, path=str(tmp_path), quantize=True).save()
+    with caplog.at_level(logging.WARNING):
+        loaded = LocalVectorStore(embedder, path=str(tmp_path), quantize=False)
+    assert loaded.quantize is True
+    assert "stored as int8" in caplog.text
+
+def test_save_switches_versions_atomically(tmp_path, embedder):
+    store = LocalVectorStore.from_texts(TEXTS[:2], embedder, path=str(tmp_path))
+    store.save()
+    reader = LocalVectorStore(embedder, path=str(tmp_path))
+    first = (tmp_path / CURRENT_FILE).read_text()
+
+    # A save that dies before switching CURRENT leaves the live version untouched
+    os.makedirs(tmp_path / "v-00000000000000000001-dead")
+    assert len(LocalVectorStore(embedder, path=str(tmp_path))) == 2
+
+    store.add_texts(TEXTS[2:], ids=["c", "d"])
+    store.save()
+    second = (tmp_path / CURRENT_FILE).read_text()
+    assert sorted(os.listdir(tmp_path)) == sorted([CURRENT_FILE, second])
+    assert len(LocalVectorStore(embedder, path=str(tmp_path))) == 4
+    # An index loaded from the removed version keeps working
+    assert reader.similarity_search("reset password", k=1)[0].page_content == TEXTS[1]
+
+def test_load_rejects_an_inconsistent_version(tmp_path, embedder):
+    LocalVectorStore.from_texts(TEXTS, embedder, path=str(tmp_path)).save()
+    version = tmp_path / (tmp_path / CURRENT_FILE).read_text()
+    lines = (version / RECORDS_FILE).read_text().splitlines(keepends=True)
+    (version / RECORDS_FILE).write_text("".join(lines[:-1]))
+    with pytest.raises(ValueError, match="inconsistent"):
+        LocalVectorStore(embedder, path=str(tmp_path))
+
+def test_index_saved_before_versioning_still_loads(tmp_path, embedder):
+    store = LocalVectorStore.from_texts(TEXTS, embedder, path=str(tmp_path))
+    store.save()
+    version = tmp_path / (tmp_path / CURRENT_FILE).read_text()
+    for name in (VECTORS_FILE, RECORDS_FILE, META_FILE):
+        os.replace(version / name, tmp_path / name)
+    os.remove(tmp_path / CURRENT_FILE)
+    legacy = LocalVectorStore(embedder, path=str(tmp_path))
+    assert len(legacy) == 4
+
+    # The next save moves it to the versioned layout
+    legacy.save()
+    assert sorted(os.listdir(tmp_path)) == sorted([CURRENT_FILE, (tmp_path / CURRENT_FILE).read_text()])
+    assert len(LocalVectorStore(embedder, path=str(tmp_path))) == 4
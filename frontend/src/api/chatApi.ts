@@ -59,4 +59,55 @@ const pollForResult = async (
     }
     await new Promise((resolve) => setTimeout(resolve, interval));
   }
-};
\ No newline at end of file
+};
+// Streams the reply token by token over Server-Sent Events.
+export const streamMessageFromBackend = async (
+  userMessage: string,
+  userId: string,
+  token: string,
+  onToken: (text: string) => void
+): Promise<string> => {
+  const res = await fetch(`${API_BASE_URL}/chat/query/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Authorization: `Bearer ${token}`,
+    },
+    credentials: "include",
+    body: JSON.stringify({ user_id: userId, message: userMessage }),
+  });
+  if (!res.ok || !res.body) {
+    throw new Error(`Streaming request failed with status ${res.status}`);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let category = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // SSE events are separated by a blank line
+    let boundary = buffer.indexOf("\n\n");
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf("\n\n");
+
+      const dataLine = rawEvent.split("\n").find((line) => line.startsWith("data: "));
+      if (!dataLine) continue;
+      const event = JSON.parse(dataLine.slice(6));
+      if (event.type === "token") {
+        onToken(event.content);
+      } else if (event.type === "done") {
+        category = event.category;
+      } else if (event.type === "error") {
+        throw new Error(event.detail);
+      }
+    }
+  }
+  return category;
+};
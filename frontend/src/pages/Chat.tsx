@@ -1,10 +1,8 @@
 import { useState, useEffect, useRef } from "react";
 import { useAuth } from "../context/AuthContext";
-import axios from "axios";
+import { streamMessageFromBackend } from "../api/chatApi";
 import ChatBubble from "./ChatBubble";
 
-const API_BASE_URL = "http://127.0.0.1:8000/api/v1";
-
 function Chat() {
   const { user_id, token, logout } = useAuth();
   const [messages, setMessages] = useState<{ sender: string; text: string; timestamp: string }[]>([]);
@@ -35,55 +33,28 @@ function Chat() {
     setMessages((prev) => [...prev, { sender: "Bot", text: "Processing your request...", timestamp }]);
 
     try {
-      const initialRes = await axios.post(
-        `${API_BASE_URL}/chat/query`,
-        { user_id, message: input },
-        {
-          headers: {
-            "Content-Type": "application/json",
-            Authorization: `Bearer ${token}`,
-          },
-        }
-      );
-
-      // If there's a task_id, poll; else it's a cached response
-      if (initialRes.data.task_id) {
-        const finalReply = await pollForResult(initialRes.data.task_id);
-        replaceTypingIndicator(finalReply, timestamp);
-      } else {
-        // It's cached
-        const cachedReply = initialRes.data.response || "No cached response found.";
-        replaceTypingIndicator(cachedReply, timestamp);
+      // Stream tokens into the bot bubble as they arrive
+      let reply = "";
+      await streamMessageFromBackend(input, user_id, token, (text) => {
+        reply += text;
+        updateBotReply(reply, timestamp);
+      });
+      if (!reply) {
+        updateBotReply("No response generated.", timestamp);
       }
     } catch (error) {
       console.error("Error sending message:", error);
-      replaceTypingIndicator("Oops! Something went wrong.", timestamp);
+      updateBotReply("Oops! Something went wrong.", timestamp);
     } finally {
       setLoading(false);
       setInput("");
     }
   };
 
-  const pollForResult = async (taskId: string, interval = 1000, timeout = 30000) => {
-    const startTime = Date.now();
-    while (true) {
-      const statusRes = await axios.get(`${API_BASE_URL}/chat/query/status/${taskId}`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      if (statusRes.data.status === "completed") {
-        return statusRes.data.response.response || "No final text found.";
-      }
-      if (Date.now() - startTime > timeout) {
-        throw new Error("Timed out waiting for Celery task to complete.");
-      }
-      await new Promise((resolve) => setTimeout(resolve, interval));
-    }
-  };
-
-  const replaceTypingIndicator = (reply: string, timestamp: string) => {
+  const updateBotReply = (reply: string, timestamp: string) => {
     setMessages((prev) =>
-      prev.map((msg) =>
-        msg.text === "Processing your request..."
+      prev.map((msg, index) =>
+        index === prev.length - 1 && msg.sender === "Bot"
           ? { sender: "Bot", text: reply, timestamp }
           : msg
       )
@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from backend.app.api.v1.auth import router as auth_router
 from backend.app.api.v1.chat import router as chat_router
 from backend.app.api.v1.crm import router as crm_router
 from backend.app.api.v1.users import router as users_router
 from backend.app.api.v1.notifications import router as  notifications_router
 from backend.app.api.v1.webhooks import router as webhooks_router
+from backend.app.api.v1.export import router as export_router
+from backend.app.core.metrics import HTTP_REQUEST_SECONDS, metrics_payload
+from backend.app.services.notifications import notification_dispatcher
+from backend.app.services.event_logging import salesforce_log_writer
+from backend.app.services.chat import transcript_writer
+from backend.app.services.routing import sample_queue_depths
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="AI-Powered Customer Support Agent", version="1.0.0")
@@ -17,6 +24,33 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Records request latency per route template (not raw path, to keep label cardinality bounded)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
+
+@app.on_event("startup")
+def resume_background_queues():
+    """Re-queues notifications spilled by the previous shutdown."""
+    notification_dispatcher.start()
+
+@app.on_event("shutdown")
+def drain_background_queues():
+    """Gives queued notifications and Firestore writes a chance to go out before the process exits."""
+    salesforce_log_writer.stop()
+    transcript_writer.stop()
+    notification_dispatcher.stop()
+
 # Include routers
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(chat_router, prefix="/api/v1/chat", tags=["Chat"])
@@ -24,6 +58,14 @@ app.include_router(crm_router, prefix="/api/v1/crm", tags=["CRM"])
 app.include_router(users_router, prefix="/api/v1/users", tags=["Users"])
 app.include_router(notifications_router, prefix="/api/v1/notifications", tags=["Notifications"])
 app.include_router(webhooks_router, prefix='/api/v1/webhooks', tags=['Webhooks'])
+app.include_router(export_router, prefix="/api/v1/export", tags=["Export"])
 @app.get("/")
 async def root():
-    return {"message": "AI Customer Support API is running"}
\ No newline at end of file
+    return {"message": "AI Customer Support API is running"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint."""
+    sample_queue_depths()
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)